@@ -7,52 +7,20 @@ from reportlab.lib.units import inch
 from typing import List,Dict
 from datetime import datetime
 import uuid
+from annexure import resources
+from annexure.resources import ANNEXURE_STYLES, STYLES
 
 
 
-def CU_1(components: List, component_type: str, warehouse_names: Dict[int, str],alloted_to:str, order_no:str):
+def CU_1(components: List, component_type: str, warehouse_names: Dict[int, str],alloted_to:str, order_no:str, output=None):
     # Create document
     filename = f"Annexure_1_{uuid.uuid4().hex[:8]}.pdf"
-    doc = SimpleDocTemplate(filename, pagesize=A4, 
+    doc = SimpleDocTemplate(output or filename, pagesize=A4, 
                           leftMargin=0.75*inch, rightMargin=0.75*inch, 
                           topMargin=0.75*inch, bottomMargin=0.75*inch)
     
     # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'TitleStyle',
-        parent=styles['Heading1'],
-        alignment=TA_CENTER,
-        fontSize=12,
-        spaceAfter=6
-    )
-    subtitle_style = ParagraphStyle(
-        'SubtitleStyle',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=10,
-        spaceAfter=12
-    )
-    header_label_style = ParagraphStyle(
-        'HeaderLabel',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=9,
-        textColor=colors.gray
-    )
-    header_value_style = ParagraphStyle(
-        'HeaderValue',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=10,
-        leading=12
-    )
-    cell_style = ParagraphStyle(
-        'CellStyle',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=TA_CENTER
-    )
+    title_style, subtitle_style, header_label_style, header_value_style, cell_style = ANNEXURE_STYLES
    
     
     # Content elements
@@ -60,10 +28,10 @@ def CU_1(components: List, component_type: str, warehouse_names: Dict[int, str],
     
     # Logo
     try:
-        logo = Image("annexure/logo.png", width=1*inch, height=1*inch)
+        logo = Image(resources.logo(), width=1*inch, height=1*inch)
         logo.hAlign = 'CENTER'
         elements.append(logo)
-    except:
+    except OSError:
         elements.append(Paragraph("LOGO", title_style))
     
     elements.append(Spacer(1, 12))
@@ -165,7 +133,7 @@ def CU_1(components: List, component_type: str, warehouse_names: Dict[int, str],
     
     signature_style_centered = ParagraphStyle(
     'SignatureCentered',
-    parent=styles['Normal'],
+    parent=STYLES['Normal'],
     fontSize=10,
     alignment=TA_CENTER,
     leading=12
@@ -191,49 +159,15 @@ def CU_1(components: List, component_type: str, warehouse_names: Dict[int, str],
     doc.build(elements)
     return filename
 
-def DMM_1(components: List, component_type: str,alloted_to:str,order_no:str):
+def DMM_1(components: List, component_type: str,alloted_to:str,order_no:str, output=None):
     # Create document
     filename = f"Annexure_1_{uuid.uuid4().hex[:8]}.pdf"
-    doc = SimpleDocTemplate(filename, pagesize=A4, 
+    doc = SimpleDocTemplate(output or filename, pagesize=A4, 
                           leftMargin=0.75*inch, rightMargin=0.75*inch, 
                           topMargin=0.75*inch, bottomMargin=0.75*inch)
     
     # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'TitleStyle',
-        parent=styles['Heading1'],
-        alignment=TA_CENTER,
-        fontSize=12,
-        spaceAfter=6
-    )
-    subtitle_style = ParagraphStyle(
-        'SubtitleStyle',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=10,
-        spaceAfter=12
-    )
-    header_label_style = ParagraphStyle(
-        'HeaderLabel',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=9,
-        textColor=colors.gray
-    )
-    header_value_style = ParagraphStyle(
-        'HeaderValue',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=10,
-        leading=12
-    )
-    cell_style = ParagraphStyle(
-        'CellStyle',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=TA_CENTER
-    )
+    title_style, subtitle_style, header_label_style, header_value_style, cell_style = ANNEXURE_STYLES
    
     
     # Content elements
@@ -241,10 +175,10 @@ def DMM_1(components: List, component_type: str,alloted_to:str,order_no:str):
     
     # Logo
     try:
-        logo = Image("annexure/logo.png", width=1*inch, height=1*inch)
+        logo = Image(resources.logo(), width=1*inch, height=1*inch)
         logo.hAlign = 'CENTER'
         elements.append(logo)
-    except:
+    except OSError:
         elements.append(Paragraph("LOGO", title_style))
     
     elements.append(Spacer(1, 12))
@@ -340,7 +274,7 @@ def DMM_1(components: List, component_type: str,alloted_to:str,order_no:str):
         
     signature_style_centered = ParagraphStyle(
         'SignatureCentered',
-        parent=styles['Normal'],
+        parent=STYLES['Normal'],
         fontSize=10,
         alignment=TA_CENTER,
         leading=12
@@ -8,6 +8,8 @@ from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel
 import uuid
+from annexure import resources
+from annexure.resources import ANNEXURE_STYLES, STYLES
 
 class CUReturn(BaseModel):
     cu_no: str
@@ -16,50 +18,16 @@ class CUReturn(BaseModel):
     dmm_no_treasury: str
 
 
-def Return_RO_BO(details: List[CUReturn], RO:str,alloted_to: str):
+def Return_RO_BO(details: List[CUReturn], RO:str,alloted_to: str, output=None):
     # Create document
     filename = f"Annexure_11_{uuid.uuid4().hex[:8]}.pdf"
     
-    doc = SimpleDocTemplate(filename, pagesize=A4, 
+    doc = SimpleDocTemplate(output or filename, pagesize=A4, 
                           leftMargin=0.75*inch, rightMargin=0.75*inch, 
                           topMargin=0.75*inch, bottomMargin=0.75*inch)
     
     # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'TitleStyle',
-        parent=styles['Heading1'],
-        alignment=TA_CENTER,
-        fontSize=12,
-        spaceAfter=6
-    )
-    subtitle_style = ParagraphStyle(
-        'SubtitleStyle',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=10,
-        spaceAfter=12
-    )
-    header_label_style = ParagraphStyle(
-        'HeaderLabel',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=9,
-        textColor=colors.gray
-    )
-    header_value_style = ParagraphStyle(
-        'HeaderValue',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=10,
-        leading=12
-    )
-    cell_style = ParagraphStyle(
-        'CellStyle',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=TA_CENTER
-    )
+    title_style, subtitle_style, header_label_style, header_value_style, cell_style = ANNEXURE_STYLES
    
     
     # Content elements
@@ -67,10 +35,10 @@ def Return_RO_BO(details: List[CUReturn], RO:str,alloted_to: str):
     
     # Logo
     try:
-        logo = Image("annexure/logo.png", width=1*inch, height=1*inch)
+        logo = Image(resources.logo(), width=1*inch, height=1*inch)
         logo.hAlign = 'CENTER'
         elements.append(logo)
-    except:
+    except OSError:
         elements.append(Paragraph("LOGO", title_style))
     
     elements.append(Spacer(1, 12))
@@ -174,7 +142,7 @@ def Return_RO_BO(details: List[CUReturn], RO:str,alloted_to: str):
     
     signature_style_centered = ParagraphStyle(
     'SignatureCentered',
-    parent=styles['Normal'],
+    parent=STYLES['Normal'],
     fontSize=10,
     alignment=TA_CENTER,
     leading=12
@@ -8,6 +8,8 @@ from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel
 import uuid
+from annexure import resources
+from annexure.resources import ANNEXURE_STYLES, STYLES
 
 class CUDetail(BaseModel):
     comp_no: str
@@ -16,50 +18,16 @@ class CUDetail(BaseModel):
     comp_warehouse: Optional[str] = None
     
 
-def BO_DEO_Return(details: List[CUDetail], order_no: str, alloted_from: str, alloted_to: str):
+def BO_DEO_Return(details: List[CUDetail], order_no: str, alloted_from: str, alloted_to: str, output=None):
 
     filename = f"Annexure_12_{uuid.uuid4().hex[:8]}.pdf"
   
-    doc = SimpleDocTemplate(filename, pagesize=landscape(A4), 
+    doc = SimpleDocTemplate(output or filename, pagesize=landscape(A4), 
                           leftMargin=0.5*inch, rightMargin=0.5*inch, 
                           topMargin=0.75*inch, bottomMargin=0.75*inch)
     
     # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'TitleStyle',
-        parent=styles['Heading1'],
-        alignment=TA_CENTER,
-        fontSize=12,
-        spaceAfter=6
-    )
-    subtitle_style = ParagraphStyle(
-        'SubtitleStyle',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=10,
-        spaceAfter=12
-    )
-    header_label_style = ParagraphStyle(
-        'HeaderLabel',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=9,
-        textColor=colors.gray
-    )
-    header_value_style = ParagraphStyle(
-        'HeaderValue',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=10,
-        leading=12
-    )
-    cell_style = ParagraphStyle(
-        'CellStyle',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=TA_CENTER
-    )
+    title_style, subtitle_style, header_label_style, header_value_style, cell_style = ANNEXURE_STYLES
    
     
     # Content elements
@@ -67,10 +35,10 @@ def BO_DEO_Return(details: List[CUDetail], order_no: str, alloted_from: str, all
     
     # Logo
     try:
-        logo = Image("annexure/logo.png", width=1*inch, height=1*inch)
+        logo = Image(resources.logo(), width=1*inch, height=1*inch)
         logo.hAlign = 'CENTER'
         elements.append(logo)
-    except:
+    except OSError:
         elements.append(Paragraph("LOGO", title_style))
     
     elements.append(Spacer(1, 12))
@@ -195,7 +163,7 @@ def BO_DEO_Return(details: List[CUDetail], order_no: str, alloted_from: str, all
     
     signature_style_centered = ParagraphStyle(
         'SignatureCentered',
-        parent=styles['Normal'],
+        parent=STYLES['Normal'],
         fontSize=10,
         alignment=TA_CENTER,
         leading=12
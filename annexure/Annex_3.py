@@ -10,6 +10,8 @@ from typing import List
 from reportlab.lib.units import inch
 import uuid
 import os
+from annexure import resources
+from annexure.resources import STYLES
 
 class WatermarkCanvas(canvas.Canvas):
     def __init__(self, *args, **kwargs):
@@ -24,10 +26,8 @@ class WatermarkCanvas(canvas.Canvas):
         canvas.Canvas.showPage(self)
     
     def _add_watermark(self):
-        watermark_path = "annexure/logo_wm.png"
-        if not os.path.exists(watermark_path):
-            raise FileNotFoundError(f"Watermark image not found: {watermark_path}")
-        
+        watermark = resources.watermark()
+
         self.saveState()
         
 
@@ -44,7 +44,7 @@ class WatermarkCanvas(canvas.Canvas):
         self.setStrokeAlpha(0.17)
         
       
-        self.drawImage(watermark_path, x, y, 
+        self.drawImage(watermark, x, y, 
                       width=watermark_width, 
                       height=watermark_height,
                       preserveAspectRatio=True,
@@ -52,13 +52,13 @@ class WatermarkCanvas(canvas.Canvas):
         
         self.restoreState()
 
-def FLC_Certificate_BU(components: List[dict]):
+def FLC_Certificate_BU(components: List[dict], output=None):
     filename = f"Annexure_3_{uuid.uuid4().hex[:8]}.pdf"
-    doc = SimpleDocTemplate(filename, pagesize=A4, 
+    doc = SimpleDocTemplate(output or filename, pagesize=A4, 
                            leftMargin=0.5*inch, rightMargin=0.5*inch, 
                            topMargin=0.5*inch, bottomMargin=0.5*inch)
     
-    styles = getSampleStyleSheet()
+    styles = STYLES
     title_style = ParagraphStyle(
         'TitleStyle',
         parent=styles['Heading1'],
@@ -70,10 +70,10 @@ def FLC_Certificate_BU(components: List[dict]):
     elements = []
     
     try:
-        logo = Image("annexure/logo.png", width=1*inch, height=1*inch)
+        logo = Image(resources.logo(), width=1*inch, height=1*inch)
         logo.hAlign = 'CENTER'
         elements.append(logo)
-    except:
+    except OSError:
         elements.append(Paragraph("LOGO", title_style))
     
     elements.extend([
@@ -129,13 +129,13 @@ def FLC_Certificate_BU(components: List[dict]):
     doc.build(elements, canvasmaker=WatermarkCanvas)
     return filename
 
-def FLC_Certificate_CU(components: List[dict]):
+def FLC_Certificate_CU(components: List[dict], output=None):
     filename = f"Annexure_3_{uuid.uuid4().hex[:8]}.pdf"
-    doc = SimpleDocTemplate(filename, pagesize=landscape(A4), 
+    doc = SimpleDocTemplate(output or filename, pagesize=landscape(A4), 
                            leftMargin=0.5*inch, rightMargin=0.5*inch, 
                            topMargin=0.5*inch, bottomMargin=0.5*inch)
     
-    styles = getSampleStyleSheet()
+    styles = STYLES
     title_style = ParagraphStyle(
         'TitleStyle',
         parent=styles['Heading1'],
@@ -147,10 +147,10 @@ def FLC_Certificate_CU(components: List[dict]):
     elements = []
     
     try:
-        logo = Image("annexure/logo.png", width=1.1*inch, height=1.1*inch)
+        logo = Image(resources.logo(), width=1.1*inch, height=1.1*inch)
         logo.hAlign = 'CENTER'
         elements.append(logo)
-    except:
+    except OSError:
         elements.append(Paragraph("LOGO", title_style))
     
     elements.extend([
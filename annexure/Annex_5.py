@@ -8,6 +8,8 @@ from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel
 import uuid
+from annexure import resources
+from annexure.resources import ANNEXURE_STYLES, STYLES
 
 class CUDetail(BaseModel):
     serial_number: str
@@ -20,49 +22,15 @@ class BUDetail(BaseModel):
     box_no: str
     warehouse: str
 
-def Deo_BO_CU(details: List[CUDetail], alloted_to: str, alloted_from: str):
+def Deo_BO_CU(details: List[CUDetail], alloted_to: str, alloted_from: str, output=None):
     # Create document
     filename = f"Annexure_5_{uuid.uuid4().hex[:8]}.pdf"
-    doc = SimpleDocTemplate(filename, pagesize=A4, 
+    doc = SimpleDocTemplate(output or filename, pagesize=A4, 
                           leftMargin=0.75*inch, rightMargin=0.75*inch, 
                           topMargin=0.75*inch, bottomMargin=0.75*inch)
     
     # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'TitleStyle',
-        parent=styles['Heading1'],
-        alignment=TA_CENTER,
-        fontSize=12,
-        spaceAfter=6
-    )
-    subtitle_style = ParagraphStyle(
-        'SubtitleStyle',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=10,
-        spaceAfter=12
-    )
-    header_label_style = ParagraphStyle(
-        'HeaderLabel',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=9,
-        textColor=colors.gray
-    )
-    header_value_style = ParagraphStyle(
-        'HeaderValue',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=10,
-        leading=12
-    )
-    cell_style = ParagraphStyle(
-        'CellStyle',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=TA_CENTER
-    )
+    title_style, subtitle_style, header_label_style, header_value_style, cell_style = ANNEXURE_STYLES
    
     
     # Content elements
@@ -70,10 +38,10 @@ def Deo_BO_CU(details: List[CUDetail], alloted_to: str, alloted_from: str):
     
     # Logo
     try:
-        logo = Image("annexure/logo.png", width=1*inch, height=1*inch)
+        logo = Image(resources.logo(), width=1*inch, height=1*inch)
         logo.hAlign = 'CENTER'
         elements.append(logo)
-    except:
+    except OSError:
         elements.append(Paragraph("LOGO", title_style))
     
     elements.append(Spacer(1, 12))
@@ -172,7 +140,7 @@ def Deo_BO_CU(details: List[CUDetail], alloted_to: str, alloted_from: str):
     
     signature_style_centered = ParagraphStyle(
     'SignatureCentered',
-    parent=styles['Normal'],
+    parent=STYLES['Normal'],
     fontSize=10,
     alignment=TA_CENTER,
     leading=12
@@ -200,49 +168,15 @@ def Deo_BO_CU(details: List[CUDetail], alloted_to: str, alloted_from: str):
 
 
 
-def Deo_BO_BU(details: List[BUDetail], alloted_to: str, alloted_from: str):
+def Deo_BO_BU(details: List[BUDetail], alloted_to: str, alloted_from: str, output=None):
     # Create document
     filename = f"Annexure_5_{uuid.uuid4().hex[:8]}.pdf"
-    doc = SimpleDocTemplate(filename, pagesize=A4, 
+    doc = SimpleDocTemplate(output or filename, pagesize=A4, 
                           leftMargin=0.75*inch, rightMargin=0.75*inch, 
                           topMargin=0.75*inch, bottomMargin=0.75*inch)
     
     # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'TitleStyle',
-        parent=styles['Heading1'],
-        alignment=TA_CENTER,
-        fontSize=12,
-        spaceAfter=6
-    )
-    subtitle_style = ParagraphStyle(
-        'SubtitleStyle',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=10,
-        spaceAfter=12
-    )
-    header_label_style = ParagraphStyle(
-        'HeaderLabel',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=9,
-        textColor=colors.gray
-    )
-    header_value_style = ParagraphStyle(
-        'HeaderValue',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=10,
-        leading=12
-    )
-    cell_style = ParagraphStyle(
-        'CellStyle',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=TA_CENTER
-    )
+    title_style, subtitle_style, header_label_style, header_value_style, cell_style = ANNEXURE_STYLES
    
     
     # Content elements
@@ -250,10 +184,10 @@ def Deo_BO_BU(details: List[BUDetail], alloted_to: str, alloted_from: str):
     
     # Logo
     try:
-        logo = Image("annexure/logo.png", width=1*inch, height=1*inch)
+        logo = Image(resources.logo(), width=1*inch, height=1*inch)
         logo.hAlign = 'CENTER'
         elements.append(logo)
-    except:
+    except OSError:
         elements.append(Paragraph("LOGO", title_style))
     
     elements.append(Spacer(1, 12))
@@ -348,7 +282,7 @@ def Deo_BO_BU(details: List[BUDetail], alloted_to: str, alloted_from: str):
     
     signature_style_centered = ParagraphStyle(
     'SignatureCentered',
-    parent=styles['Normal'],
+    parent=STYLES['Normal'],
     fontSize=10,
     alignment=TA_CENTER,
     leading=12
@@ -8,6 +8,8 @@ from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel
 import uuid
+from annexure import resources
+from annexure.resources import STYLES
 
 class EVMDetail(BaseModel):
     evm_no: str
@@ -18,14 +20,14 @@ class EVMDetail(BaseModel):
     bu_nos: List[str]
     bu_pink_paper_seal_nos: List[str]
 
-def RO_PRO(details: List[EVMDetail], district: str,local_body:str,RO: str,strongroom:str,filename:str):
+def RO_PRO(details: List[EVMDetail], district: str,local_body:str,RO: str,strongroom:str,filename:str, output=None):
     
-    doc = SimpleDocTemplate(filename, pagesize=landscape(A4), 
+    doc = SimpleDocTemplate(output or filename, pagesize=landscape(A4), 
                           leftMargin=0.5*inch, rightMargin=0.5*inch, 
                           topMargin=0.5*inch, bottomMargin=0.5*inch)
     
     # Styles
-    styles = getSampleStyleSheet()
+    styles = STYLES
     title_style = ParagraphStyle(
         'TitleStyle',
         parent=styles['Heading1'],
@@ -67,10 +69,10 @@ def RO_PRO(details: List[EVMDetail], district: str,local_body:str,RO: str,strong
     
     # Logo
     try:
-        logo = Image("annexure/logo.png", width=1*inch, height=1*inch)
+        logo = Image(resources.logo(), width=1*inch, height=1*inch)
         logo.hAlign = 'CENTER'
         elements.append(logo)
-    except:
+    except OSError:
         elements.append(Paragraph("LOGO", title_style))
     
     elements.append(Spacer(1, 12))
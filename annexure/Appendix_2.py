@@ -9,58 +9,26 @@ from typing import List, Dict
 import uuid
 import tempfile
 import os
+from annexure import resources
+from annexure.resources import ANNEXURE_STYLES, STYLES
 
-def appendix_2(flc_data: List[Dict], district: str):
+def appendix_2(flc_data: List[Dict], district: str, output=None):
     # Create document - landscape orientation
 
     filename = f"Appendix_2_{uuid.uuid4().hex[:8]}.pdf"
     filepath = os.path.join(tempfile.gettempdir(), filename)
 
-    doc = SimpleDocTemplate(filepath, pagesize=landscape(A4), 
+    doc = SimpleDocTemplate(output or filepath, pagesize=landscape(A4), 
                           leftMargin=0.75*inch, rightMargin=0.75*inch, 
                           topMargin=0.75*inch, bottomMargin=0.75*inch)
     completion_date = datetime.now().strftime('%Y-%m-%d')
     # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'TitleStyle',
-        parent=styles['Heading1'],
-        alignment=TA_CENTER,
-        fontSize=12,
-        spaceAfter=6
-    )
-    subtitle_style = ParagraphStyle(
-        'SubtitleStyle',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=10,
-        spaceAfter=12
-    )
-    header_label_style = ParagraphStyle(
-        'HeaderLabel',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=9,
-        textColor=colors.gray
-    )
-    header_value_style = ParagraphStyle(
-        'HeaderValue',
-        parent=styles['Normal'],
-        alignment=TA_CENTER,
-        fontSize=10,
-        leading=12
-    )
-    cell_style = ParagraphStyle(
-        'CellStyle',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=TA_CENTER
-    )
+    title_style, subtitle_style, header_label_style, header_value_style, cell_style = ANNEXURE_STYLES
     
     # Remarks cell style with left alignment for better readability
     remarks_style = ParagraphStyle(
         'RemarksStyle',
-        parent=styles['Normal'],
+        parent=STYLES['Normal'],
         fontSize=10,
         alignment=TA_LEFT,
         leading=12,
@@ -73,10 +41,10 @@ def appendix_2(flc_data: List[Dict], district: str):
     
     # Logo
     try:
-        logo = Image("annexure/logo.png", width=1*inch, height=1*inch)
+        logo = Image(resources.logo(), width=1*inch, height=1*inch)
         logo.hAlign = 'CENTER'
         elements.append(logo)
-    except:
+    except OSError:
         elements.append(Paragraph("LOGO", title_style))
     
     elements.append(Spacer(1, 12))
@@ -186,7 +154,7 @@ def appendix_2(flc_data: List[Dict], district: str):
     
     signature_style_centered = ParagraphStyle(
         'SignatureCentered',
-        parent=styles['Normal'],
+        parent=STYLES['Normal'],
         fontSize=10,
         alignment=TA_CENTER,
         leading=12
@@ -210,5 +178,4 @@ def appendix_2(flc_data: List[Dict], district: str):
     
     # Build document
     doc.build(elements)
-    file_size = os.path.getsize(filepath)
     return filepath  
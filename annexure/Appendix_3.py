@@ -6,20 +6,22 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from typing import List, Dict
 import uuid
+from annexure import resources
+from annexure.resources import STYLES
 
 def appendix_3(joining_date: str, members: List[str], evm_data: Dict, 
                free_accommodation: bool, local_conveyance: bool, 
-               relieving_date: str):
+               relieving_date: str, output=None):
     
     # Create document - portrait orientation
     filename = f"Appendix_3_{uuid.uuid4().hex[:8]}.pdf"
 
-    doc = SimpleDocTemplate(filename, pagesize=A4, 
+    doc = SimpleDocTemplate(output or filename, pagesize=A4, 
                           leftMargin=0.75*inch, rightMargin=0.75*inch, 
                           topMargin=0.75*inch, bottomMargin=0.75*inch)
     
     # Styles
-    styles = getSampleStyleSheet()
+    styles = STYLES
     
     title_style = ParagraphStyle(
         'TitleStyle',
@@ -62,10 +64,10 @@ def appendix_3(joining_date: str, members: List[str], evm_data: Dict,
     
     # Logo
     try:
-        logo = Image("annexure/logo.png", width=1*inch, height=1*inch)
+        logo = Image(resources.logo(), width=1*inch, height=1*inch)
         logo.hAlign = 'CENTER'
         elements.append(logo)
-    except:
+    except OSError:
         elements.append(Paragraph("LOGO", title_style))
     
     elements.append(Spacer(1, 20))
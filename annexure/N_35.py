@@ -8,6 +8,8 @@ from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel
 import uuid
+from annexure import resources
+from annexure.resources import STYLES
 
 class EVMPair(BaseModel):
     cu_no: str
@@ -21,10 +23,10 @@ def create_page_content(evm_pair: EVMPair, allotment_order_no: str, styles: dict
     
     # Logo
     try:
-        logo = Image("annexure/logo.png", width=1*inch, height=1*inch)
+        logo = Image(resources.logo(), width=1*inch, height=1*inch)
         logo.hAlign = 'CENTER'
         elements.append(logo)
-    except:
+    except OSError:
         elements.append(Paragraph("LOGO", styles['title_style']))
     
     elements.append(Spacer(1, 12))
@@ -151,16 +153,16 @@ def create_page_content(evm_pair: EVMPair, allotment_order_no: str, styles: dict
     return elements
 
 
-def Form_N35(evm_pairs: List[EVMPair], allotment_order_no: str):
+def Form_N35(evm_pairs: List[EVMPair], allotment_order_no: str, output=None):
     
     filename = f"Form_N35_{uuid.uuid4().hex[:8]}.pdf"
 
-    doc = SimpleDocTemplate(filename, pagesize=A4, 
+    doc = SimpleDocTemplate(output or filename, pagesize=A4, 
                           leftMargin=0.75*inch, rightMargin=0.75*inch, 
                           topMargin=0.75*inch, bottomMargin=0.75*inch)
     
     # Styles
-    styles_sheet = getSampleStyleSheet()
+    styles_sheet = STYLES
     styles = {
         'title_style': ParagraphStyle(
             'TitleStyle',
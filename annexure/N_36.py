@@ -8,6 +8,8 @@ from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel
 import uuid
+from annexure import resources
+from annexure.resources import STYLES
 
 class EVMPair(BaseModel):
     cu_no: str
@@ -19,7 +21,7 @@ def create_page_content(pair: EVMPair, pair_index: int):
     """Create content for a single page/EVM pair"""
     
     # Styles
-    styles = getSampleStyleSheet()
+    styles = STYLES
     title_style = ParagraphStyle(
         'TitleStyle',
         parent=styles['Heading1'],
@@ -56,10 +58,10 @@ def create_page_content(pair: EVMPair, pair_index: int):
     
     # Logo
     try:
-        logo = Image("annexure/logo.png", width=1*inch, height=1*inch)
+        logo = Image(resources.logo(), width=1*inch, height=1*inch)
         logo.hAlign = 'CENTER'
         page_elements.append(logo)
-    except:
+    except OSError:
         page_elements.append(Paragraph("LOGO", title_style))
     
     page_elements.append(Spacer(1, 12))
@@ -165,11 +167,11 @@ def create_page_content(pair: EVMPair, pair_index: int):
     return page_elements
 
 
-def Form_N36(evm_pairs: List[EVMPair], allotment_order_no: str):
+def Form_N36(evm_pairs: List[EVMPair], allotment_order_no: str, output=None):
 
     filename = f"Form_N36_{uuid.uuid4().hex[:8]}.pdf"
     
-    doc = SimpleDocTemplate(filename, pagesize=A4, 
+    doc = SimpleDocTemplate(output or filename, pagesize=A4, 
                           leftMargin=0.75*inch, rightMargin=0.75*inch, 
                           topMargin=0.75*inch, bottomMargin=0.75*inch)
     
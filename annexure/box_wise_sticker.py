@@ -5,20 +5,90 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Image
 from datetime import datetime
+from pydantic import BaseModel
 from typing import List
+from annexure import resources
+from annexure.resources import STYLES
 
-def Box_wise_sticker(boxes_data: List, first_component_type:str,filename="Box_wise_sticker.pdf"):
+class Component(BaseModel):
+    serial_no: str
+    status: str
+    flc_date: str
+
+class Box(BaseModel):
+    box_no: str
+    components: List[Component]
+
+# Per-box table styles, built once per process instead of once per page
+CU_HEADER_TABLE_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+    ('TOPPADDING', (0, 1), (-1, 1), 6),
+])
+
+CU_LEFT_TABLE_STYLE = TableStyle([
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),  # Center headers
+    ('ALIGN', (0, 1), (-1, 1), 'CENTER'),  # Center index row
+    ('ALIGN', (0, 2), (0, -1), 'CENTER'),  # Center SI No. column
+    ('ALIGN', (1, 2), (-1, -1), 'CENTER'),  # Center data cells
+    ('FONTSIZE', (0, 0), (-1, -1), 12),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),  # Header background
+    ('BACKGROUND', (0, 1), (-1, 1), colors.lightgrey),  # Index row background
+])
+
+CU_RIGHT_TABLE_STYLE = TableStyle([
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),  # Center headers
+    ('ALIGN', (0, 1), (-1, 1), 'CENTER'),  # Center index row
+    ('ALIGN', (0, 2), (0, -2), 'CENTER'),  # Center SI No. column (except total row)
+    ('ALIGN', (1, 2), (-1, -2), 'CENTER'),  # Center data cells (except total row)
+    ('ALIGN', (0, -1), (0, -1), 'LEFT'),   # Left-align "Total Count"
+    ('FONTSIZE', (0, 0), (-1, -1), 12),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),  # Header background
+    ('BACKGROUND', (0, 1), (-1, 1), colors.lightgrey),  # Index row background
+])
+
+CU_CONTAINER_TABLE_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+])
+
+HEADER_TABLE_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 0),
+    ('TOPPADDING', (0, 1), (-1, 1), 0),
+])
+
+COMPONENT_TABLE_STYLE = TableStyle([
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),  # Center headers
+    ('ALIGN', (0, 1), (-1, 1), 'CENTER'),  # Center index row
+    ('ALIGN', (0, 2), (0, -2), 'CENTER'),  # Center SI No. column
+    ('ALIGN', (1, 2), (-1, -2), 'CENTER'),  # Center data cells
+    ('ALIGN', (0, -1), (0, -1), 'LEFT'),   # Left-align "Total Count"
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),  # Header background
+    ('BACKGROUND', (0, 1), (-1, 1), colors.lightgrey),  # Index row background
+])
+
+def Box_wise_sticker(boxes_data: List, first_component_type:str,filename="Box_wise_sticker.pdf", output=None):
     print(first_component_type)
     if first_component_type == "CU":
 
 
         # Create document with landscape orientation
-        doc = SimpleDocTemplate(filename, pagesize=landscape(A4), 
+        doc = SimpleDocTemplate(output or filename, pagesize=landscape(A4), 
                             leftMargin=0.75*inch, rightMargin=0.75*inch, 
                             topMargin=0.75*inch, bottomMargin=0.75*inch)
         
         # Styles
-        styles = getSampleStyleSheet()
+        styles = STYLES
         title_style = ParagraphStyle(
             'TitleStyle',
             parent=styles['Heading1'],
@@ -70,10 +140,10 @@ def Box_wise_sticker(boxes_data: List, first_component_type:str,filename="Box_wi
             
             # Logo
             try:
-                logo = Image("annexure/logo.png", width=1*inch, height=1*inch)
+                logo = Image(resources.logo(), width=1*inch, height=1*inch)
                 logo.hAlign = 'CENTER'
                 elements.append(logo)
-            except:
+            except OSError:
                 elements.append(Paragraph("LOGO", title_style))
             
             elements.append(Spacer(1, 12))
@@ -105,12 +175,7 @@ def Box_wise_sticker(boxes_data: List, first_component_type:str,filename="Box_wi
             ]
             
             header_table = Table(header_info, colWidths=[200, 200])
-            header_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
-                ('TOPPADDING', (0, 1), (-1, 1), 6),
-            ]))
+            header_table.setStyle(CU_HEADER_TABLE_STYLE)
             elements.append(header_table)
             
             elements.append(Spacer(1, 30))
@@ -151,40 +216,16 @@ def Box_wise_sticker(boxes_data: List, first_component_type:str,filename="Box_wi
             
             # Create left table
             left_table = Table(left_data, colWidths=col_widths)
-            left_table.setStyle(TableStyle([
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),  # Center headers
-                ('ALIGN', (0, 1), (-1, 1), 'CENTER'),  # Center index row
-                ('ALIGN', (0, 2), (0, -1), 'CENTER'),  # Center SI No. column
-                ('ALIGN', (1, 2), (-1, -1), 'CENTER'),  # Center data cells
-                ('FONTSIZE', (0, 0), (-1, -1), 12),
-                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),  # Header background
-                ('BACKGROUND', (0, 1), (-1, 1), colors.lightgrey),  # Index row background
-            ]))
+            left_table.setStyle(CU_LEFT_TABLE_STYLE)
             
             # Create right table
             right_table = Table(right_data, colWidths=col_widths)
-            right_table.setStyle(TableStyle([
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),  # Center headers
-                ('ALIGN', (0, 1), (-1, 1), 'CENTER'),  # Center index row
-                ('ALIGN', (0, 2), (0, -2), 'CENTER'),  # Center SI No. column (except total row)
-                ('ALIGN', (1, 2), (-1, -2), 'CENTER'),  # Center data cells (except total row)
-                ('ALIGN', (0, -1), (0, -1), 'LEFT'),   # Left-align "Total Count"
-                ('FONTSIZE', (0, 0), (-1, -1), 12),
-                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),  # Header background
-                ('BACKGROUND', (0, 1), (-1, 1), colors.lightgrey),  # Index row background
-            ]))
+            right_table.setStyle(CU_RIGHT_TABLE_STYLE)
             
             # Create a container table to place both tables side by side
             container_data = [[left_table, right_table]]
             container_table = Table(container_data, colWidths=[370, 370])
-            container_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ]))
+            container_table.setStyle(CU_CONTAINER_TABLE_STYLE)
             
             elements.append(container_table)
         
@@ -193,12 +234,12 @@ def Box_wise_sticker(boxes_data: List, first_component_type:str,filename="Box_wi
         return filename
     
     else:
-        doc = SimpleDocTemplate(filename, pagesize=A4, 
+        doc = SimpleDocTemplate(output or filename, pagesize=A4, 
                           leftMargin=0.75*inch, rightMargin=0.75*inch, 
                           topMargin=0.75*inch, bottomMargin=0.75*inch)
     
         # Styles
-        styles = getSampleStyleSheet()
+        styles = STYLES
         title_style = ParagraphStyle(
             'TitleStyle',
             parent=styles['Heading1'],
@@ -250,10 +291,10 @@ def Box_wise_sticker(boxes_data: List, first_component_type:str,filename="Box_wi
             
             # Logo
             try:
-                logo = Image("annexure/logo.png", width=1*inch, height=1*inch)
+                logo = Image(resources.logo(), width=1*inch, height=1*inch)
                 logo.hAlign = 'CENTER'
                 elements.append(logo)
-            except:
+            except OSError:
                 elements.append(Paragraph("LOGO", title_style))
             
             elements.append(Spacer(1, 12))
@@ -287,12 +328,7 @@ def Box_wise_sticker(boxes_data: List, first_component_type:str,filename="Box_wi
             ]
             
             header_table = Table(header_info, colWidths=[160, 160])
-            header_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 0),
-                ('TOPPADDING', (0, 1), (-1, 1), 0),
-            ]))
+            header_table.setStyle(HEADER_TABLE_STYLE)
             elements.append(header_table)
             
             elements.append(Spacer(1, 30))
@@ -323,18 +359,7 @@ def Box_wise_sticker(boxes_data: List, first_component_type:str,filename="Box_wi
             col_widths = [80, 150, 150]
             
             comp_table = Table(comp_data, colWidths=col_widths)
-            comp_table.setStyle(TableStyle([
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),  # Center headers
-                ('ALIGN', (0, 1), (-1, 1), 'CENTER'),  # Center index row
-                ('ALIGN', (0, 2), (0, -2), 'CENTER'),  # Center SI No. column
-                ('ALIGN', (1, 2), (-1, -2), 'CENTER'),  # Center data cells
-                ('ALIGN', (0, -1), (0, -1), 'LEFT'),   # Left-align "Total Count"
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),  # Header background
-                ('BACKGROUND', (0, 1), (-1, 1), colors.lightgrey),  # Index row background
-            ]))
+            comp_table.setStyle(COMPONENT_TABLE_STYLE)
             elements.append(comp_table)
         
         # Build document
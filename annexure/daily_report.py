@@ -9,8 +9,10 @@ from typing import List, Dict
 import uuid
 import os
 import logging
+from annexure import resources
+from annexure.resources import STYLES
 
-def daily_report(district_data: List[Dict], report_date: str, totals: Dict) -> str:
+def daily_report(district_data: List[Dict], report_date: str, totals: Dict, output=None) -> str:
     try:
         # Kerala districts mapping
         kerala_districts_short = [
@@ -29,12 +31,13 @@ def daily_report(district_data: List[Dict], report_date: str, totals: Dict) -> s
         
         # Ensure the file path is in a writable directory
         pdf_dir = "generated_reports"
-        os.makedirs(pdf_dir, exist_ok=True)
+        if output is None:
+            os.makedirs(pdf_dir, exist_ok=True)
         filepath = os.path.join(pdf_dir, filename)
         
         # Create document - landscape orientation
         doc = SimpleDocTemplate(
-            filepath, 
+            output or filepath, 
             pagesize=landscape(A4),
             leftMargin=0.5*inch, 
             rightMargin=0.5*inch,
@@ -43,7 +46,7 @@ def daily_report(district_data: List[Dict], report_date: str, totals: Dict) -> s
         )
 
         # Define styles
-        styles = getSampleStyleSheet()
+        styles = STYLES
         title_style = ParagraphStyle(
             'TitleStyle',
             parent=styles['Heading1'],
@@ -70,16 +73,12 @@ def daily_report(district_data: List[Dict], report_date: str, totals: Dict) -> s
         elements = []
 
         # Add logo if available
-        logo_path = "annexure/logo.png"
-        if os.path.exists(logo_path):
-            try:
-                logo = Image(logo_path, width=0.6*inch, height=0.6*inch)
-                logo.hAlign = 'CENTER'
-                elements.append(logo)
-            except Exception as e:
-                logging.warning(f"Could not load logo: {e}")
-                elements.append(Paragraph("ELECTION COMMISSION LOGO", title_style))
-        else:
+        try:
+            logo = Image(resources.logo(), width=0.6*inch, height=0.6*inch)
+            logo.hAlign = 'CENTER'
+            elements.append(logo)
+        except OSError as e:
+            logging.warning(f"Could not load logo: {e}")
             elements.append(Paragraph("ELECTION COMMISSION LOGO", title_style))
 
         elements.append(Spacer(1, 4))
@@ -235,7 +234,7 @@ def daily_report(district_data: List[Dict], report_date: str, totals: Dict) -> s
         doc.build(elements)
         
         # Verify file was created
-        if not os.path.exists(filepath):
+        if output is None and not os.path.exists(filepath):
             raise Exception("PDF file was not created successfully")
             
         logging.info(f"Successfully generated FLC report: {filepath}")
@@ -13,10 +13,10 @@ class EVMData(BaseModel):
     dmm_no: str
     bu_nos: List[str]
 
-def pairing_sticker(data_list: List[EVMData]):
+def pairing_sticker(data_list: List[EVMData], output=None):
 
     filename = f"pairing_sticker_{uuid.uuid4().hex[:8]}.pdf"
-    doc = SimpleDocTemplate(filename, pagesize=A4, 
+    doc = SimpleDocTemplate(output or filename, pagesize=A4, 
                            topMargin=0.3*inch, bottomMargin=0.3*inch,
                            leftMargin=0.3*inch, rightMargin=0.3*inch)
     
@@ -65,6 +65,7 @@ def pairing_sticker(data_list: List[EVMData]):
     
     doc.build(story)
     print(f"PDF created: {filename}")
+    return filename
 
 def create_single_table(data: EVMData):
     """Create a single EVM table"""
@@ -0,0 +1,88 @@
+"""Reportlab resources shared by the annexure builders.
+
+Styles are built once per process instead of on every document. Image files
+are read once: platypus Image takes a path or a file object (not an ImageReader),
+so logo() hands out a fresh stream over the cached bytes, while the watermark
+drawn with canvas.drawImage is a decoded ImageReader.
+"""
+import os
+from io import BytesIO
+from functools import lru_cache
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.utils import ImageReader
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+LOGO_PATH = os.path.join(_HERE, "logo.png")
+WATERMARK_PATH = os.path.join(_HERE, "logo_wm.png")
+
+# Part of every cached PDF's key (utils.pdf_renderer); bump when a builder's output changes
+TEMPLATE_VERSION = "1"
+
+STYLES = getSampleStyleSheet()
+
+# Header/table styles used unchanged by most annexures and appendices
+ANNEXURE_STYLES = (
+    ParagraphStyle(
+        'TitleStyle',
+        parent=STYLES['Heading1'],
+        alignment=TA_CENTER,
+        fontSize=12,
+        spaceAfter=6
+    ),
+    ParagraphStyle(
+        'SubtitleStyle',
+        parent=STYLES['Normal'],
+        alignment=TA_CENTER,
+        fontSize=10,
+        spaceAfter=12
+    ),
+    ParagraphStyle(
+        'HeaderLabel',
+        parent=STYLES['Normal'],
+        alignment=TA_CENTER,
+        fontSize=9,
+        textColor=colors.gray
+    ),
+    ParagraphStyle(
+        'HeaderValue',
+        parent=STYLES['Normal'],
+        alignment=TA_CENTER,
+        fontSize=10,
+        leading=12
+    ),
+    ParagraphStyle(
+        'CellStyle',
+        parent=STYLES['Normal'],
+        fontSize=10,
+        alignment=TA_CENTER
+    ),
+)
+
+
+@lru_cache(maxsize=None)
+def _image_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@lru_cache(maxsize=None)
+def _image(path: str) -> ImageReader:
+    return ImageReader(BytesIO(_image_bytes(path)))
+
+
+def logo() -> BytesIO:
+    """For platypus Image; a new stream per call since Image reads from it."""
+    return BytesIO(_image_bytes(LOGO_PATH))
+
+
+def watermark() -> ImageReader:
+    """For canvas.drawImage."""
+    return _image(WATERMARK_PATH)
+
+
+def clear():
+    """Drop cached images (used by the benchmark to measure cold renders)."""
+    _image_bytes.cache_clear()
+    _image.cache_clear()
@@ -0,0 +1,148 @@
+"""Encode/decode cost and payload size of the cache serializers, per endpoint shape.
+
+Synthetic payloads mirror the cached endpoints (an MSR page of `--rows` rows, a
+dashboard, the districts list). With --redis the encoded frames are written to
+Redis and MEMORY USAGE is reported; --scan reports real memory use per cache
+key_prefix in the configured Redis instead.
+
+    python -m benchmarks.cache_serialization --rows 1000
+    python -m benchmarks.cache_serialization --scan
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import date, timedelta
+from utils.serializers import AVAILABLE, CacheCodec, zstandard
+
+
+def msr_page(rows: int):
+    start = date(2024, 1, 1)
+    return {
+        "items": [
+            {
+                "sl_no": i + 1,
+                "cu_dmm_received": random.choice(["ECIL", "BEL", "DEO Kollam"]),
+                "date_of_receipt": str(start + timedelta(days=i % 90)),
+                "control_unit_no": f"CU{100000 + i}",
+                "cu_manufacture_date": "2023-11",
+                "dmm_no": f"DMM{200000 + i}",
+                "dmm_manufacture_date": "2023-10",
+                "dmm_seal_no": f"S{300000 + i}",
+                "cu_pink_paper_seal_no": f"P{400000 + i}",
+                "flc_date": str(start + timedelta(days=i % 30)),
+                "flc_status": random.choice(["FLC_Passed", "FLC_Failed", "FLC_Pending"]),
+                "cu_box_no": str(i // 10),
+                "cu_warehouse": f"Warehouse {i % 14}",
+                "present_status_dmm": "FLC_Passed",
+                "present_status_cu": "FLC_Passed",
+            }
+            for i in range(rows)
+        ],
+        "next_cursor": "eyJpZCI6MTAwMH0=",
+        "prev_cursor": None,
+        "has_next": True,
+        "has_prev": False,
+        "total_count": rows * 40,
+    }
+
+
+def dashboard():
+    return {
+        t: {"total": 1200, "passed": 1000, "failed": 50, "pending": 150} for t in ("CU", "DMM", "BU")
+    } | {"totals": {"FLC_Pending": 450, "FLC_Passed": 3000, "FLC_Failed": 150}}
+
+
+def districts():
+    return [{"id": i, "name": f"District {i}"} for i in range(1, 15)]
+
+
+def codecs():
+    for serializer, available in AVAILABLE.items():
+        if not available:
+            continue
+        compressions = ["none", "zlib"] + (["zstd"] if zstandard is not None else [])
+        for compression in compressions:
+            yield f"{serializer}+{compression}", CacheCodec(serializer, compression, compress_min_bytes=4096)
+
+
+def measure(codec: CacheCodec, payload, rounds: int):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        blob = codec.pack(payload)
+    encode_us = (time.perf_counter() - start) / rounds * 1e6
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        codec.loads(blob)
+    decode_us = (time.perf_counter() - start) / rounds * 1e6
+
+    # What a hit costs when the JSON body is sent as-is
+    start = time.perf_counter()
+    for _ in range(rounds):
+        codec.unpack(blob)
+    passthrough_us = (time.perf_counter() - start) / rounds * 1e6
+    return blob, encode_us, decode_us, passthrough_us
+
+
+async def redis_memory(blobs):
+    from utils.redis import RedisClient
+    await RedisClient.initialize()
+    client = RedisClient._binary_client
+    usage = {}
+    for key, blob in blobs.items():
+        await client.set(f"bench:{key}", blob, ex=60)
+        usage[key] = await client.memory_usage(f"bench:{key}")
+        await client.delete(f"bench:{key}")
+    await RedisClient.close()
+    return usage
+
+
+async def scan_usage():
+    from utils.redis import RedisClient
+    await RedisClient.initialize()
+    client = RedisClient.get_client()
+    totals = {}
+    async for key in client.scan_iter(count=500):
+        if key.startswith((RedisClient.TAG_PREFIX, RedisClient.LOCK_PREFIX)):
+            continue
+        prefix = key.split(":", 1)[0]
+        count, size = totals.get(prefix, (0, 0))
+        totals[prefix] = (count + 1, size + (await client.memory_usage(key) or 0))
+    await RedisClient.close()
+    for prefix, (count, size) in sorted(totals.items(), key=lambda item: -item[1][1]):
+        print(f"  {prefix:<28} {count:>6} keys  {size / 1024:>10.1f} KiB  {size / count / 1024:>8.1f} KiB/key")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--redis", action="store_true", help="also report Redis MEMORY USAGE per payload")
+    parser.add_argument("--scan", action="store_true", help="report memory per key_prefix of the live cache")
+    args = parser.parse_args()
+
+    if args.scan:
+        asyncio.run(scan_usage())
+        return
+
+    payloads = {"msr_page": msr_page(args.rows), "dashboard": dashboard(), "districts": districts()}
+    baseline = {name: len(json.dumps(p, default=str)) for name, p in payloads.items()}
+    blobs = {}
+
+    for name, payload in payloads.items():
+        print(f"{name} (json.dumps baseline {baseline[name] / 1024:.1f} KiB)")
+        for label, codec in codecs():
+            blob, enc, dec, passthrough = measure(codec, payload, args.rounds)
+            blobs[f"{name}:{label}"] = blob
+            print(f"  {label:<16} {len(blob) / 1024:>8.1f} KiB  encode {enc:>9.1f}us  decode {dec:>9.1f}us  passthrough {passthrough:>8.1f}us")
+
+    if args.redis:
+        print("Redis MEMORY USAGE")
+        for key, size in asyncio.run(redis_memory(blobs)).items():
+            print(f"  {key:<32} {size / 1024:>8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Compare read throughput of the sync engine (via DBExecutor) and the async engine.
+
+Runs the same lookup concurrently through both paths against DATABASE_URL and
+prints requests/second and latency percentiles.
+
+    python -m benchmarks.db_engine_throughput --requests 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from core.db import Database
+from core.user import get_districts, get_districts_async
+from core.components import sec_dashboard, sec_dashboard_async
+from utils.executor import DBExecutor
+
+TARGETS = {
+    "districts": (get_districts, get_districts_async),
+    "sec_dashboard": (sec_dashboard, sec_dashboard_async),
+}
+
+
+async def _drive(call, requests: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(requests)])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+async def main(target: str, requests: int, concurrency: int):
+    Database.initialize()
+    Database.initialize_async()
+    DBExecutor.initialize()
+    sync_fn, async_fn = TARGETS[target]
+
+    # Warm both pools before measuring
+    await _drive(lambda: DBExecutor.run(sync_fn), concurrency, concurrency)
+    await _drive(async_fn, concurrency, concurrency)
+
+    results = {
+        "sync (DBExecutor)": await _drive(lambda: DBExecutor.run(sync_fn), requests, concurrency),
+        "async engine": await _drive(async_fn, requests, concurrency),
+    }
+
+    print(f"{target}: {requests} requests, concurrency {concurrency}")
+    for name, r in results.items():
+        print(f"  {name:<18} {r['rps']:>8.1f} req/s  p50 {r['p50_ms']:.1f}ms  p95 {r['p95_ms']:.1f}ms  p99 {r['p99_ms']:.1f}ms")
+
+    DBExecutor.shutdown()
+    Database._engine.dispose()
+    await Database.dispose_async()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", choices=TARGETS, default="districts")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.target, args.requests, args.concurrency))
@@ -0,0 +1,110 @@
+"""Simulate a burst of logins and report latency percentiles.
+
+Each login is a profile lookup (with --username, against DATABASE_URL) plus a
+bcrypt check, run either inline on the event loop (the old login path) or
+through PasswordHasher. A probe task measures how late the event loop wakes
+up meanwhile, which is what every other request sees during the storm.
+
+    python -m benchmarks.login_storm --logins 500 --concurrency 200 --rounds 12
+    python -m benchmarks.login_storm --username deo_tvm --password secret
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import bcrypt
+from core.db import Database
+from core.user import get_login_profile
+from utils.executor import DBExecutor
+from utils.password import PasswordHasher
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50_ms": statistics.median(samples),
+        "p99_ms": samples[max(int(len(samples) * 0.99) - 1, 0)],
+        "max_ms": samples[-1],
+    }
+
+
+async def _probe(stop: asyncio.Event, lags: list, interval: float = 0.01):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def _storm(check, lookup, logins: int, concurrency: int):
+    latencies, lags = [], []
+    semaphore = asyncio.Semaphore(concurrency)
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(stop, lags))
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            password_hash = await lookup()
+            await check(password_hash)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(logins)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    return {"rps": logins / elapsed, **_percentiles(latencies), "loop_lag_p99_ms": _percentiles(lags or [0])["p99_ms"]}
+
+
+async def main(logins: int, concurrency: int, rounds: int, username: str, password: str):
+    if username:
+        Database.initialize()
+        DBExecutor.initialize()
+        profile = get_login_profile(username)
+        if profile is None:
+            raise SystemExit(f"User {username} not found")
+        password_hash = profile["password_hash"]
+
+        async def lookup():
+            return (await DBExecutor.run(get_login_profile, username))["password_hash"]
+    else:
+        password = password or "benchmark-password"
+        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+        async def lookup():
+            return password_hash
+
+    PasswordHasher.initialize()
+
+    async def inline(stored):
+        bcrypt.checkpw(password.encode('utf-8'), stored.encode('utf-8'))
+
+    async def pooled(stored):
+        await PasswordHasher.verify(password, stored)
+
+    results = {
+        "inline bcrypt": await _storm(inline, lookup, logins, concurrency),
+        "PasswordHasher": await _storm(pooled, lookup, logins, concurrency),
+    }
+
+    print(f"{logins} logins, concurrency {concurrency}, bcrypt cost {password_hash.split('$')[2]}, "
+          f"{PasswordHasher.CONCURRENCY} hash workers")
+    for name, r in results.items():
+        print(f"  {name:<15} {r['rps']:>7.1f} logins/s  p50 {r['p50_ms']:.1f}ms  p99 {r['p99_ms']:.1f}ms  "
+              f"max {r['max_ms']:.1f}ms  loop lag p99 {r['loop_lag_p99_ms']:.1f}ms")
+
+    PasswordHasher.shutdown()
+    if username:
+        DBExecutor.shutdown()
+        Database._engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost for the generated hash")
+    parser.add_argument("--username", help="look the profile up in the database for every login")
+    parser.add_argument("--password", help="password of --username")
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.concurrency, args.rounds, args.username, args.password))
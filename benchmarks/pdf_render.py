@@ -0,0 +1,84 @@
+"""Measure annexure rendering throughput with warm and cold reportlab resources.
+
+Renders the box-wise sticker and the CU FLC certificate into memory and prints
+pages/second. The cold pass drops the shared image cache and rebuilds the
+sample stylesheet before every document, approximating the per-call loading the
+builders did before annexure.resources.
+
+    python -m benchmarks.pdf_render --documents 50 --boxes 20
+"""
+import argparse
+import io
+import re
+import time
+from datetime import datetime
+from reportlab.lib.styles import getSampleStyleSheet
+from annexure import resources
+from annexure.Annex_3 import FLC_Certificate_CU
+from annexure.box_wise_sticker import Box, Component, Box_wise_sticker
+
+PAGE_MARKER = re.compile(rb"/Type /Page\b(?!s)")
+
+
+def _boxes(count: int):
+    return [
+        Box(box_no=str(b + 1), components=[
+            Component(serial_no=f"BU{b:03d}{c:03d}", status="FLC_Passed", flc_date="01-01-2025")
+            for c in range(10)
+        ])
+        for b in range(count)
+    ]
+
+
+def _certificates(count: int):
+    return [
+        {
+            "cu_number": f"CU{i:06d}",
+            "dmm_number": f"DMM{i:06d}",
+            "dmm_seal_no": f"S{i:06d}",
+            "cu_pink_seal": f"P{i:06d}",
+            "passed": i % 7 != 0,
+            "date_of_receipt": datetime(2025, 1, 1),
+        }
+        for i in range(count)
+    ]
+
+
+TARGETS = {
+    "box_sticker": lambda size: (Box_wise_sticker, (_boxes(size), "BU")),
+    "flc_certificate": lambda size: (FLC_Certificate_CU, (_certificates(size * 10),)),
+}
+
+
+def _run(builder, args, documents: int, cold: bool):
+    pages = 0
+    start = time.perf_counter()
+    for _ in range(documents):
+        if cold:
+            resources.clear()
+            getSampleStyleSheet()
+        buffer = io.BytesIO()
+        builder(*args, output=buffer)
+        pages += len(PAGE_MARKER.findall(buffer.getvalue()))
+    elapsed = time.perf_counter() - start
+    return pages, elapsed
+
+
+def main(documents: int, size: int):
+    for target, make in TARGETS.items():
+        builder, args = make(size)
+        # Warm reportlab's own font/glyph caches before measuring
+        builder(*args, output=io.BytesIO())
+
+        print(f"{target}: {documents} documents")
+        for label, cold in (("cold", True), ("warm", False)):
+            pages, elapsed = _run(builder, args, documents, cold)
+            print(f"  {label:<5} {pages / elapsed:>8.1f} pages/s  {documents / elapsed:>7.1f} docs/s  ({pages} pages)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--boxes", type=int, default=20, help="boxes per sticker; certificates get 10x rows")
+    args = parser.parse_args()
+    main(args.documents, args.boxes)
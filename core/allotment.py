@@ -9,13 +9,20 @@ from fastapi.exceptions import HTTPException
 from datetime import datetime, timezone, timedelta
 from zoneinfo import ZoneInfo
 from sqlalchemy.orm import joinedload
-from sqlalchemy import and_
+from sqlalchemy import and_, or_, case, update, insert, select, literal, DateTime
 from models.evm import PairingRecord, EVMComponentType
 from fastapi import Response
 import traceback
 from fastapi.responses import FileResponse
 from core.create_allotment import AllotmentModel
+from core.msr_readmodel import refresh_msr
+from core.names import NameResolver
+from utils.authtoken import Principal
 from sqlalchemy.orm import aliased
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 class AllotmentResponse(BaseModel):
     id: int
@@ -63,6 +70,7 @@ def pending(evm: AllotmentModel, from_user_id: int):
             ))
             comp.status="FLC_Passed/Pending"
 
+        refresh_msr(db, [comp.id for comp in components])
         db.commit()
         
         return {"status_code":200}
@@ -82,12 +90,6 @@ def view_pending_allotments(user_id: int):
         pending_allotments = db.query(
             AllotmentPending,
             component_subquery.c.component_type
-        ).options(
-            joinedload(AllotmentPending.from_local_body),
-            joinedload(AllotmentPending.to_local_body),
-            joinedload(AllotmentPending.from_district),
-            joinedload(AllotmentPending.to_district),
-            joinedload(AllotmentPending.to_user)
         ).outerjoin(
             component_subquery, 
             AllotmentPending.id == component_subquery.c.allotment_pending_id
@@ -95,19 +97,25 @@ def view_pending_allotments(user_id: int):
             AllotmentPending.from_user_id == user_id,
             AllotmentPending.status == "pending"
         ).all()
+        names = NameResolver(db).load(
+            (allotment for allotment, _ in pending_allotments),
+            user=("to_user_id",),
+            district=("from_district_id", "to_district_id"),
+            local_body=("from_local_body_id", "to_local_body_id")
+        )
         
         result = []
         for allotment, component_type in pending_allotments:
             result.append({
                 "id": allotment.id,
                 "allotment_type": allotment.allotment_type,
-                "to_user_name": allotment.to_user.username if allotment.to_user else None,
+                "to_user_name": names.user(allotment.to_user_id),
                 "from_local_body_id": allotment.from_local_body_id,
-                "from_local_body_name": allotment.from_local_body.name if allotment.from_local_body else None,
+                "from_local_body_name": names.local_body(allotment.from_local_body_id),
                 "to_local_body_id": allotment.to_local_body_id,
-                "to_local_body_name": allotment.to_local_body.name if allotment.to_local_body else None,
-                "from_district_name": allotment.from_district.name if allotment.from_district else None,
-                "to_district_name": allotment.to_district.name if allotment.to_district else None,
+                "to_local_body_name": names.local_body(allotment.to_local_body_id),
+                "from_district_name": names.district(allotment.from_district_id),
+                "to_district_name": names.district(allotment.to_district_id),
                 "component_type": component_type,
                 "created_at": allotment.created_at,
             })
@@ -181,15 +189,22 @@ def remove_pending_allotment(pending_allotment_id: int, user_id: int):
             AllotmentItemPending.allotment_pending_id == pending_allotment_id
         ).delete()
 
+        refresh_msr(db, [item.evm_component_id for item in items])
+
         # Delete the pending allotment itself
         db.delete(pending_allotment)
         db.commit()
 
         return {"status_code": 200, "message": "Pending allotment deleted successfully"}
 
-def approve_allotment(allotment_id: int, approver_id: int):
+def approve_allotment(allotment_id: int, approver: Principal):
+    approver_id = approver.user_id
+    timings = {}
+    phase_start = time.perf_counter()
+
     with Database.get_session() as db:
-        allotment = db.query(Allotment).filter(Allotment.id == allotment_id).first()
+        # Lock the allotment row so concurrent approvals of the same allotment serialize here
+        allotment = db.query(Allotment).filter(Allotment.id == allotment_id).with_for_update().first()
         if not allotment:
             raise HTTPException(status_code=403, detail="Allotment not found.")
         if allotment.status == "approved":
@@ -197,19 +212,14 @@ def approve_allotment(allotment_id: int, approver_id: int):
         if allotment.status == "rejected":
             raise HTTPException(status_code=400, detail="Cannot approve a rejected allotment.")
 
-        # Fetch approver user to get warehouse_id
-        approver = db.query(User).filter(User.id == approver_id).first()
-
-        if allotment.is_temporary:
-            allotment.status = "temporary_approved"
-            allotment.approved_by_id = approver_id
-            allotment.approved_at = datetime.now(ZoneInfo("Asia/Kolkata"))
-        else:
-            allotment.status = "approved"
-            allotment.approved_by_id = approver_id
-            allotment.approved_at = datetime.now(ZoneInfo("Asia/Kolkata"))
+        # Read from the database, not the token: the warehouse is persisted on every
+        # component, and an admin may have moved the approver since the token was issued
+        approver_warehouse_id = db.query(User.warehouse_id).filter(User.id == approver_id).scalar()
 
-        updated_component_ids = []
+        now = datetime.now(ZoneInfo("Asia/Kolkata"))
+        allotment.status = "temporary_approved" if allotment.is_temporary else "approved"
+        allotment.approved_by_id = approver_id
+        allotment.approved_at = now
 
         # List of allotment types where warehouse should NOT be updated
         skip_warehouse_update_types = {
@@ -218,42 +228,56 @@ def approve_allotment(allotment_id: int, approver_id: int):
             AllotmentType.MERO_TO_DEO,
             AllotmentType.ERO_TO_DEO,
         }
+        update_warehouse = allotment.allotment_type not in skip_warehouse_update_types
+        timings["lock"] = time.perf_counter() - phase_start
+
+        # 1. Ownership/status transition for the allotted components (UPDATE ... FROM allotment_items)
+        phase_start = time.perf_counter()
+        item_values = {
+            EVMComponent.current_user_id: allotment.to_user_id,
+            EVMComponent.status: case(
+                (EVMComponent.status == "FLC_Passed/Temp", "FLC_Passed"),
+                (EVMComponent.status == "FLC_Pending/Pending", "FLC_Pending"),
+                (EVMComponent.status == "FLC_Passed/Pending", "FLC_Passed"),
+                else_=EVMComponent.status
+            )
+        }
+        if update_warehouse:
+            item_values[EVMComponent.current_warehouse_id] = approver_warehouse_id
+
+        db.execute(
+            update(EVMComponent)
+            .where(
+                EVMComponent.id == AllotmentItem.evm_component_id,
+                AllotmentItem.allotment_id == allotment.id
+            )
+            .values(item_values)
+            .execution_options(synchronize_session=False)
+        )
 
-        for item in allotment.items:
-            component = db.query(EVMComponent).filter(EVMComponent.id == item.evm_component_id).first()
-            if not component:
-                continue
-
-            component.current_user_id = allotment.to_user_id
-
-            if allotment.allotment_type not in skip_warehouse_update_types:
-                component.current_warehouse_id = approver.warehouse_id
-
-            updated_component_ids.append(component.id)
-
-            if component.status == "FLC_Passed/Temp":
-                component.status = "FLC_Passed"
-            elif component.status == "FLC_Pending/Pending":
-                component.status = "FLC_Pending"
-            elif component.status == "FLC_Passed/Pending":
-                component.status = "FLC_Passed"
+        # 2. Ownership transition for every component sharing a pairing with an allotted component
+        item_component = aliased(EVMComponent)
+        item_pairings = select(item_component.pairing_id).join(
+            AllotmentItem, AllotmentItem.evm_component_id == item_component.id
+        ).where(
+            AllotmentItem.allotment_id == allotment.id,
+            item_component.pairing_id.isnot(None)
+        )
 
-            # Update all components in the pairing if any
-            if component.pairing_id:
-                paired_components = db.query(EVMComponent).filter(
-                    EVMComponent.pairing_id == component.pairing_id
-                ).all()
-                for paired in paired_components:
-                    paired.current_user_id = allotment.to_user_id
-                    if allotment.allotment_type not in skip_warehouse_update_types:
-                        paired.current_warehouse_id = approver.warehouse_id
-                    if paired.id not in updated_component_ids:
-                        updated_component_ids.append(paired.id)
+        paired_values = {EVMComponent.current_user_id: allotment.to_user_id}
+        if update_warehouse:
+            paired_values[EVMComponent.current_warehouse_id] = approver_warehouse_id
 
-        db.commit()
-        db.refresh(allotment)
+        db.execute(
+            update(EVMComponent)
+            .where(EVMComponent.pairing_id.in_(item_pairings))
+            .values(paired_values)
+            .execution_options(synchronize_session=False)
+        )
+        timings["transition"] = time.perf_counter() - phase_start
 
         # CREATE LOGS - Add corresponding entries to logs tables
+        phase_start = time.perf_counter()
 
         # 1. Allotment log
         allotment_log = AllotmentLogs(
@@ -269,49 +293,84 @@ def approve_allotment(allotment_id: int, approver_id: int):
             approved_at=allotment.approved_at
         )
         db.add(allotment_log)
-        db.commit()
-        db.refresh(allotment_log)
-
-        # 2. Component logs
-        component_log_ids = []
-        for comp_id in updated_component_ids:
-            component = db.query(EVMComponent).filter(EVMComponent.id == comp_id).first()
-
-            comp_log = EVMComponentLogs(
-                serial_number=component.serial_number,
-                component_type=component.component_type,
-                status=component.status,
-                is_verified=component.is_verified,
-                dom=component.dom,
-                box_no=component.box_no,
-                current_user_id=component.current_user_id,
-                current_warehouse_id=component.current_warehouse_id,
-                pairing_id=component.pairing_id
-            )
-            db.add(comp_log)
-            db.commit()
-            db.refresh(comp_log)
-            component_log_ids.append(comp_log.id)
+        db.flush()
+
+        # 2. Component logs - one INSERT ... SELECT over the allotted and paired components
+        item_ids = select(AllotmentItem.evm_component_id).where(AllotmentItem.allotment_id == allotment.id)
+        component_logs = db.execute(
+            insert(EVMComponentLogs).from_select(
+                [
+                    EVMComponentLogs.serial_number,
+                    EVMComponentLogs.component_type,
+                    EVMComponentLogs.status,
+                    EVMComponentLogs.is_verified,
+                    EVMComponentLogs.dom,
+                    EVMComponentLogs.box_no,
+                    EVMComponentLogs.current_user_id,
+                    EVMComponentLogs.current_warehouse_id,
+                    EVMComponentLogs.pairing_id,
+                    EVMComponentLogs.created_on
+                ],
+                select(
+                    EVMComponent.serial_number,
+                    EVMComponent.component_type,
+                    EVMComponent.status,
+                    EVMComponent.is_verified,
+                    EVMComponent.dom,
+                    EVMComponent.box_no,
+                    EVMComponent.current_user_id,
+                    EVMComponent.current_warehouse_id,
+                    EVMComponent.pairing_id,
+                    literal(now, DateTime(timezone=True))
+                ).where(
+                    or_(
+                        EVMComponent.id.in_(item_ids),
+                        EVMComponent.pairing_id.in_(item_pairings)
+                    )
+                ).order_by(EVMComponent.id)
+            ).returning(EVMComponentLogs.id, EVMComponentLogs.serial_number)
+        ).all()
+        log_id_by_serial = {serial: log_id for log_id, serial in component_logs}
 
         # 3. Allotment item logs
-        for i, item in enumerate(allotment.items):
-            original_component = db.query(EVMComponent).filter(EVMComponent.id == item.evm_component_id).first()
-            matching_log_id = None
+        items = db.query(
+            EVMComponent.serial_number,
+            AllotmentItem.remarks
+        ).join(
+            AllotmentItem, AllotmentItem.evm_component_id == EVMComponent.id
+        ).filter(AllotmentItem.allotment_id == allotment.id).all()
 
-            for j, comp_id in enumerate(updated_component_ids):
-                if comp_id == item.evm_component_id:
-                    matching_log_id = component_log_ids[j]
-                    break
+        item_logs = [
+            {
+                "allotment_id": allotment_log.id,
+                "evm_component_id": log_id_by_serial[serial],
+                "remarks": remarks
+            }
+            for serial, remarks in items
+            if serial in log_id_by_serial
+        ]
+        if item_logs:
+            db.bulk_insert_mappings(AllotmentItemLogs, item_logs)
+        timings["logs"] = time.perf_counter() - phase_start
 
-            if matching_log_id:
-                db.add(AllotmentItemLogs(
-                    allotment_id=allotment_log.id,
-                    evm_component_id=matching_log_id,
-                    remarks=item.remarks
-                ))
+        phase_start = time.perf_counter()
+        refresh_msr(db, [component_id for (component_id,) in db.query(EVMComponent.id).filter(
+            or_(EVMComponent.id.in_(item_ids), EVMComponent.pairing_id.in_(item_pairings))
+        ).all()])
+        timings["msr"] = time.perf_counter() - phase_start
 
+        phase_start = time.perf_counter()
         db.commit()
-        return Response(status_code=200)
+        timings["commit"] = time.perf_counter() - phase_start
+
+        logger.info(
+            f"Allotment {allotment_id} approved: {len(items)} items, {len(component_logs)} components updated "
+            + ", ".join(f"{phase}={duration * 1000:.1f}ms" for phase, duration in timings.items())
+        )
+        return Response(
+            status_code=200,
+            headers={"Server-Timing": ", ".join(f"{phase};dur={duration * 1000:.1f}" for phase, duration in timings.items())}
+        )
 
 def approval_queue(user_id: int):
     with Database.get_session() as session:
@@ -323,18 +382,18 @@ def approval_queue(user_id: int):
             joinedload(Allotment.items)
                 .joinedload(AllotmentItem.evm_component)
                 .joinedload(EVMComponent.pairing)
-                .joinedload(PairingRecord.components),
-            joinedload(Allotment.from_district),
-            joinedload(Allotment.to_district),
-            joinedload(Allotment.from_local_body),
-            joinedload(Allotment.to_local_body),
-            joinedload(Allotment.from_user),
-            joinedload(Allotment.to_user)
+                .joinedload(PairingRecord.components)
         ).all()
 
         if not pending_allotments:
             return {"message": "No pending allotments for approval."}
 
+        names = NameResolver(session).load(
+            pending_allotments,
+            district=("from_district_id", "to_district_id"),
+            local_body=("from_local_body_id", "to_local_body_id")
+        )
+
         return [
             {
                 "id": allotment.id,
@@ -342,13 +401,13 @@ def approval_queue(user_id: int):
                 "from_user_id": allotment.from_user_id,
                 "to_user_id": allotment.to_user_id,
                 "from_district_id": allotment.from_district_id,
-                "from_district_name": allotment.from_district.name if allotment.from_district else None,
+                "from_district_name": names.district(allotment.from_district_id),
                 "to_district_id": allotment.to_district_id,
-                "to_district_name": allotment.to_district.name if allotment.to_district else None,
+                "to_district_name": names.district(allotment.to_district_id),
                 "from_local_body_id": allotment.from_local_body_id,
-                "from_local_body_name": allotment.from_local_body.name if allotment.from_local_body else None,
+                "from_local_body_name": names.local_body(allotment.from_local_body_id),
                 "to_local_body_id": allotment.to_local_body_id,
-                "to_local_body_name": allotment.to_local_body.name if allotment.to_local_body else None,
+                "to_local_body_name": names.local_body(allotment.to_local_body_id),
                 "components": [
                     {
                         "component_type": item.evm_component.component_type,
@@ -381,9 +440,6 @@ def reject_allotment(allotment_id: int, reject_reason: str, approver_id: int):
         if allotment.status == "rejected":
             raise HTTPException(status_code=400, detail="Allotment already rejected.")
 
-        approver = db.query(User).filter(User.id == approver_id).first()
-
-
         # Just mark as rejected — don't update component ownership
         allotment.status = "rejected"
         allotment.approved_by_id = approver_id
@@ -442,6 +498,7 @@ def reject_allotment(allotment_id: int, reject_reason: str, approver_id: int):
                     remarks=item.remarks
                 ))
 
+        refresh_msr(db, [item.evm_component_id for item in allotment.items])
         db.commit()
         return Response(status_code=200)
 
@@ -497,6 +554,7 @@ def return_temporary_allotment(allotment_id: int, return_date: str, user_id: int
                 )
                 db.add(comp_log)
 
+            refresh_msr(db, component_ids)
             db.commit()
             db.refresh(allotment)
             db.refresh(allotment_log)
@@ -583,19 +641,19 @@ def view_all_allotments_deo(district_id: str): # For DEO: View all allotments in
             (Allotment.to_district_id == district_id) | 
             (from_lb.district_id == district_id) | 
             (to_lb.district_id == district_id) 
-        ).options( 
-            joinedload(Allotment.from_local_body), 
-            joinedload(Allotment.to_local_body),
-            joinedload(Allotment.from_user),
-            joinedload(Allotment.to_user)
         ).all() 
+        names = NameResolver(db).load(
+            allotments,
+            user=("from_user_id", "to_user_id"),
+            local_body=("from_local_body_id", "to_local_body_id")
+        )
          
         return [{ 
             "id": a.id, 
-            "from_user": a.from_user.username if a.from_user else None,
-            "to_user": a.to_user.username if a.to_user else None,
-            "from_local_body": a.from_local_body.name if a.from_local_body else None, 
-            "to_local_body": a.to_local_body.name if a.to_local_body else None, 
+            "from_user": names.user(a.from_user_id),
+            "to_user": names.user(a.to_user_id),
+            "from_local_body": names.local_body(a.from_local_body_id), 
+            "to_local_body": names.local_body(a.to_local_body_id), 
             "status": a.status, 
             "created_at": a.created_at.isoformat(), 
         } for a in allotments] 
@@ -604,23 +662,28 @@ def view_all_allotments_deo(district_id: str): # For DEO: View all allotments in
      
 def view_all_allotments_sec():  # For SEC: View all allotments across all districts 
     with Database.get_session() as db: 
-        allotments = db.query(Allotment).options( 
-            joinedload(Allotment.from_local_body).joinedload(LocalBody.district), 
-            joinedload(Allotment.to_local_body).joinedload(LocalBody.district),
-            joinedload(Allotment.from_user),
-            joinedload(Allotment.to_user)
-        ).all() 
+        allotments = db.query(Allotment).all() 
+        names = NameResolver(db).load(
+            allotments,
+            user=("from_user_id", "to_user_id"),
+            local_body=("from_local_body_id", "to_local_body_id")
+        )
+        names.resolve("district", (
+            names.local_body_district_id(lb_id)
+            for a in allotments
+            for lb_id in (a.from_local_body_id, a.to_local_body_id)
+        ))
  
         result = [] 
         for a in allotments: 
             result.append({ 
                 "id": a.id, 
-                "from_user": a.from_user.username if a.from_user else None,
-                "to_user": a.to_user.username if a.to_user else None,
-                "from_local_body": a.from_local_body.name if a.from_local_body else None, 
-                "from_district": a.from_local_body.district.name if a.from_local_body and a.from_local_body.district else None, 
-                "to_local_body": a.to_local_body.name if a.to_local_body else None, 
-                "to_district": a.to_local_body.district.name if a.to_local_body and a.to_local_body.district else None, 
+                "from_user": names.user(a.from_user_id),
+                "to_user": names.user(a.to_user_id),
+                "from_local_body": names.local_body(a.from_local_body_id), 
+                "from_district": names.district(names.local_body_district_id(a.from_local_body_id)), 
+                "to_local_body": names.local_body(a.to_local_body_id), 
+                "to_district": names.district(names.local_body_district_id(a.to_local_body_id)), 
                 "status": a.status, 
                 "created_at": a.created_at.isoformat(), 
             }) 
@@ -1,6 +1,6 @@
 from sqlalchemy import func, cast, Integer,distinct, or_
 from datetime import timedelta, datetime,date
-from fastapi.responses import FileResponse
+from fastapi import HTTPException
 from models.evm import FLCRecord, FLCBallotUnit, EVMComponent
 from models.users import User, District  
 from annexure.Appendix_1 import appendix_1
@@ -11,7 +11,7 @@ from models.users import District, User
 from annexure.Appendix_2 import appendix_2
 from annexure.Appendix_3 import appendix_3
 from fastapi import BackgroundTasks
-from utils.delete_file import remove_file
+from utils.pdf_renderer import PDFRenderer, pdf_response
 from annexure.daily_report import daily_report
 from typing import List
 from datetime import datetime, timedelta
@@ -19,7 +19,7 @@ from sqlalchemy import func, and_, or_
 from typing import List, Dict, Tuple
 import logging
 
-def generate_daily_flc_report(district_id: int, background_tasks: BackgroundTasks):
+def render_daily_flc_report(district_id: int):
     with Database.get_session() as db_session:
         # Validate district exists
         district = db_session.query(District).filter(District.id == district_id).first()
@@ -108,26 +108,20 @@ def generate_daily_flc_report(district_id: int, background_tasks: BackgroundTask
                 cu_running_total += cu_on_date
                 bu_running_total += bu_on_date
         
-        # Generate PDF report
-        try:
-            pdf_path = appendix_1(daily_data, district_name)
-            filename = os.path.basename(pdf_path)
-
-            if not os.path.exists(pdf_path):
-                raise FileNotFoundError(f"Generated PDF file not found at {pdf_path}")
-                
-            background_tasks.add_task(remove_file, filename)
-            return FileResponse(
-                path=pdf_path,
-                filename=filename,
-                media_type='application/pdf',
-                headers={"Content-Disposition": f"attachment; filename={filename}"}
-            )
-            
-        except Exception as e:
-            raise RuntimeError(f"Failed to generate FLC report for district {district_id}: {str(e)}")
+    # Generate PDF report
+    try:
+        return PDFRenderer.render(appendix_1, daily_data, district_name, cache=True)
         
-def generate_flc_appendix2(district_id: int, background_tasks: BackgroundTasks):
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Failed to generate FLC report for district {district_id}: {str(e)}")
+
+
+def generate_daily_flc_report(district_id: int, background_tasks: BackgroundTasks):
+    return pdf_response(render_daily_flc_report(district_id))
+
+def render_flc_appendix2(district_id: int):
     end_date = date.today()
     
     with Database.get_session() as db:
@@ -205,16 +199,11 @@ def generate_flc_appendix2(district_id: int, background_tasks: BackgroundTasks):
                     'remarks': remarks
                 }]
         
-        pdf_path = appendix_2(flc_data, district_name)
-        filename = os.path.basename(pdf_path)
+    return PDFRenderer.render(appendix_2, flc_data, district_name, cache=True)
 
-        background_tasks.add_task(remove_file, pdf_path)
 
-        return FileResponse(
-            pdf_path,
-            media_type='application/pdf',
-            filename=filename
-        )
+def generate_flc_appendix2(district_id: int, background_tasks: BackgroundTasks):
+    return pdf_response(render_flc_appendix2(district_id))
 
 
 def generate_appendix3_for_district(
@@ -262,27 +251,17 @@ def generate_appendix3_for_district(
             'bu_passed': bu_passed,
             'bu_rejected': bu_rejected
         }
-        
-        pdf_path = appendix_3(
-            joining_date=joining_date,
-            members=members,
-            evm_data=evm_data,
-            free_accommodation=free_accommodation,
-            local_conveyance=local_conveyance,
-            relieving_date=relieving_date,
-  
-        )
 
-        filename = os.path.basename(pdf_path)
-
-        background_tasks.add_task(remove_file, filename)
-
-        return FileResponse(
-            path=pdf_path,
-            filename=filename,
-            media_type='application/pdf',
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
+    pdf = PDFRenderer.render(
+        appendix_3,
+        joining_date=joining_date,
+        members=members,
+        evm_data=evm_data,
+        free_accommodation=free_accommodation,
+        local_conveyance=local_conveyance,
+        relieving_date=relieving_date,
+    )
+    return pdf_response(pdf)
 
 
 def get_flc_report_data(report_date: str) -> Tuple[List[Dict], str, Dict]:
@@ -370,20 +349,21 @@ def get_flc_report_data(report_date: str) -> Tuple[List[Dict], str, Dict]:
         logging.error(f"Error fetching FLC report data: {str(e)}")
         raise Exception(f"Failed to fetch FLC report data: {str(e)}")
     
-def generate_flc_report_sec(background_tasks: BackgroundTasks,report_date: str) -> str:
+def render_flc_report_sec(report_date: str):
     try:
         
         district_data, formatted_date, totals = get_flc_report_data(report_date)
         
-        pdf_path = daily_report(district_data, formatted_date, totals)
-        background_tasks.add_task(remove_file, pdf_path)
-        logging.info(f"Successfully generated FLC daily report: {pdf_path}")
-        return FileResponse(
-                path=pdf_path,
-                media_type='application/pdf',
-                headers={"Content-Disposition": f"attachment; filename={pdf_path}"}
-            )
+        pdf = PDFRenderer.render(daily_report, district_data, formatted_date, totals)
+        logging.info(f"Successfully generated FLC daily report: {pdf.filename}")
+        return pdf
         
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error generating FLC daily report: {str(e)}")
-        raise Exception(f"Failed to generate FLC daily report: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Failed to generate FLC daily report: {str(e)}")
+
+
+def generate_flc_report_sec(background_tasks: BackgroundTasks,report_date: str):
+    return pdf_response(render_flc_report_sec(report_date))
@@ -6,7 +6,6 @@ import os
 import logging
 import traceback
 from fastapi import HTTPException,BackgroundTasks
-from fastapi.responses import FileResponse
 from sqlalchemy.exc import SQLAlchemyError
 from core.db import Database
 from pydantic import BaseModel
@@ -19,7 +18,10 @@ from models.logs import(
 )
 from annexure.Annex_8 import EVMDetail,RO_PRO
 import uuid
-from utils.delete_file import remove_file
+from utils.pdf_renderer import PDFRenderer, pdf_response
+from core.msr_readmodel import refresh_msr
+from core.names import NameResolver
+from utils.authtoken import Principal
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -36,115 +38,144 @@ class ReserveEVMCommissioningModel(BaseModel):
     bu_serial: List[str]
     bu_pink_paper_seals: List[str]
 
-def evm_commissioning(background_tasks: BackgroundTasks,commissioning_list: List[EVMCommissioningModel], user_id: int):
+def evm_commissioning(background_tasks: BackgroundTasks,commissioning_list: List[EVMCommissioningModel], principal: Principal):
     """
     EVM Commissioning fn called by RO
     """
+    user_id = principal.user_id
     if not commissioning_list:
         raise HTTPException(status_code=400, detail="No commissioning data provided")
     
     with Database.get_session() as db:
         validation_errors = []
         
-        # PHASE 1: COMPLETE VALIDATION (No database changes)
-        logger.info(f"Starting validation for {len(commissioning_list)} EVM records")
+        # PHASE 0: PRELOAD every referenced record with a handful of IN-list queries
+        logger.info(f"Preloading references for {len(commissioning_list)} EVM records")
         
         try:
-            for idx, commissioning_data in enumerate(commissioning_list):
-                row_num = idx + 1
-                
-                # Validate polling station number
+            cu_serials = {data.cu_serial for data in commissioning_list}
+            bu_serials = {serial for data in commissioning_list for serial in data.bu_serial}
+            seal_serials = {serial for data in commissioning_list for serial in data.bu_pink_paper_seals}
+            ps_ids = set()
+            for data in commissioning_list:
                 try:
-                    ps_no = int(commissioning_data.ps_no)
+                    ps_ids.add(int(data.ps_no))
                 except (ValueError, TypeError):
-                    validation_errors.append(f"Row {row_num}: Invalid polling station number: {commissioning_data.ps_no}")
-                    continue
-                
-                # Validate CU exists and has pairing
-                cu = db.query(EVMComponent).filter(
-                    EVMComponent.serial_number == commissioning_data.cu_serial,
+                    pass
+            
+            cus = {
+                cu.serial_number: cu for cu in db.query(EVMComponent).filter(
+                    EVMComponent.serial_number.in_(cu_serials),
                     EVMComponent.component_type == EVMComponentType.CU
-                ).first()
-                
-                if not cu:
-                    validation_errors.append(f"Row {row_num}: CU {commissioning_data.cu_serial} not found")
-                    continue
-                
-                if not cu.pairing_id:
-                    validation_errors.append(f"Row {row_num}: CU {commissioning_data.cu_serial} has no pairing record")
-                    continue
-                
-                # Validate pairing record
-                pairing = db.query(PairingRecord).filter(
-                    PairingRecord.id == cu.pairing_id
-                ).first()
-                
-                if not pairing:
-                    validation_errors.append(f"Row {row_num}: Pairing record not found")
-                    continue
-                
-                # Check if already commissioned
-                if pairing.polling_station_id:
-                    validation_errors.append(f"Row {row_num}: Already assigned to polling station {pairing.polling_station_id}")
-                    continue
-                
-                if pairing.evm_id:
-                    validation_errors.append(f"Row {row_num}: Already has EVM number {pairing.evm_id}")
-                    continue
-                
-                # Validate polling station exists
-                polling_station = db.query(PollingStation).filter(
-                    PollingStation.id == ps_no
-                ).first()
-                
-                if not polling_station:
-                    validation_errors.append(f"Row {row_num}: Polling station {ps_no} not found")
-                    continue
-                
-                # Validate all BUs
-                if not commissioning_data.bu_serial:
-                    validation_errors.append(f"Row {row_num}: No BU serials provided")
-                    continue
-                
-                # Validate BU pink paper seals count matches BU count
-                if len(commissioning_data.bu_pink_paper_seals) != len(commissioning_data.bu_serial):
-                    validation_errors.append(f"Row {row_num}: BU pink paper seals count ({len(commissioning_data.bu_pink_paper_seals)}) must match BU count ({len(commissioning_data.bu_serial)})")
-                    continue
-                
-                # Check for duplicate BU pink paper seal serials within this commissioning
-                if len(set(commissioning_data.bu_pink_paper_seals)) != len(commissioning_data.bu_pink_paper_seals):
-                    validation_errors.append(f"Row {row_num}: Duplicate BU pink paper seal serials found")
-                    continue
-                
-                for bu_serial in commissioning_data.bu_serial:
-                    bu = db.query(EVMComponent).filter(
-                        EVMComponent.serial_number == bu_serial,
-                        EVMComponent.component_type == EVMComponentType.BU
-                    ).first()
-                    
-                    if not bu:
-                        validation_errors.append(f"Row {row_num}: BU {bu_serial} not found")
-                    elif bu.pairing_id and bu.pairing_id != cu.pairing_id:
-                        validation_errors.append(f"Row {row_num}: BU {bu_serial} already assigned elsewhere")
-                
-                # Validate BU pink paper seals (check if they already exist and are available)
-                for seal_serial in commissioning_data.bu_pink_paper_seals:
-                    existing_seal = db.query(EVMComponent).filter(
-                        EVMComponent.serial_number == seal_serial,
-                        EVMComponent.component_type == EVMComponentType.BU_PINK_PAPER_SEAL
-                    ).first()
-                    
-                    if existing_seal and existing_seal.pairing_id:
-                        validation_errors.append(f"Row {row_num}: BU pink paper seal {seal_serial} already assigned to another pairing")
-                
+                ).all()
+            }
+            bus = {
+                bu.serial_number: bu for bu in db.query(EVMComponent).filter(
+                    EVMComponent.serial_number.in_(bu_serials),
+                    EVMComponent.component_type == EVMComponentType.BU
+                ).all()
+            } if bu_serials else {}
+            seals = {
+                seal.serial_number: seal for seal in db.query(EVMComponent).filter(
+                    EVMComponent.serial_number.in_(seal_serials),
+                    EVMComponent.component_type == EVMComponentType.BU_PINK_PAPER_SEAL
+                ).all()
+            } if seal_serials else {}
+            
+            pairing_ids = {cu.pairing_id for cu in cus.values() if cu.pairing_id}
+            pairings = {
+                pairing.id: pairing for pairing in db.query(PairingRecord).filter(
+                    PairingRecord.id.in_(pairing_ids)
+                ).all()
+            } if pairing_ids else {}
+            polling_stations = {
+                ps.id: ps for ps in db.query(PollingStation).filter(
+                    PollingStation.id.in_(ps_ids)
+                ).all()
+            } if ps_ids else {}
         except Exception as e:
-            logger.error(f"Validation error: {str(e)}")
+            logger.error(f"Preload error: {str(e)}")
             logger.error(traceback.format_exc())
             raise HTTPException(
                 status_code=500,
                 detail=f"Error during validation: {str(e)}"
             )
         
+        # PHASE 1: COMPLETE VALIDATION (No database changes)
+        logger.info(f"Starting validation for {len(commissioning_list)} EVM records")
+        
+        for idx, commissioning_data in enumerate(commissioning_list):
+            row_num = idx + 1
+            
+            # Validate polling station number
+            try:
+                ps_no = int(commissioning_data.ps_no)
+            except (ValueError, TypeError):
+                validation_errors.append(f"Row {row_num}: Invalid polling station number: {commissioning_data.ps_no}")
+                continue
+            
+            # Validate CU exists and has pairing
+            cu = cus.get(commissioning_data.cu_serial)
+            
+            if not cu:
+                validation_errors.append(f"Row {row_num}: CU {commissioning_data.cu_serial} not found")
+                continue
+            
+            if not cu.pairing_id:
+                validation_errors.append(f"Row {row_num}: CU {commissioning_data.cu_serial} has no pairing record")
+                continue
+            
+            # Validate pairing record
+            pairing = pairings.get(cu.pairing_id)
+            
+            if not pairing:
+                validation_errors.append(f"Row {row_num}: Pairing record not found")
+                continue
+            
+            # Check if already commissioned
+            if pairing.polling_station_id:
+                validation_errors.append(f"Row {row_num}: Already assigned to polling station {pairing.polling_station_id}")
+                continue
+            
+            if pairing.evm_id:
+                validation_errors.append(f"Row {row_num}: Already has EVM number {pairing.evm_id}")
+                continue
+            
+            # Validate polling station exists
+            if ps_no not in polling_stations:
+                validation_errors.append(f"Row {row_num}: Polling station {ps_no} not found")
+                continue
+            
+            # Validate all BUs
+            if not commissioning_data.bu_serial:
+                validation_errors.append(f"Row {row_num}: No BU serials provided")
+                continue
+            
+            # Validate BU pink paper seals count matches BU count
+            if len(commissioning_data.bu_pink_paper_seals) != len(commissioning_data.bu_serial):
+                validation_errors.append(f"Row {row_num}: BU pink paper seals count ({len(commissioning_data.bu_pink_paper_seals)}) must match BU count ({len(commissioning_data.bu_serial)})")
+                continue
+            
+            # Check for duplicate BU pink paper seal serials within this commissioning
+            if len(set(commissioning_data.bu_pink_paper_seals)) != len(commissioning_data.bu_pink_paper_seals):
+                validation_errors.append(f"Row {row_num}: Duplicate BU pink paper seal serials found")
+                continue
+            
+            for bu_serial in commissioning_data.bu_serial:
+                bu = bus.get(bu_serial)
+                
+                if not bu:
+                    validation_errors.append(f"Row {row_num}: BU {bu_serial} not found")
+                elif bu.pairing_id and bu.pairing_id != cu.pairing_id:
+                    validation_errors.append(f"Row {row_num}: BU {bu_serial} already assigned elsewhere")
+            
+            # Validate BU pink paper seals (check if they already exist and are available)
+            for seal_serial in commissioning_data.bu_pink_paper_seals:
+                existing_seal = seals.get(seal_serial)
+                
+                if existing_seal and existing_seal.pairing_id:
+                    validation_errors.append(f"Row {row_num}: BU pink paper seal {seal_serial} already assigned to another pairing")
+        
         # If ANY validation errors, reject entire batch
         if validation_errors:
             logger.warning(f"Validation failed with {len(validation_errors)} errors")
@@ -161,20 +192,15 @@ def evm_commissioning(background_tasks: BackgroundTasks,commissioning_list: List
         
         try:
             current_time = datetime.now(ZoneInfo("Asia/Kolkata"))
+            new_seals = {}
             
             # Apply all database changes in single transaction
             for commissioning_data in commissioning_list:
                 ps_no = int(commissioning_data.ps_no)
                 
                 # Get CU and pairing (validated above, so they exist)
-                cu = db.query(EVMComponent).filter(
-                    EVMComponent.serial_number == commissioning_data.cu_serial,
-                    EVMComponent.component_type == EVMComponentType.CU
-                ).first()
-                
-                pairing = db.query(PairingRecord).filter(
-                    PairingRecord.id == cu.pairing_id
-                ).first()
+                cu = cus[commissioning_data.cu_serial]
+                pairing = pairings[cu.pairing_id]
                 
                 # Update pairing record
                 pairing.evm_id = commissioning_data.evm_no
@@ -186,26 +212,16 @@ def evm_commissioning(background_tasks: BackgroundTasks,commissioning_list: List
                 cu.status = "polling"
                 
                 # Update all BUs in this pairing and create/assign BU pink paper seals
-                for i, bu_serial in enumerate(commissioning_data.bu_serial):
-                    bu = db.query(EVMComponent).filter(
-                        EVMComponent.serial_number == bu_serial,
-                        EVMComponent.component_type == EVMComponentType.BU
-                    ).first()
+                for bu_serial, seal_serial in zip(commissioning_data.bu_serial, commissioning_data.bu_pink_paper_seals):
+                    bu = bus[bu_serial]
                     bu.pairing_id = cu.pairing_id
                     bu.status = "polling"
                     
-                    # Handle BU pink paper seal
-                    seal_serial = commissioning_data.bu_pink_paper_seals[i]
-                    
-                    # Check if BU pink paper seal already exists
-                    bu_pink_seal = db.query(EVMComponent).filter(
-                        EVMComponent.serial_number == seal_serial,
-                        EVMComponent.component_type == EVMComponentType.BU_PINK_PAPER_SEAL
-                    ).first()
+                    bu_pink_seal = seals.get(seal_serial)
                     
                     if not bu_pink_seal:
-                        # Create new BU pink paper seal inheriting from corresponding BU
-                        bu_pink_seal = EVMComponent(
+                        # New BU pink paper seal inheriting from corresponding BU, inserted in bulk below
+                        new_seals[seal_serial] = dict(
                             serial_number=seal_serial,
                             component_type=EVMComponentType.BU_PINK_PAPER_SEAL,
                             status="polling",  # Same as BU
@@ -218,35 +234,33 @@ def evm_commissioning(background_tasks: BackgroundTasks,commissioning_list: List
                             pairing_id=bu.pairing_id,
                             is_sec_approved=True
                         )
-                        db.add(bu_pink_seal)
                     else:
                         # Update existing BU pink paper seal
                         bu_pink_seal.pairing_id = bu.pairing_id
                         bu_pink_seal.status = "polling"
                         bu_pink_seal.current_user_id = bu.current_user_id
                         bu_pink_seal.current_warehouse_id = bu.current_warehouse_id
-                
-                # Update other components (DMM, seals, etc.)
-                other_components = db.query(EVMComponent).filter(
-                    EVMComponent.pairing_id == cu.pairing_id,
-                    EVMComponent.component_type.in_([
-                        EVMComponentType.DMM,
-                        EVMComponentType.DMM_SEAL,
-                        EVMComponentType.PINK_PAPER_SEAL
-                    ])
-                ).all()
-                
-                for component in other_components:
-                    component.status = "polling"
             
-            # Commit all changes
-            db.commit()
+            db.flush()
+            if new_seals:
+                db.bulk_insert_mappings(EVMComponent, list(new_seals.values()))
+            
+            # Update other components (DMM, seals, etc.)
+            db.query(EVMComponent).filter(
+                EVMComponent.pairing_id.in_(pairing_ids),
+                EVMComponent.component_type.in_([
+                    EVMComponentType.DMM,
+                    EVMComponentType.DMM_SEAL,
+                    EVMComponentType.PINK_PAPER_SEAL
+                ])
+            ).update({EVMComponent.status: "polling"}, synchronize_session=False)
+            
             logger.info("Database operations completed successfully")
             # PHASE 2.5: MARK REMAINING USER'S COMPONENTS AS RESERVE
             logger.info("Marking remaining user components as reserve")
             
-            # Get all components belonging to current user that are not commissioned
-            remaining_components = db.query(EVMComponent).filter(
+            # All components belonging to current user that are not commissioned
+            reserve_query = db.query(EVMComponent).filter(
                 EVMComponent.current_user_id == user_id,
                 EVMComponent.status.in_(["FLC_Pending", "available", "paired"]),
                 ~EVMComponent.pairing_id.in_(
@@ -254,32 +268,27 @@ def evm_commissioning(background_tasks: BackgroundTasks,commissioning_list: List
                         PairingRecord.polling_station_id.isnot(None)
                     )
                 )
-            ).all()
-            
-            # Update status to reserve for all remaining components
-            for component in remaining_components:
-                component.status = "reserve"
+            )
+            reserve_ids = [component_id for (component_id,) in reserve_query.with_entities(EVMComponent.id).all()]
+            reserve_count = reserve_query.update({EVMComponent.status: "reserve"}, synchronize_session=False)
             
-            db.commit()
-            logger.info(f"Marked {len(remaining_components)} components as reserve")
+            logger.info(f"Marked {reserve_count} components as reserve")
             # PHASE 3: CREATE AUDIT LOGS
             logger.info("Creating audit logs")
             
+            # Single pass over every component of the commissioned pairings, reused for the PDF
+            components_by_pairing = {}
+            for component in db.query(EVMComponent).filter(
+                EVMComponent.pairing_id.in_(pairing_ids)
+            ).order_by(EVMComponent.id).all():
+                components_by_pairing.setdefault(component.pairing_id, []).append(component)
+            
+            pairing_logs = {}
             for commissioning_data in commissioning_list:
-                ps_no = int(commissioning_data.ps_no)
-                
-                # Get updated records
-                cu = db.query(EVMComponent).filter(
-                    EVMComponent.serial_number == commissioning_data.cu_serial,
-                    EVMComponent.component_type == EVMComponentType.CU
-                ).first()
-                
-                pairing = db.query(PairingRecord).filter(
-                    PairingRecord.id == cu.pairing_id
-                ).first()
+                pairing = pairings[cus[commissioning_data.cu_serial].pairing_id]
                 
                 # Create pairing log
-                pairing_log = PairingRecordLogs(
+                pairing_logs[pairing.id] = PairingRecordLogs(
                     evm_id=pairing.evm_id,
                     polling_station_id=pairing.polling_station_id,
                     created_by_id=pairing.created_by_id,
@@ -287,29 +296,61 @@ def evm_commissioning(background_tasks: BackgroundTasks,commissioning_list: List
                     completed_by_id=pairing.completed_by_id,
                     completed_at=pairing.completed_at
                 )
-                db.add(pairing_log)
-                db.commit()
-                db.refresh(pairing_log)
-                
-                # Create component logs
-                all_components = db.query(EVMComponent).filter(
-                    EVMComponent.pairing_id == cu.pairing_id
-                ).all()
+            db.add_all(pairing_logs.values())
+            db.flush()
+            
+            # Create component logs
+            db.bulk_insert_mappings(EVMComponentLogs, [
+                dict(
+                    serial_number=component.serial_number,
+                    component_type=component.component_type,
+                    status=component.status,
+                    is_verified=component.is_verified,
+                    dom=component.dom,
+                    box_no=component.box_no,
+                    current_user_id=component.current_user_id,
+                    current_warehouse_id=component.current_warehouse_id,
+                    pairing_id=pairing_log.id,
+                    created_on=current_time
+                )
+                for pairing_id, pairing_log in pairing_logs.items()
+                for component in components_by_pairing.get(pairing_id, [])
+            ])
+            
+            # Collect data for PDF while the records are still loaded (commit expires them)
+            pdf_details = []
+            for commissioning_data in commissioning_list:
+                ps_no = int(commissioning_data.ps_no)
                 
-                for component in all_components:
-                    comp_log = EVMComponentLogs(
-                        serial_number=component.serial_number,
-                        component_type=component.component_type,
-                        status=component.status,
-                        is_verified=component.is_verified,
-                        dom=component.dom,
-                        box_no=component.box_no,
-                        current_user_id=component.current_user_id,
-                        current_warehouse_id=component.current_warehouse_id,
-                        pairing_id=pairing_log.id
-                    )
-                    db.add(comp_log)
+                # Get commissioned data
+                cu = cus[commissioning_data.cu_serial]
+                pairing = pairings[cu.pairing_id]
+                polling_station = polling_stations[ps_no]
+                
+                # Get related components
+                related = components_by_pairing.get(cu.pairing_id, [])
+                bu_components = [c for c in related if c.component_type == EVMComponentType.BU]
+                dmm = next((c for c in related if c.component_type == EVMComponentType.DMM), None)
+                bu_pink_seals = [c for c in related if c.component_type == EVMComponentType.BU_PINK_PAPER_SEAL]
+                
+                # Create EVM detail
+                evm_detail = EVMDetail(
+                    evm_no=pairing.evm_id,
+                    constituency_ward_no="1",
+                    polling_station_no=str(polling_station.id),
+                    control_unit_no=cu.serial_number,
+                    dmm_no=dmm.serial_number if dmm else "",
+                    bu_nos=[bu.serial_number for bu in bu_components],
+                    bu_pink_paper_seal_nos=[seal.serial_number for seal in bu_pink_seals]
+                )
                 
+                pdf_details.append(evm_detail)
+            
+            refresh_msr(db, reserve_ids + [
+                component.id for components in components_by_pairing.values() for component in components
+            ])
+            
+            # Commit all changes
             db.commit()
             logger.info("Audit logs created successfully")
             
@@ -317,95 +358,29 @@ def evm_commissioning(background_tasks: BackgroundTasks,commissioning_list: List
             logger.info("Generating PDF report")
             
             try:
-                # Collect data for PDF
-                pdf_details = []
-                user = db.query(User).filter(User.id == user_id).first()
-                
-                if not user:
-                    raise Exception(f"User {user_id} not found")
-                
-                for commissioning_data in commissioning_list:
-                    ps_no = int(commissioning_data.ps_no)
-                    
-                    # Get commissioned data
-                    cu = db.query(EVMComponent).filter(
-                        EVMComponent.serial_number == commissioning_data.cu_serial,
-                        EVMComponent.component_type == EVMComponentType.CU
-                    ).first()
-                    
-                    pairing = db.query(PairingRecord).filter(
-                        PairingRecord.id == cu.pairing_id
-                    ).first()
-                    
-                    polling_station = db.query(PollingStation).filter(
-                        PollingStation.id == ps_no
-                    ).first()
-                    
-                    # Get related components
-                    bus = db.query(EVMComponent).filter(
-                        EVMComponent.pairing_id == cu.pairing_id,
-                        EVMComponent.component_type == EVMComponentType.BU
-                    ).all()
-                    
-                    dmm = db.query(EVMComponent).filter(
-                        EVMComponent.pairing_id == cu.pairing_id,
-                        EVMComponent.component_type == EVMComponentType.DMM
-                    ).first()
-                    
-                    pink_seals = db.query(EVMComponent).filter(
-                        EVMComponent.pairing_id == cu.pairing_id,
-                        EVMComponent.component_type == EVMComponentType.PINK_PAPER_SEAL
-                    ).all()
-                    
-                    # Get BU pink paper seals
-                    bu_pink_seals = db.query(EVMComponent).filter(
-                        EVMComponent.pairing_id == cu.pairing_id,
-                        EVMComponent.component_type == EVMComponentType.BU_PINK_PAPER_SEAL
-                    ).all()
-                    
-                    # Create EVM detail
-                    evm_detail = EVMDetail(
-                        evm_no=pairing.evm_id,
-                        constituency_ward_no="1",
-                        polling_station_no=str(polling_station.id),
-                        control_unit_no=cu.serial_number,
-                        dmm_no=dmm.serial_number if dmm else "",
-                        bu_nos=[bu.serial_number for bu in bus],
-                        bu_pink_paper_seal_nos=[seal.serial_number for seal in bu_pink_seals]
-                    )
-                    
-                    pdf_details.append(evm_detail)
-                
                 # Generate PDF
-                temp_dir = tempfile.gettempdir()
                 filename = f"EVM_Commissioning_{uuid.uuid4()}.pdf"
-                pdf_path = os.path.join(temp_dir, filename)
                 
                 # Get user details for PDF header
-                district_name = user.district.name if user.district else "Unknown District"
-                local_body_name = user.local_body.name if user.local_body else "Unknown Local Body"
-                ro_name = user.username
-                strongroom_name = user.warehouse.name if user.warehouse else "Strongroom 1"
-                
-                RO_PRO(
+                names = NameResolver(db)
+                district_name = names.district(principal.district_id) or "Unknown District"
+                local_body_name = names.local_body(principal.local_body_id) or "Unknown Local Body"
+                ro_name = principal.username
+                strongroom_name = names.warehouse(principal.warehouse_id) or "Strongroom 1"
+                
+                pdf = PDFRenderer.render(
+                    RO_PRO,
                     details=pdf_details,
                     district=district_name,
                     local_body=local_body_name,
                     RO=ro_name,
                     strongroom=strongroom_name,
-                    filename=pdf_path
+                    filename=filename
                 )
                 
-                logger.info(f"PDF generated successfully: {filename}")
+                logger.info(f"PDF generated successfully: {pdf.filename}")
 
-                background_tasks.add_task(remove_file, filename)
-
-                return FileResponse(
-                    path=pdf_path,
-                    filename=filename,
-                    media_type='application/pdf',
-                    headers={"Content-Disposition": f"attachment; filename={filename}"}
-                )
+                return pdf_response(pdf)
                 
             except Exception as pdf_error:
                 logger.error(f"PDF generation failed: {str(pdf_error)}")
@@ -471,6 +446,7 @@ def allot_reserve_evm_to_polling_station(
             if not polling_station:
                 raise HTTPException(status_code=404, detail="Polling station not found")
 
+            touched_ids = []
             for commissioning_data in commissioning_list:
                 # Get reserve CU
                 cu = db.query(EVMComponent).filter(
@@ -492,6 +468,7 @@ def allot_reserve_evm_to_polling_station(
                         raise HTTPException(status_code=400, detail=f"Reserve BU {bu_serial} not found")
                     bu.pairing_id = cu.pairing_id
                     bu.status = "polling"
+                    touched_ids.append(bu.id)
                     # Assign BU pink paper seal
                     seal_serial = commissioning_data.bu_pink_paper_seals[i]
                     bu_pink_seal = db.query(EVMComponent).filter(
@@ -518,7 +495,9 @@ def allot_reserve_evm_to_polling_station(
                     pairing.polling_station_id = polling_station_id
                     pairing.completed_by_id = user_id
                     pairing.completed_at = datetime.now(ZoneInfo("Asia/Kolkata"))
+                touched_ids.append(cu.id)
 
+            refresh_msr(db, touched_ids)
             db.commit()
             return {"status": "success", "message": "Reserve EVM(s) commissioned and allotted to polling station."}
         except Exception as e:
@@ -1,9 +1,11 @@
 from models.evm import EVMComponent, EVMComponentType
 from models.logs import EVMComponentLogs
 from models.users import User,Warehouse
+from models.inventory import InventoryCount
 from .db import Database
 from pydantic import BaseModel
-from sqlalchemy import and_,or_,func
+from sqlalchemy import and_,or_,func,select,insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import Optional, List,Dict, Any
 from datetime import date,datetime
 from annexure.Annex_1 import CU_1,DMM_1
@@ -19,6 +21,8 @@ import tempfile
 from sqlalchemy import case
 import uuid
 from utils.delete_file import remove_file
+from core.msr_readmodel import refresh_msr
+from core.names import NameResolver
 
 
 class ComponentModel(BaseModel):
@@ -29,88 +33,89 @@ class ComponentModel(BaseModel):
     current_warehouse_id: Optional[int] = None #Remove for prod
 
 
-def new_components(components: List[ComponentModel], phy_order_no: str, user_id: int,background_tasks: BackgroundTasks):
-    failed_serials = []
+def new_components(components: List[ComponentModel], phy_order_no: str, user_id: int,background_tasks: BackgroundTasks,
+                   allow_partial: bool = False):
+    """
+    Register a delivery of new components in one set-based pass.
+
+    Every serial gets a verdict: `invalid_type`, `duplicate_in_batch` or `already_exists`
+    (decided by the unique serial_number index via ON CONFLICT DO NOTHING). By default
+    any rejection rolls the whole delivery back with a 400; with allow_partial the
+    accepted serials are kept and the rejection report is returned.
+    """
+    rejected = []
     
     with Database.get_session() as session:
-        to_add = []
+        rows = []
         seen_serials = set()
         
         # Get current user and validate
-        current_user = session.query(User).filter(User.id == user_id).first()
-        
-        district_name = current_user.district.name if current_user.district else ""
+        names = NameResolver(session)
+        district_name = names.district(names.user_district_id(user_id)) or ""
+        now = datetime.now()
             
         for component in components:
             if component.component_type not in EVMComponentType.__members__:
-                failed_serials.append(component.serial_number)
+                rejected.append({'serial_number': component.serial_number, 'reason': 'invalid_type'})
                 continue
             
             if component.serial_number in seen_serials:
-                failed_serials.append(component.serial_number)
-                continue
-            
-            existing = session.query(EVMComponent).filter(
-                EVMComponent.serial_number == component.serial_number
-            ).first()
-            
-            if existing:
-                failed_serials.append(component.serial_number)
+                rejected.append({'serial_number': component.serial_number, 'reason': 'duplicate_in_batch'})
                 continue
             
             seen_serials.add(component.serial_number)
-            
-            new_component = EVMComponent(
-                serial_number=component.serial_number,
-                component_type=EVMComponentType[component.component_type],
-                dom=component.dom,
-                box_no=component.box_no,
-                current_warehouse_id=component.current_warehouse_id,
-                current_user_id=3,
-                last_received_from_id = 3,
-                date_of_receipt=datetime.now()
+            rows.append({
+                'serial_number': component.serial_number,
+                'component_type': EVMComponentType[component.component_type],
+                'status': "FLC_Pending",
+                'is_verified': False,
+                'dom': component.dom,
+                'box_no': component.box_no,
+                'current_warehouse_id': component.current_warehouse_id,
+                'current_user_id': 3,
+                'pairing_id': None,
+            })
+        
+        # Serials already registered are skipped by the unique index, not looked up one by one
+        inserted = {}
+        if rows:
+            inserted = dict(session.execute(
+                pg_insert(EVMComponent)
+                .on_conflict_do_nothing(index_elements=[EVMComponent.serial_number])
+                .returning(EVMComponent.serial_number, EVMComponent.id),
+                [dict(row, last_received_from_id=3, date_of_receipt=now) for row in rows]
+            ).all())
+            rejected.extend(
+                {'serial_number': row['serial_number'], 'reason': 'already_exists'}
+                for row in rows if row['serial_number'] not in inserted
             )
-            to_add.append(new_component)
         
-        if failed_serials:
+        if rejected and not allow_partial:
+            session.rollback()
             raise HTTPException(
                 status_code=400, 
-                detail=f"Failed to process components with serial numbers: {', '.join(failed_serials)}"
+                detail=f"Failed to process components with serial numbers: {', '.join(r['serial_number'] for r in rejected)}"
             )
         
-        if not to_add:
+        if not inserted:
+            session.rollback()
             raise HTTPException(status_code=400, detail="No valid components to add")
         
         # Fetch warehouse names for all components
-        warehouse_ids = {str(comp.current_warehouse_id) for comp in to_add if comp.current_warehouse_id is not None}
+        warehouse_ids = {str(row['current_warehouse_id']) for row in rows if row['current_warehouse_id'] is not None}
         warehouse_names = {}
         
         if warehouse_ids:
             warehouses = session.query(Warehouse).filter(Warehouse.id.in_(warehouse_ids)).all()
             warehouse_names = {w.id: w.name for w in warehouses}
         
-        # Add all components to the database
-        session.add_all(to_add)
+        # CREATE LOGS - written in the same transaction as the components
+        session.execute(insert(EVMComponentLogs), [row for row in rows if row['serial_number'] in inserted])
+        refresh_msr(session, inserted.values())
         session.commit()
         
-        # CREATE LOGS - Add corresponding entries to logs table
-        logs_to_add = []
-        for component in to_add:
-            component_log = EVMComponentLogs(
-                serial_number=component.serial_number,
-                component_type=component.component_type,
-                status=component.status,
-                is_verified=component.is_verified,
-                dom=component.dom,
-                box_no=component.box_no,
-                current_user_id=component.current_user_id,
-                current_warehouse_id=component.current_warehouse_id,
-                pairing_id=component.pairing_id
-            )
-            logs_to_add.append(component_log)
-        
-        session.add_all(logs_to_add)
-        session.commit()
+        if allow_partial:
+            return {'inserted': len(inserted), 'rejected': rejected}
         
         # Generate PDF - validate component type
         component_type = components[0].component_type if components else None
@@ -239,130 +244,70 @@ def view_paired_bu(user_id:int):
         ]
 
 
-def dashboard_all(user_id: int) -> Dict[str, Any]:
-    with Database.get_session() as session:
-        results = session.query(
-            EVMComponent.component_type,
-            EVMComponent.status,
-            func.count(EVMComponent.id).label('count')
-        ).filter(
-            EVMComponent.current_user_id == user_id,
-            EVMComponent.component_type.in_(["CU", "DMM", "BU"]),
-            EVMComponent.status.in_(["FLC_Passed", "FLC_Failed", "FLC_Pending"])
-        ).group_by(
-            EVMComponent.component_type,
-            EVMComponent.status
-        ).all()
-        
-        response = {
-            "CU": {"total": 0, "passed": 0, "failed": 0, "pending": 0},
-            "DMM": {"total": 0, "passed": 0, "failed": 0, "pending": 0},
-            "BU": {"total": 0, "passed": 0, "failed": 0, "pending": 0},
-            "totals": {"FLC_Pending": 0, "FLC_Passed": 0, "FLC_Failed": 0}
+def _dashboard_response(results) -> Dict[str, Any]:
+    """(component_type, status, count) rows -> per-type and overall FLC counts."""
+    response = {
+        "CU": {"total": 0, "passed": 0, "failed": 0, "pending": 0},
+        "DMM": {"total": 0, "passed": 0, "failed": 0, "pending": 0},
+        "BU": {"total": 0, "passed": 0, "failed": 0, "pending": 0},
+        "totals": {
+            "FLC_Pending": 0,
+            "FLC_Passed": 0,
+            "FLC_Failed": 0
         }
+    }
+    
+    status_map = {
+        "FLC_Passed": "passed",
+        "FLC_Failed": "failed", 
+        "FLC_Pending": "pending"
+    }
+    
+    for component_type, status, count in results:
+        response[component_type]["total"] += count
         
-        status_map = {
-            "FLC_Passed": "passed",
-            "FLC_Failed": "failed", 
-            "FLC_Pending": "pending"
-        }
-        
-        for component_type, status, count in results:
-            if status in status_map:
-                response[component_type]["total"] += count
-                response[component_type][status_map[status]] = count
-                response["totals"][status] += count
-        
-        return response
+        if status in status_map:
+            response[component_type][status_map[status]] = count
+            response["totals"][status] += count
+    
+    return response
+
+def _dashboard_query(*filters):
+    return select(
+        InventoryCount.component_type,
+        InventoryCount.status,
+        func.sum(InventoryCount.count).label('count')
+    ).filter(
+        InventoryCount.component_type.in_(["CU", "DMM", "BU"]),
+        *filters
+    ).group_by(
+        InventoryCount.component_type,
+        InventoryCount.status
+    )
+
+def dashboard_all(user_id: int) -> Dict[str, Any]:
+    with Database.get_session() as session:
+        results = session.execute(_dashboard_query(
+            InventoryCount.user_id == user_id,
+            InventoryCount.status.in_(["FLC_Passed", "FLC_Failed", "FLC_Pending"])
+        )).all()
+        return _dashboard_response(results)
 
 def FLC_dashboard(district_id: int) -> Dict[str, Any]:
-    
     with Database.get_session() as session:
-        
-        results = session.query(
-            EVMComponent.component_type,
-            EVMComponent.status,
-            func.count(EVMComponent.id).label('count')
-        ).join(
-            User, EVMComponent.current_user_id == User.id
-        ).filter(
-            User.district_id == district_id,
-            EVMComponent.component_type.in_(["CU", "DMM", "BU"])
-        ).group_by(
-            EVMComponent.component_type,
-            EVMComponent.status
-        ).all()
-        
-        
-        response = {
-            "CU": {"total": 0, "passed": 0, "failed": 0, "pending": 0},
-            "DMM": {"total": 0, "passed": 0, "failed": 0, "pending": 0},
-            "BU": {"total": 0, "passed": 0, "failed": 0, "pending": 0},
-            "totals": {
-                "FLC_Pending": 0,
-                "FLC_Passed": 0,
-                "FLC_Failed": 0
-            }
-        }
-        
-        
-        for component_type, status, count in results:
-            response[component_type]["total"] += count
-            
-            if status == "FLC_Passed":
-                response[component_type]["passed"] = count
-                response["totals"]["FLC_Passed"] += count
-            elif status == "FLC_Failed":
-                response[component_type]["failed"] = count
-                response["totals"]["FLC_Failed"] += count
-            elif status == "FLC_Pending":
-                response[component_type]["pending"] = count
-                response["totals"]["FLC_Pending"] += count
-        
-        return response
+        results = session.execute(_dashboard_query(InventoryCount.district_id == district_id)).all()
+        return _dashboard_response(results)
 
 
 def sec_dashboard() -> Dict[str, Any]:
     with Database.get_session() as session:
-        
-        results = session.query(
-            EVMComponent.component_type,
-            EVMComponent.status,
-            func.count(EVMComponent.id).label('count')
-        ).filter(
-            EVMComponent.component_type.in_(["CU", "DMM", "BU"])
-        ).group_by(
-            EVMComponent.component_type,
-            EVMComponent.status
-        ).all()
-        
-        
-        response = {
-            "CU": {"total": 0, "passed": 0, "failed": 0, "pending": 0},
-            "DMM": {"total": 0, "passed": 0, "failed": 0, "pending": 0},
-            "BU": {"total": 0, "passed": 0, "failed": 0, "pending": 0},
-            "totals": {
-                "FLC_Pending": 0,
-                "FLC_Passed": 0,
-                "FLC_Failed": 0
-            }
-        }
-        
+        results = session.execute(_dashboard_query()).all()
+        return _dashboard_response(results)
     
-        for component_type, status, count in results:
-            response[component_type]["total"] += count
-            
-            if status == "FLC_Passed":
-                response[component_type]["passed"] = count
-                response["totals"]["FLC_Passed"] += count
-            elif status == "FLC_Failed":
-                response[component_type]["failed"] = count
-                response["totals"]["FLC_Failed"] += count
-            elif status == "FLC_Pending":
-                response[component_type]["pending"] = count
-                response["totals"]["FLC_Pending"] += count
-        
-        return response
+async def sec_dashboard_async() -> Dict[str, Any]:
+    async with Database.get_async_session() as session:
+        results = (await session.execute(_dashboard_query())).all()
+        return _dashboard_response(results)
     
 def view_paired_cu_sec():
     with Database.get_session() as session:
@@ -562,6 +507,7 @@ def approve_component_by_sec(serial_numbers: List[str]):
             comp.is_sec_approved = True
             comp.current_user_id=deo.id
 
+        refresh_msr(db, [comp.id for comp in components])
         db.commit()
 
         return Response(status_code=200)
@@ -634,6 +580,7 @@ def warehouse_reentry(warehouse_updates: List[Dict[str, Any]], user_id: int):
     with Database.get_session() as db:
         try:
             total_updated = 0
+            touched_ids = []
             
             # Process each warehouse update group
             for update_group in warehouse_updates:
@@ -681,6 +628,9 @@ def warehouse_reentry(warehouse_updates: List[Dict[str, Any]], user_id: int):
                 )
                 
                 total_updated += updated_count
+                touched_ids.extend(component.id for component in existing_components)
+            
+            refresh_msr(db, touched_ids)
             
             # Commit all changes
             db.commit()
@@ -807,6 +757,7 @@ def warehouse_box_entry(warehouse_updates: List[Dict[str, Any]], user_id: int):
                 )
             }, synchronize_session=False)
             
+            refresh_msr(db, [component.id for component in components])
             db.commit()
             return {"message": "Warehouse updated successfully", "components_updated": total_updated}
             
@@ -14,14 +14,16 @@ from sqlalchemy import and_
 from models.evm import PairingRecord, EVMComponentType
 from fastapi import BackgroundTasks
 import traceback
-from fastapi.responses import FileResponse
+from functools import partial
 from annexure.Annex_5 import CUDetail,Deo_BO_CU,BUDetail,Deo_BO_BU
 from annexure.Annex_6 import BO_RO_BU, BO_RO_CU
 from annexure.Annex_11 import Return_RO_BO
 from annexure.Annex_12 import BO_DEO_Return
 from datetime import date
 import zlib
-from utils.delete_file import remove_file
+from utils.pdf_renderer import PDFRenderer, pdf_response
+from core.msr_readmodel import refresh_msr
+from core.names import NameResolver
 
 class AllotmentModel(BaseModel):
     allotment_type: AllotmentType
@@ -180,7 +182,7 @@ def create_allotment(background_tasks: BackgroundTasks,evm: AllotmentModel, from
                 ).delete()
 
             # PDF Generation
-            pdf_filename = None
+            pdf_job = None
                         
             # DEO to BO/ERO allotments
             if evm.allotment_type in {
@@ -190,7 +192,7 @@ def create_allotment(background_tasks: BackgroundTasks,evm: AllotmentModel, from
                 AllotmentType.DEO_TO_MERO
             }:
                 print(f"[ALLOTMENT] Generating DEO to BO/ERO PDFs")
-                pdf_filename = generate_deo_pdfs(db, components, from_user_id, evm)
+                pdf_job = generate_deo_pdfs(db, components, from_user_id, evm)
 
             # BO/ERO to RO allotments  
             elif evm.allotment_type in {
@@ -200,7 +202,7 @@ def create_allotment(background_tasks: BackgroundTasks,evm: AllotmentModel, from
                 AllotmentType.MERO_TO_RO
             }:
                 print(f"[ALLOTMENT] Generating BO/ERO to RO PDFs")
-                pdf_filename = generate_bo_ero_pdfs(db, components, from_user_id, evm, allotment.allotment_id)
+                pdf_job = generate_bo_ero_pdfs(db, components, from_user_id, evm, allotment.allotment_id)
 
             # RO to BO/ERO returns
             elif evm.allotment_type in {
@@ -210,7 +212,7 @@ def create_allotment(background_tasks: BackgroundTasks,evm: AllotmentModel, from
                 AllotmentType.RO_TO_MERO
             }:
                 print(f"[ALLOTMENT] Generating RO to BO/ERO return PDF")
-                pdf_filename = generate_bo_ro_return_pdf(db, components, from_user_id, evm)
+                pdf_job = generate_bo_ro_return_pdf(db, components, from_user_id, evm)
 
             # BO/ERO to DEO returns
             elif evm.allotment_type in {
@@ -220,26 +222,37 @@ def create_allotment(background_tasks: BackgroundTasks,evm: AllotmentModel, from
                 AllotmentType.MERO_TO_DEO
             }:
                 print(f"[ALLOTMENT] Generating BO/ERO to DEO return PDF")
-                pdf_filename = generate_bo_ero_deo_pdf(db, components, from_user_id, evm, allotment.allotment_id)
+                pdf_job = generate_bo_ero_deo_pdf(db, components, from_user_id, evm, allotment.allotment_id)
 
 
             print(f"[ALLOTMENT] Creating audit logs")
             # Create audit logs
             create_allotment_logs(db, allotment, components)
+            refresh_msr(db, [comp.id for comp in components])
 
     
             db.commit()
             print(f"[ALLOTMENT] Allotment {allotment.id} created successfully")
 
         
-            if pdf_filename:
-                print(f"[ALLOTMENT] Returning PDF file: {pdf_filename}")
-                background_tasks.add_task(remove_file, pdf_filename)
-                return FileResponse(
-                    path=pdf_filename,
-                    filename=pdf_filename,
-                    media_type='application/pdf'
-                )
+            # Rendered after commit so the transaction is not held open for reportlab
+            if pdf_job:
+                try:
+                    pdf = PDFRenderer.render(pdf_job)
+                    print(f"[ALLOTMENT] Returning PDF file: {pdf.filename}")
+                    return pdf_response(pdf)
+                except Exception as pdf_error:
+                    # The allotment is committed; report the PDF failure instead of rolling back
+                    print(f"[ALLOTMENT] PDF generation failed for allotment {allotment.id}: {pdf_error}")
+                    print(f"[ALLOTMENT] Traceback: {traceback.format_exc()}")
+                    detail = pdf_error.detail if isinstance(pdf_error, HTTPException) else str(pdf_error)
+                    return {
+                        "id": allotment.id,
+                        "allotment_type": allotment.allotment_type,
+                        "status": allotment.status,
+                        "evm_component_ids": evm.evm_component_ids,
+                        "pdf_error": detail
+                    }
             else:
                 return {
                     "id": allotment.id,
@@ -271,26 +284,25 @@ def generate_bo_ro_return_pdf(db, components, from_user_id, evm):
             return None
             
         # Get from_user with error handling
-        from_user = db.query(User).filter(User.id == from_user_id).first()
-        if not from_user:
+        names = NameResolver(db)
+        ro_name = names.user(from_user_id)
+        if ro_name is None:
             print(f"[ALLOTMENT] From user {from_user_id} not found")
             raise HTTPException(status_code=400, detail=f"User {from_user_id} not found")
-            
-        ro_name = from_user.username or "Unknown"
         
         # Get alloted_to with comprehensive error handling
         alloted_to = "Unknown"
         try:
             if evm.to_local_body_id:
-                to_local_body = db.query(LocalBody).filter(LocalBody.id == evm.to_local_body_id).first()
+                to_local_body = names.local_body(evm.to_local_body_id)
                 if to_local_body:
-                    alloted_to = to_local_body.name
+                    alloted_to = to_local_body
                 else:
                     print(f"[ALLOTMENT] Warning: Local body {evm.to_local_body_id} not found")
             elif evm.to_district_id:
-                to_district = db.query(District).filter(District.id == evm.to_district_id).first()
+                to_district = names.district(evm.to_district_id)
                 if to_district:
-                    alloted_to = to_district.name
+                    alloted_to = to_district
                 else:
                     print(f"[ALLOTMENT] Warning: District {evm.to_district_id} not found")
         except Exception as e:
@@ -355,26 +367,12 @@ def generate_bo_ro_return_pdf(db, components, from_user_id, evm):
             
         print(f"[ALLOTMENT] Generated {len(cu_return_details)} CU return details")
         
-        # Generate PDF with error handling
-        try:
-            pdf_filename = Return_RO_BO(
-                details=cu_return_details,
-                RO=ro_name,
-                alloted_to=alloted_to
-            )
-            
-            if pdf_filename:
-                print(f"[ALLOTMENT] Successfully generated RO return PDF: {pdf_filename}")
-                return pdf_filename
-            else:
-                print(f"[ALLOTMENT] PDF generation returned None")
-                return None
-                
-        except Exception as e:
-            print(f"[ALLOTMENT] Error in Return_RO_BO PDF generation: {str(e)}")
-            # Log the error but don't fail the entire allotment process
-            print(f"[ALLOTMENT] CU return details that failed: {len(cu_return_details)} items")
-            raise HTTPException(status_code=500, detail="PDF generation failed")
+        return partial(
+            Return_RO_BO,
+            details=cu_return_details,
+            RO=ro_name,
+            alloted_to=alloted_to
+        )
         
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -385,21 +383,29 @@ def generate_bo_ro_return_pdf(db, components, from_user_id, evm):
         # Don't fail the entire allotment - just skip PDF generation
         return None
 
+def paired_dmms(db, cu_components):
+    """DMM of each CU's pairing, keyed by pairing_id, in one query."""
+    pairing_ids = list({cu.pairing_id for cu in cu_components if cu.pairing_id is not None})
+    if not pairing_ids:
+        return {}
+    dmms = {}
+    for dmm in db.query(EVMComponent).filter(
+        EVMComponent.pairing_id.in_(pairing_ids),
+        EVMComponent.component_type == EVMComponentType.DMM
+    ).order_by(EVMComponent.id).all():
+        dmms.setdefault(dmm.pairing_id, dmm)
+    return dmms
+
+
 def generate_deo_pdfs(db, components, from_user_id, evm):
     """Generate PDFs for DEO to BO/ERO allotments"""
     try:
         # Get dynamic alloted_from and alloted_to
-        from_user = db.query(User).filter(User.id == from_user_id).first()
-        from_district = db.query(District).filter(District.id == from_user.district_id).first() if from_user else None
-        
-        to_local_body = None
-        if evm.to_local_body_id:
-            to_local_body = db.query(LocalBody).filter(LocalBody.id == evm.to_local_body_id).first()
+        names = NameResolver(db).load(components, warehouse=("current_warehouse_id",))
+        alloted_from = names.district(names.user_district_id(from_user_id)) or "Unknown"
+        alloted_to = names.local_body(evm.to_local_body_id) or "Unknown"
         
-        alloted_from = from_district.name if from_district else "Unknown"
-        alloted_to = to_local_body.name if to_local_body else "Unknown"
-        
-        pdf_filename = None
+        pdf_job = None
         
         # Filter CU components that have paired DMMs
         cu_components = [comp for comp in components if comp.component_type == EVMComponentType.CU and comp.pairing_id is not None]
@@ -407,19 +413,13 @@ def generate_deo_pdfs(db, components, from_user_id, evm):
         if cu_components:
             # Get paired DMM components and warehouse details
             cu_details = []
+            dmms = paired_dmms(db, cu_components)
             for cu_comp in cu_components:
                 # Get the DMM component from the same pairing
-                dmm_comp = db.query(EVMComponent).filter(
-                    EVMComponent.pairing_id == cu_comp.pairing_id,
-                    EVMComponent.component_type == EVMComponentType.DMM
-                ).first()
+                dmm_comp = dmms.get(cu_comp.pairing_id)
                 
                 # Get warehouse name
-                warehouse_name = "Warehouse 1"
-                if cu_comp.current_warehouse_id:
-                    warehouse = db.query(Warehouse).filter(Warehouse.id == cu_comp.current_warehouse_id).first()
-                    if warehouse:
-                        warehouse_name = warehouse.name
+                warehouse_name = names.warehouse(cu_comp.current_warehouse_id) or "Warehouse 1"
                 
                 if dmm_comp:
                     cu_details.append(CUDetail(
@@ -431,7 +431,7 @@ def generate_deo_pdfs(db, components, from_user_id, evm):
             
             if cu_details:
                 # Generate CU PDF
-                pdf_filename = Deo_BO_CU(cu_details, alloted_to, alloted_from)
+                pdf_job = partial(Deo_BO_CU, cu_details, alloted_to, alloted_from)
         
         # Filter BU components
         bu_components = [comp for comp in components if comp.component_type == EVMComponentType.BU]
@@ -441,11 +441,7 @@ def generate_deo_pdfs(db, components, from_user_id, evm):
             bu_details = []
             for bu_comp in bu_components:
                 # Get warehouse name from current_warehouse_id
-                warehouse_name = "Warehouse 1"
-                if bu_comp.current_warehouse_id:
-                    warehouse = db.query(Warehouse).filter(Warehouse.id == bu_comp.current_warehouse_id).first()
-                    if warehouse:
-                        warehouse_name = warehouse.name
+                warehouse_name = names.warehouse(bu_comp.current_warehouse_id) or "Warehouse 1"
                 
                 bu_details.append(BUDetail(
                     serial_number=bu_comp.serial_number,
@@ -455,9 +451,9 @@ def generate_deo_pdfs(db, components, from_user_id, evm):
             
             if bu_details:
                 # Generate BU PDF
-                pdf_filename = Deo_BO_BU(bu_details, alloted_to, alloted_from)
+                pdf_job = partial(Deo_BO_BU, bu_details, alloted_to, alloted_from)
         
-        return pdf_filename
+        return pdf_job
         
     except Exception as e:
         print(f"[ALLOTMENT] Error generating DEO PDFs: {str(e)}")
@@ -468,17 +464,11 @@ def generate_bo_ero_pdfs(db, components, from_user_id, evm, allotment_id):
     """Generate PDFs for BO/ERO to RO allotments"""
     try:
         # Get dynamic alloted_from and alloted_to
-        from_user = db.query(User).filter(User.id == from_user_id).first()
-        from_district = db.query(District).filter(District.id == from_user.district_id).first() if from_user else None
-        
-        to_local_body = None
-        if evm.to_local_body_id:
-            to_local_body = db.query(LocalBody).filter(LocalBody.id == evm.to_local_body_id).first()
+        names = NameResolver(db).load(components, warehouse=("current_warehouse_id",))
+        alloted_from = names.district(names.user_district_id(from_user_id)) or "Unknown"
+        alloted_to = names.local_body(evm.to_local_body_id) or "Unknown"
         
-        alloted_from = from_district.name if from_district else "Unknown"
-        alloted_to = to_local_body.name if to_local_body else "Unknown"
-        
-        pdf_filename = None
+        pdf_job = None
         
         # Filter CU components that have paired DMMs
         cu_components = [comp for comp in components if comp.component_type == EVMComponentType.CU and comp.pairing_id is not None]
@@ -486,19 +476,13 @@ def generate_bo_ero_pdfs(db, components, from_user_id, evm, allotment_id):
         if cu_components:
             # Get paired DMM components and warehouse details
             cu_details = []
+            dmms = paired_dmms(db, cu_components)
             for cu_comp in cu_components:
                 # Get the DMM component from the same pairing
-                dmm_comp = db.query(EVMComponent).filter(
-                    EVMComponent.pairing_id == cu_comp.pairing_id,
-                    EVMComponent.component_type == EVMComponentType.DMM
-                ).first()
+                dmm_comp = dmms.get(cu_comp.pairing_id)
                 
                 # Get warehouse name
-                warehouse_name = "Warehouse 1"
-                if cu_comp.current_warehouse_id:
-                    warehouse = db.query(Warehouse).filter(Warehouse.id == cu_comp.current_warehouse_id).first()
-                    if warehouse:
-                        warehouse_name = warehouse.name
+                warehouse_name = names.warehouse(cu_comp.current_warehouse_id) or "Warehouse 1"
                 
                 if dmm_comp:
                     cu_details.append(CUDetail(
@@ -510,7 +494,7 @@ def generate_bo_ero_pdfs(db, components, from_user_id, evm, allotment_id):
             
             if cu_details:
                 # Generate CU PDF - Convert allotment_id to string
-                pdf_filename = BO_RO_CU(cu_details, alloted_to, alloted_from, order_no=str(allotment_id))
+                pdf_job = partial(BO_RO_CU, cu_details, alloted_to, alloted_from, order_no=str(allotment_id))
         
         # Filter BU components
         bu_components = [comp for comp in components if comp.component_type == EVMComponentType.BU]
@@ -520,11 +504,7 @@ def generate_bo_ero_pdfs(db, components, from_user_id, evm, allotment_id):
             bu_details = []
             for bu_comp in bu_components:
                 # Get warehouse name from current_warehouse_id
-                warehouse_name = "Warehouse 1"
-                if bu_comp.current_warehouse_id:
-                    warehouse = db.query(Warehouse).filter(Warehouse.id == bu_comp.current_warehouse_id).first()
-                    if warehouse:
-                        warehouse_name = warehouse.name
+                warehouse_name = names.warehouse(bu_comp.current_warehouse_id) or "Warehouse 1"
                 
                 bu_details.append(BUDetail(
                     serial_number=bu_comp.serial_number,
@@ -534,9 +514,9 @@ def generate_bo_ero_pdfs(db, components, from_user_id, evm, allotment_id):
             
             if bu_details:
                 # Generate BU PDF - Convert allotment_id to string
-                pdf_filename = BO_RO_BU(bu_details, alloted_to, alloted_from, order_no=str(allotment_id))
+                pdf_job = partial(BO_RO_BU, bu_details, alloted_to, alloted_from, order_no=str(allotment_id))
         
-        return pdf_filename
+        return pdf_job
         
     except Exception as e:
         print(f"[ALLOTMENT] Error generating BO/ERO PDFs: {str(e)}")
@@ -547,34 +527,24 @@ def generate_bo_ero_deo_pdf(db, components, from_user_id, evm, allotment_id):
     """Generate PDF for BO/ERO to DEO returns (Annexure 12)"""
     try:
         # Get alloted_from (from_user's local body or district)
-        from_user = db.query(User).filter(User.id == from_user_id).first()
+        names = NameResolver(db).load(components, warehouse=("current_warehouse_id",))
         alloted_from = "Unknown"
         
-        if from_user:
+        if names.user(from_user_id) is not None:
             if evm.from_local_body_id:
-                from_local_body = db.query(LocalBody).filter(LocalBody.id == evm.from_local_body_id).first()
-                alloted_from = from_local_body.name if from_local_body else "Unknown"
-            elif from_user.district_id:
-                from_district = db.query(District).filter(District.id == from_user.district_id).first()
-                alloted_from = from_district.name if from_district else "Unknown"
+                alloted_from = names.local_body(evm.from_local_body_id) or "Unknown"
+            elif names.user_district_id(from_user_id):
+                alloted_from = names.district(names.user_district_id(from_user_id)) or "Unknown"
         
         # Get alloted_to (DEO district)
-        to_district = None
-        if evm.to_district_id:
-            to_district = db.query(District).filter(District.id == evm.to_district_id).first()
-        
-        alloted_to = to_district.name if to_district else "Unknown"
+        alloted_to = names.district(evm.to_district_id) or "Unknown"
         
         # Prepare component details
         component_details = []
         
         for comp in components:
             # Get warehouse name
-            warehouse_name = "Warehouse 1"
-            if comp.current_warehouse_id:
-                warehouse = db.query(Warehouse).filter(Warehouse.id == comp.current_warehouse_id).first()
-                if warehouse:
-                    warehouse_name = warehouse.name
+            warehouse_name = names.warehouse(comp.current_warehouse_id) or "Warehouse 1"
             
             component_details.append(ComponentDetail(
                 comp_no=comp.serial_number,
@@ -585,13 +555,13 @@ def generate_bo_ero_deo_pdf(db, components, from_user_id, evm, allotment_id):
         
         # Generate PDF if we have component details
         if component_details:
-            pdf_filename = BO_DEO_Return(
+            return partial(
+                BO_DEO_Return,
                 details=component_details,
                 order_no=str(allotment_id),
                 alloted_from=alloted_from,
                 alloted_to=alloted_to
             )
-            return pdf_filename
         
         return None
         
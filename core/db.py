@@ -1,8 +1,9 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from dotenv import load_dotenv
 import os
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -13,25 +14,54 @@ load_dotenv()
 class Database:
     _engine = None
     _SessionLocal = None
+    _async_engine = None
+    _AsyncSessionLocal = None
+    POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 20))
+    MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 30))
+    ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", 10))
+    ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", 10))
+
+    @staticmethod
+    def _engine_options(pool_size: int, max_overflow: int):
+        # Shared by the sync and async engines so both behave the same
+        return dict(
+            pool_size=pool_size,         # Base connections
+            max_overflow=max_overflow,   # Additional connections when needed
+            pool_pre_ping=True,    # Validate connections before use
+            pool_recycle=3600,     # Recycle connections every hour
+            echo=False             # Set to True for debugging
+        )
+
+    @staticmethod
+    def _async_url(url: str):
+        # postgresql:// and postgresql+psycopg2:// -> postgresql+asyncpg://
+        scheme, rest = url.split("://", 1)
+        return f"{scheme.split('+')[0]}+asyncpg://{rest}"
 
     @classmethod
     def initialize(cls):
         try:
             url = os.getenv("DATABASE_URL")
-            cls._engine = create_engine(
-                url,
-                pool_size=20,          # Base connections
-                max_overflow=30,       # Additional connections when needed
-                pool_pre_ping=True,    # Validate connections before use
-                pool_recycle=3600,     # Recycle connections every hour
-                echo=False             # Set to True for debugging
-            )
+            cls._engine = create_engine(url, **cls._engine_options(cls.POOL_SIZE, cls.MAX_OVERFLOW))
             cls._SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=cls._engine)
             return True
         except Exception as e:
             print(f"Error initializing database: {e}")
             return False
 
+    @classmethod
+    def initialize_async(cls):
+        try:
+            url = cls._async_url(os.getenv("DATABASE_URL"))
+            cls._async_engine = create_async_engine(url, **cls._engine_options(cls.ASYNC_POOL_SIZE, cls.ASYNC_MAX_OVERFLOW))
+            cls._AsyncSessionLocal = async_sessionmaker(
+                bind=cls._async_engine, autoflush=False, expire_on_commit=False
+            )
+            return True
+        except Exception as e:
+            print(f"Error initializing async database: {e}")
+            return False
+
     @classmethod
     @contextmanager
     def get_session(cls):
@@ -41,4 +71,23 @@ class Database:
         try:
             yield db
         finally:
-            db.close()
\ No newline at end of file
+            db.close()
+
+    @classmethod
+    @asynccontextmanager
+    async def get_async_session(cls):
+        """Async counterpart of get_session for read endpoints.
+
+        Functions move over one at a time: add an `<name>_async` twin in the same
+        core module written with select()/await session.execute(), point the router
+        at it, and drop the sync version once nothing else calls it.
+        """
+        if cls._AsyncSessionLocal is None:
+            cls.initialize_async()
+        async with cls._AsyncSessionLocal() as db:
+            yield db
+
+    @classmethod
+    async def dispose_async(cls):
+        if cls._async_engine:
+            await cls._async_engine.dispose()
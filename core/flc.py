@@ -15,6 +15,8 @@ from utils.delete_file import remove_file
 from models.users import District
 from sqlalchemy import func
 from typing import Dict, Set
+from core.msr_readmodel import refresh_msr
+from utils.pdf_renderer import PDFRenderer, pdf_response
 from core.db import Database
 from models.evm import FLCRecord, FLCBallotUnit, FLCDMMUnit, EVMComponentType, EVMComponent, PairingRecord, BoxNumber
 from models.logs import FLCBallotUnitLogs, FLCRecordLogs, EVMComponentLogs, PairingRecordLogs
@@ -30,7 +32,8 @@ from sqlalchemy import and_, func
 from datetime import datetime
 from utils.delete_file import remove_file
 from sqlalchemy.orm import aliased
-from sqlalchemy import and_
+from sqlalchemy import and_, case, insert, text
+from utils.authtoken import Principal
 
 logger = logging.getLogger(__name__)
 
@@ -59,19 +62,20 @@ class FLCBUModel(BaseModel):
     remarks: Optional[str] = None
 
 def get_deo_user_id(session, user_id: int) -> int:
-    user = session.query(User).filter(User.id == user_id).first()
-    if not user or not user.district_id:
-        raise HTTPException(status_code=400, detail="User district not found")
+    # The acting user's district is read here rather than from the token: the DEO
+    # found becomes the owner of every component, so it must follow district changes
+    acting = aliased(User)
+    row = session.query(acting.district_id, User.id).outerjoin(
+        User, and_(User.role_id == 2, User.district_id == acting.district_id)
+    ).filter(acting.id == user_id).first()
     
-    deo = session.query(User).filter(
-        User.role_id == 2,
-        User.district_id == user.district_id
-    ).first()
+    if not row or not row.district_id:
+        raise HTTPException(status_code=400, detail="User district not found")
     
-    if not deo:
+    if row.id is None:
         raise HTTPException(status_code=400, detail="DEO not found")
     
-    return deo.id
+    return row.id
 
 def create_or_update_component(session, serial: str, component_type: EVMComponentType, 
                              dom: Optional[str], box_no: str, deo_user_id: int, passed: bool) -> tuple[EVMComponent, EVMComponentLogs]:
@@ -204,29 +208,22 @@ def validate_component_box_assignment(session, component_serials: Set[str],
             )
 
 def update_box_counts(session, box_assignments: Dict[str, int]) -> None:
-    for box_no, count in box_assignments.items():
-        session.query(BoxNumber).filter(
-            BoxNumber.box_no == box_no
-        ).update({
-            BoxNumber.num_components: BoxNumber.num_components + count
-        })
+    if not box_assignments:
+        return
+    session.query(BoxNumber).filter(
+        BoxNumber.box_no.in_(list(box_assignments.keys()))
+    ).update({
+        BoxNumber.num_components: BoxNumber.num_components + case(box_assignments, value=BoxNumber.box_no, else_=0)
+    }, synchronize_session=False)
 
-def create_cu_flc_logs_simple(session, flc_records, user_id):
-    flc_logs = []
-    for flc_record in flc_records:
-        flc_log = FLCRecordLogs(
-            cu_id=getattr(flc_record, 'cu_log_id', flc_record.cu_id),
-            dmm_id=getattr(flc_record, 'dmm_log_id', flc_record.dmm_id),
-            dmm_seal_id=getattr(flc_record, 'dmm_seal_log_id', flc_record.dmm_seal_id),
-            pink_paper_seal_id=getattr(flc_record, 'pink_paper_seal_log_id', flc_record.pink_paper_seal_id),
-            box_no=flc_record.box_no,
-            passed=flc_record.passed,
-            remarks=flc_record.remarks,
-            flc_by_id=user_id
-        )
-        flc_logs.append(flc_log)
-    
-    session.add_all(flc_logs)
+def allocate_pairing_ids(session, count: int) -> List[int]:
+    """Reserve `count` ids from the pairings sequence in one round-trip."""
+    if not count:
+        return []
+    return session.execute(
+        text("SELECT nextval(pg_get_serial_sequence('pairings', 'id')) FROM generate_series(1, :n)"),
+        {"n": count}
+    ).scalars().all()
 
 def create_bu_flc_logs(session, flc_records, user_id):
     flc_logs = []
@@ -259,9 +256,10 @@ def create_dmm_flc_logs(session, flc_records, user_id):
     
     session.add_all(flc_logs)
 
-def flc_cu(data_list: List[FLCCUModel], user_id: int, background_tasks: BackgroundTasks):
+def flc_cu(data_list: List[FLCCUModel], principal: Principal, background_tasks: BackgroundTasks):
     if not data_list:
         raise HTTPException(status_code=400, detail="No data provided")
+    user_id = principal.user_id
     
     try:
         with Database.get_session() as session:
@@ -341,76 +339,70 @@ def flc_cu(data_list: List[FLCCUModel], user_id: int, background_tasks: Backgrou
             validate_component_box_assignment(session, all_serials, component_box_map)
             
             deo_user_id = get_deo_user_id(session, user_id)
-            flc_records = []
             
+            # Pairing ids come from the sequence up front, so every row below is built in memory
+            paired = [data for data in data_list if data.dmm_serial]
+            pairing_ids = allocate_pairing_ids(session, len(paired))
+            pairing_by_cu = {data.cu_serial: pairing_id for data, pairing_id in zip(paired, pairing_ids)}
+            if pairing_ids:
+                session.execute(insert(PairingRecord), [
+                    {'id': pairing_id, 'created_by_id': user_id} for pairing_id in pairing_ids
+                ])
+                session.execute(insert(PairingRecordLogs), [
+                    {'created_by_id': user_id} for _ in pairing_ids
+                ])
+            
+            component_rows = []
             for data in data_list:
-                pairing_id = None
-                
-                # Create pairing only for complete CU records
-                if data.dmm_serial:
-                    pairing = PairingRecord(created_by_id=user_id)
-                    session.add(pairing)
-                    session.flush()
-                    pairing_id = pairing.id
-                    
-                    pairing_log = PairingRecordLogs(
-                        evm_id=None,
-                        polling_station_id=None,
-                        created_by_id=user_id,
-                        completed_by_id=None,
-                        completed_at=None
-                    )
-                    session.add(pairing_log)
-                    session.flush()
-                
-                # Create CU component
-                cu, cu_log = create_or_update_component_safe(
-                    session, data.cu_serial, EVMComponentType.CU, 
-                    data.cu_dom, data.box_no, deo_user_id, data.passed, pairing_id
-                )
-                
-                # Initialize optional components
-                dmm = dmm_log = dmm_seal = dmm_seal_log = pink_seal = pink_seal_log = None
-                
-                # Create optional components if provided
+                members = [(data.cu_serial, EVMComponentType.CU, data.cu_dom)]
                 if data.dmm_serial:
-                    dmm, dmm_log = create_or_update_component_safe(
-                        session, data.dmm_serial, EVMComponentType.DMM, 
-                        data.dmm_dom, data.box_no, deo_user_id, data.passed, pairing_id
-                    )
-                    dmm_seal, dmm_seal_log = create_or_update_component_safe(
-                        session, data.dmm_seal_serial, EVMComponentType.DMM_SEAL, 
-                        None, data.box_no, deo_user_id, data.passed, pairing_id
-                    )
-                    pink_seal, pink_seal_log = create_or_update_component_safe(
-                        session, data.pink_paper_seal_serial, EVMComponentType.PINK_PAPER_SEAL, 
-                        None, data.box_no, deo_user_id, data.passed, pairing_id
-                    )
-                
-                # Create FLC record
-                flc = FLCRecord(
-                    cu_id=cu.id,
-                    dmm_id=dmm.id if dmm else None,
-                    dmm_seal_id=dmm_seal.id if dmm_seal else None,
-                    pink_paper_seal_id=pink_seal.id if pink_seal else None,
-                    box_no=data.box_no,
-                    passed=data.passed,
-                    remarks=data.remarks,
-                    flc_by_id=user_id
-                )
-                flc_records.append(flc)
-                
-                # Set log IDs
-                flc.cu_log_id = cu_log.id
-                flc.dmm_log_id = dmm_log.id if dmm_log else None
-                flc.dmm_seal_log_id = dmm_seal_log.id if dmm_seal_log else None
-                flc.pink_paper_seal_log_id = pink_seal_log.id if pink_seal_log else None
-            
-            session.add_all(flc_records)
-            session.flush()
+                    members += [
+                        (data.dmm_serial, EVMComponentType.DMM, data.dmm_dom),
+                        (data.dmm_seal_serial, EVMComponentType.DMM_SEAL, None),
+                        (data.pink_paper_seal_serial, EVMComponentType.PINK_PAPER_SEAL, None),
+                    ]
+                for serial, component_type, dom in members:
+                    component_rows.append({
+                        'serial_number': serial,
+                        'component_type': component_type,
+                        'dom': dom,
+                        'box_no': data.box_no,
+                        'status': "FLC_Passed" if data.passed else "FLC_Failed",
+                        'is_verified': True,
+                        'current_user_id': deo_user_id,
+                        'pairing_id': pairing_by_cu.get(data.cu_serial),
+                    })
+            
+            component_ids = dict(session.execute(
+                insert(EVMComponent).returning(EVMComponent.serial_number, EVMComponent.id),
+                [dict(row, last_received_from_id=3, date_of_receipt=datetime.now(), is_sec_approved=True)
+                 for row in component_rows]
+            ).all())
+            log_ids = dict(session.execute(
+                insert(EVMComponentLogs).returning(EVMComponentLogs.serial_number, EVMComponentLogs.id),
+                [dict(row, current_warehouse_id=None) for row in component_rows]
+            ).all())
+            
+            flc_rows = []
+            flc_log_rows = []
+            for data in data_list:
+                for ids, rows in ((component_ids, flc_rows), (log_ids, flc_log_rows)):
+                    rows.append({
+                        'cu_id': ids[data.cu_serial],
+                        'dmm_id': ids.get(data.dmm_serial),
+                        'dmm_seal_id': ids.get(data.dmm_seal_serial),
+                        'pink_paper_seal_id': ids.get(data.pink_paper_seal_serial),
+                        'box_no': data.box_no,
+                        'passed': data.passed,
+                        'remarks': data.remarks,
+                        'flc_by_id': user_id
+                    })
+            session.execute(insert(FLCRecord), flc_rows)
+            session.execute(insert(FLCRecordLogs), flc_log_rows)
             
-            create_cu_flc_logs_simple(session, flc_records, user_id)
             update_box_counts(session, box_assignments)
+            refresh_msr(session, [component_ids[data.cu_serial] for data in data_list] +
+                        [component_ids[data.dmm_serial] for data in paired])
             session.commit()
             
             return Response(status_code=200, content="FLC processing completed successfully")
@@ -422,9 +414,10 @@ def flc_cu(data_list: List[FLCCUModel], user_id: int, background_tasks: Backgrou
         raise HTTPException(status_code=500, detail="FLC processing failed")
     
 
-def flc_bu(data_list: List[FLCBUModel], user_id: int, background_tasks: BackgroundTasks):
+def flc_bu(data_list: List[FLCBUModel], principal: Principal, background_tasks: BackgroundTasks):
     if not data_list:
         raise HTTPException(status_code=400, detail="No data provided")
+    user_id = principal.user_id
     
     try:
         with Database.get_session() as session:
@@ -502,6 +495,7 @@ def flc_bu(data_list: List[FLCBUModel], user_id: int, background_tasks: Backgrou
             
             create_bu_flc_logs(session, flc_records, user_id)
             update_box_counts(session, box_assignments)
+            refresh_msr(session, [flc.bu_id for flc in flc_records])
             session.commit()
             
             return Response(status_code=200, content="FLC processing completed successfully")
@@ -512,9 +506,10 @@ def flc_bu(data_list: List[FLCBUModel], user_id: int, background_tasks: Backgrou
         logger.error(f"FLC BU error: {e}")
         raise HTTPException(status_code=500, detail="FLC processing failed")
 
-def flc_dmm(data_list: List[FLCDMMModel], user_id: int, background_tasks: BackgroundTasks):
+def flc_dmm(data_list: List[FLCDMMModel], principal: Principal, background_tasks: BackgroundTasks):
     if not data_list:
         raise HTTPException(status_code=400, detail="No data provided")
+    user_id = principal.user_id
     
     try:
         with Database.get_session() as session:
@@ -579,6 +574,7 @@ def flc_dmm(data_list: List[FLCDMMModel], user_id: int, background_tasks: Backgr
             session.flush()
             
             create_dmm_flc_logs(session, flc_records, user_id)
+            refresh_msr(session, [flc.dmm_id for flc in flc_records])
             session.commit()
             
             return Response(status_code=200, content="FLC DMM processing completed successfully")
@@ -590,7 +586,7 @@ def flc_dmm(data_list: List[FLCDMMModel], user_id: int, background_tasks: Backgr
         raise HTTPException(status_code=500, detail="DMM FLC processing failed")
 
 
-def generate_dmm_flc_pdf(district_id: int, background_tasks: BackgroundTasks):
+def render_dmm_flc_pdf(district_id: int):
     try:
         with Database.get_session() as session:
   
@@ -598,6 +594,7 @@ def generate_dmm_flc_pdf(district_id: int, background_tasks: BackgroundTasks):
                 .join(User, FLCDMMUnit.flc_by_id == User.id)\
                 .join(EVMComponent, FLCDMMUnit.dmm_id == EVMComponent.id)\
                 .filter(User.district_id == district_id)\
+                .order_by(FLCDMMUnit.id)\
                 .all()
             
             if not flc_records:
@@ -613,9 +610,7 @@ def generate_dmm_flc_pdf(district_id: int, background_tasks: BackgroundTasks):
                 "date_of_receipt": record[2]  
             } for record in flc_records]
             
-            pdf_filename = FLC_Certificate_CU(pdf_data)
-            background_tasks.add_task(remove_file, pdf_filename)
-            return FileResponse(pdf_filename, media_type='application/pdf', filename=pdf_filename)
+        return PDFRenderer.render(FLC_Certificate_CU, pdf_data, cache=True)
     
     except HTTPException:
         raise
@@ -624,7 +619,11 @@ def generate_dmm_flc_pdf(district_id: int, background_tasks: BackgroundTasks):
         raise HTTPException(status_code=500, detail="PDF generation failed")
 
 
-def generate_bu_flc_pdf(district_id: int, background_tasks: BackgroundTasks):
+def generate_dmm_flc_pdf(district_id: int, background_tasks: BackgroundTasks):
+    return pdf_response(render_dmm_flc_pdf(district_id))
+
+
+def render_bu_flc_pdf(district_id: int):
     try:
         with Database.get_session() as session:
 
@@ -632,6 +631,7 @@ def generate_bu_flc_pdf(district_id: int, background_tasks: BackgroundTasks):
                 .join(User, FLCBallotUnit.flc_by_id == User.id)\
                 .join(EVMComponent, FLCBallotUnit.bu_id == EVMComponent.id)\
                 .filter(User.district_id == district_id)\
+                .order_by(FLCBallotUnit.id)\
                 .all()
             
             if not flc_records:
@@ -643,9 +643,7 @@ def generate_bu_flc_pdf(district_id: int, background_tasks: BackgroundTasks):
                 "date_of_receipt": record[2] 
             } for record in flc_records]
             
-            pdf_filename = FLC_Certificate_BU(pdf_data)
-            background_tasks.add_task(remove_file, pdf_filename)
-            return FileResponse(pdf_filename, media_type='application/pdf', filename=pdf_filename)
+        return PDFRenderer.render(FLC_Certificate_BU, pdf_data, cache=True)
     
     except HTTPException:
         raise
@@ -654,7 +652,11 @@ def generate_bu_flc_pdf(district_id: int, background_tasks: BackgroundTasks):
         raise HTTPException(status_code=500, detail="PDF generation failed")
 
 
-def generate_cu_flc_pdf(district_id: int, background_tasks: BackgroundTasks):
+def generate_bu_flc_pdf(district_id: int, background_tasks: BackgroundTasks):
+    return pdf_response(render_bu_flc_pdf(district_id))
+
+
+def render_cu_flc_pdf(district_id: int):
     try:
         with Database.get_session() as session:
             CU = aliased(EVMComponent)
@@ -680,6 +682,7 @@ def generate_cu_flc_pdf(district_id: int, background_tasks: BackgroundTasks):
             .outerjoin(DMMSeal, FLCRecord.dmm_seal_id == DMMSeal.id)\
             .outerjoin(PinkSeal, FLCRecord.pink_paper_seal_id == PinkSeal.id)\
             .filter(User.district_id == district_id)\
+            .order_by(FLCRecord.id)\
             .all()
             
             if not flc_records:
@@ -701,9 +704,7 @@ def generate_cu_flc_pdf(district_id: int, background_tasks: BackgroundTasks):
                     "date_of_receipt": receipt_date
                 })
             
-            pdf_filename = FLC_Certificate_CU(pdf_data)
-            background_tasks.add_task(remove_file, pdf_filename)
-            return FileResponse(pdf_filename, media_type='application/pdf', filename=pdf_filename)
+        return PDFRenderer.render(FLC_Certificate_CU, pdf_data, cache=True)
     
     except HTTPException:
         raise
@@ -711,6 +712,10 @@ def generate_cu_flc_pdf(district_id: int, background_tasks: BackgroundTasks):
         logger.error(f"CU PDF generation error: {e}")
         raise HTTPException(status_code=500, detail="PDF generation failed")
 
+
+def generate_cu_flc_pdf(district_id: int, background_tasks: BackgroundTasks):
+    return pdf_response(render_cu_flc_pdf(district_id))
+
 def view_flc_components(component_type: str, district_id: int):
     with Database.get_session() as session:
         flc_records = []
@@ -6,11 +6,12 @@ from fastapi import HTTPException
 from typing import Optional, List
 from fastapi.responses import FileResponse
 from annexure.Annex_3 import FLC_Certificate_BU, FLC_Certificate_CU
-from annexure.box_wise_sticker import Box_wise_sticker
+from annexure.box_wise_sticker import Box_wise_sticker, Box
 import logging
 from models.users import User
 from sqlalchemy import and_
 from utils.delete_file import remove_file
+from utils.pdf_renderer import PDFRenderer, pdf_response
 
 logger = logging.getLogger(__name__)
 
@@ -473,7 +474,7 @@ def _create_dmm_logs(session, data_list, user_id):
         # Don't fail main operation for logging errors
         session.rollback()
 
-def generate_box_wise_sticker(district_id: str, filename: str = "Box_Wise_Sticker.pdf") -> str:
+def render_box_wise_sticker(district_id: str, filename: str = "Box_Wise_Sticker.pdf"):
     try:
         with Database.get_session() as db:
             components_query = db.query(
@@ -548,7 +549,7 @@ def generate_box_wise_sticker(district_id: str, filename: str = "Box_Wise_Sticke
                 box_dict[box_no].append({
                     "serial_no": component.serial_number,
                     "status": component.status,
-                    "flc_date": flc_date.isoformat() if flc_date else None
+                    "flc_date": flc_date.isoformat() if flc_date else ""
                 })
             
             # Convert to list format with proper sorting
@@ -561,15 +562,21 @@ def generate_box_wise_sticker(district_id: str, filename: str = "Box_Wise_Sticke
             )
             
             for box_no in sorted_boxes:
-                boxes_data.append({
-                    "box_no": box_no,
-                    "components": box_dict[box_no]
-                })
-            
-            # Generate PDF using the boxes data
-            pdf = Box_wise_sticker(boxes_data, filename)
-            return FileResponse(pdf, media_type='application/pdf', filename="Box_Wise_Sticker.pdf")
+                boxes_data.append(Box(
+                    box_no=box_no,
+                    components=box_dict[box_no]
+                ))
+
+            # The sticker layout follows the type of the first component listed
+            first_component_type = components[0].component_type.value if components else "BU"
+
+        # Generate PDF using the boxes data
+        return PDFRenderer.render(Box_wise_sticker, boxes_data, first_component_type, filename, cache=True)
     except Exception as e:
             # Log the error in production
         print(f"Error in generate_district_components_pdf: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+
+def generate_box_wise_sticker(district_id: str, filename: str = "Box_Wise_Sticker.pdf"):
+    return pdf_response(render_box_wise_sticker(district_id, filename))
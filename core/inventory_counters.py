@@ -0,0 +1,229 @@
+"""Maintains the dashboard inventory counters (models.inventory).
+
+`inventory_counts` holds how many components each (district, user, type, status)
+key has; `inventory_counted` remembers the key every component is counted under.
+`refresh_inventory(db, ids)` moves the touched components from their old key to
+their current one in the caller's transaction; refresh_msr calls it, so every
+write path that keeps the MSR register current keeps the counters current too.
+
+Changes made outside those paths (a user moved to another district, manual SQL)
+are repaired by `reconcile_inventory()`, which InventoryReconciler runs
+periodically. To create the tables and backfill them:
+
+    python -m core.inventory_counters
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from typing import Iterable
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from core.db import Database
+from models.evm import EVMComponent
+from models.users import User
+from models.inventory import InventoryCount, InventoryCountedComponent
+from utils.executor import DBExecutor
+from utils.redis import RedisClient
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+
+
+def _chunks(values, size=CHUNK_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _key(district_id, user_id, component_type, status):
+    component_type = getattr(component_type, "value", component_type)
+    return (district_id or 0, user_id or 0, component_type, status or "")
+
+
+def _apply(db, deltas: Counter) -> int:
+    """Add the non-zero deltas to their counters, in key order so concurrent writers lock alike."""
+    rows = [
+        {'district_id': k[0], 'user_id': k[1], 'component_type': k[2], 'status': k[3], 'count': delta}
+        for k, delta in sorted(deltas.items()) if delta
+    ]
+    if not rows:
+        return 0
+    stmt = pg_insert(InventoryCount)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[InventoryCount.district_id, InventoryCount.user_id,
+                            InventoryCount.component_type, InventoryCount.status],
+            set_={'count': InventoryCount.count + stmt.excluded.count}
+        ),
+        rows
+    )
+    return len(rows)
+
+
+def refresh_inventory(db, component_ids: Iterable[int]) -> int:
+    """Move the given components to the counters matching their current state.
+
+    Runs in the caller's transaction (pending changes are flushed first); call it
+    before committing. Deleted components are taken off their old counter.
+    Returns the number of counters changed.
+    """
+    ids = {i for i in component_ids if i is not None}
+    if not ids:
+        return 0
+    db.flush()
+    deltas = Counter()
+    for chunk in _chunks(sorted(ids)):
+        current = {
+            c.id: _key(c.district_id, c.current_user_id, c.component_type, c.status)
+            for c in db.query(
+                EVMComponent.id, EVMComponent.component_type, EVMComponent.status,
+                EVMComponent.current_user_id, User.district_id
+            ).outerjoin(User, EVMComponent.current_user_id == User.id).filter(
+                EVMComponent.id.in_(chunk)
+            ).all()
+        }
+        # Locking the shadow rows serializes concurrent moves of the same component
+        counted = {
+            c.component_id: (c.district_id, c.user_id, c.component_type, c.status)
+            for c in db.query(InventoryCountedComponent).filter(
+                InventoryCountedComponent.component_id.in_(chunk)
+            ).order_by(InventoryCountedComponent.component_id).with_for_update().all()
+        }
+
+        moved = []
+        for component_id in chunk:
+            old, new = counted.get(component_id), current.get(component_id)
+            if old == new:
+                continue
+            if old is not None:
+                deltas[old] -= 1
+            if new is not None:
+                deltas[new] += 1
+                moved.append({
+                    'component_id': component_id, 'district_id': new[0], 'user_id': new[1],
+                    'component_type': new[2], 'status': new[3]
+                })
+
+        gone = [i for i in counted if i not in current]
+        if gone:
+            db.query(InventoryCountedComponent).filter(
+                InventoryCountedComponent.component_id.in_(gone)
+            ).delete(synchronize_session=False)
+        if moved:
+            stmt = pg_insert(InventoryCountedComponent)
+            db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[InventoryCountedComponent.component_id],
+                    set_={column: stmt.excluded[column]
+                          for column in ('district_id', 'user_id', 'component_type', 'status')}
+                ),
+                moved
+            )
+    return _apply(db, deltas)
+
+
+# Components whose shadow row does not match their current state, or has no component
+_DRIFTED_COMPONENTS = text("""
+    SELECT COALESCE(c.id, ic.component_id)
+    FROM evm_components c
+    LEFT JOIN users u ON u.id = c.current_user_id
+    FULL JOIN inventory_counted ic ON ic.component_id = c.id
+    WHERE (COALESCE(u.district_id, 0), COALESCE(c.current_user_id, 0),
+           CAST(c.component_type AS TEXT), COALESCE(c.status, ''))
+          IS DISTINCT FROM
+          (ic.district_id, ic.user_id, ic.component_type, ic.status)
+""")
+
+# Counters that differ from the shadow; one statement, so one consistent snapshot
+_DRIFTED_COUNTS = text("""
+    SELECT district_id, user_id, component_type, status,
+           COALESCE(expected.n, 0) - COALESCE(stored.count, 0)
+    FROM (
+        SELECT district_id, user_id, component_type, status, COUNT(*) AS n
+        FROM inventory_counted
+        GROUP BY district_id, user_id, component_type, status
+    ) expected
+    FULL JOIN inventory_counts stored USING (district_id, user_id, component_type, status)
+    WHERE COALESCE(expected.n, 0) <> COALESCE(stored.count, 0)
+""")
+
+
+def reconcile_inventory(batch_size: int = CHUNK_SIZE) -> int:
+    """Fix counters that drifted from evm_components without blocking writers.
+
+    Components whose counted key is stale are moved through refresh_inventory in
+    short batches, taking the same row locks as any write path. Counters that
+    still disagree with the shadow are then corrected by the difference seen in
+    one snapshot; since writers only add deltas, the correction stays right
+    whatever they commit meanwhile. Returns the number of counters corrected.
+    """
+    started = time.perf_counter()
+    with Database.get_session() as db:
+        try:
+            drifted = [i for (i,) in db.execute(_DRIFTED_COMPONENTS)]
+            db.commit()
+            for chunk in _chunks(drifted, batch_size):
+                refresh_inventory(db, chunk)
+                db.commit()
+
+            deltas = Counter({tuple(row[:4]): row[4] for row in db.execute(_DRIFTED_COUNTS)})
+            fixed = _apply(db, deltas)
+            db.query(InventoryCount).filter(InventoryCount.count == 0).delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    if drifted or fixed:
+        logger.warning(f"Inventory counters reconciled: {len(drifted)} components recounted, "
+                       f"{fixed} counters corrected")
+    logger.info(f"Inventory reconcile took {time.perf_counter() - started:.1f}s")
+    return fixed
+
+
+class InventoryReconciler:
+    """Runs reconcile_inventory every INVENTORY_RECONCILE_INTERVAL seconds on one worker at a time."""
+
+    _task = None
+
+    INTERVAL = int(os.getenv("INVENTORY_RECONCILE_INTERVAL", 900))
+    LOCK_NAME = "inventory:reconcile"
+
+    @classmethod
+    async def _loop(cls, interval: int):
+        while True:
+            await asyncio.sleep(interval)
+            token = await RedisClient.acquire_lock(cls.LOCK_NAME, ttl_ms=interval * 1000)
+            if token is None:
+                continue  # Another worker has it this round
+            try:
+                await DBExecutor.run(reconcile_inventory, lane="bulk")
+            except Exception as e:
+                print(f"Error reconciling inventory counters: {e}")
+            finally:
+                await RedisClient.release_lock(cls.LOCK_NAME, token)
+
+    @classmethod
+    def start(cls, interval: int = None):
+        cls._task = asyncio.create_task(cls._loop(interval or cls.INTERVAL))
+
+    @classmethod
+    def stop(cls):
+        if cls._task:
+            cls._task.cancel()
+            cls._task = None
+
+
+def create_tables():
+    Database.initialize()
+    with Database._engine.begin() as conn:
+        InventoryCount.__table__.create(conn, checkfirst=True)
+        InventoryCountedComponent.__table__.create(conn, checkfirst=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    create_tables()
+    print(f"Inventory counters corrected: {reconcile_inventory()}")
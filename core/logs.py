@@ -1,10 +1,12 @@
 from typing import Optional, List, Dict, Any
 from datetime import datetime, date
 from math import ceil
+from fastapi import HTTPException
+from sqlalchemy import select, literal, String, tuple_, union_all
 from models.logs import EVMComponentLogs, AllotmentItemLogs, AllotmentLogs, PairingRecordLogs, FLCBallotUnitLogs, FLCRecordLogs
 from core.db import Database
-from models.users import User, LocalBody, District, Warehouse
-from models.evm import PollingStation
+from core.names import NameResolver
+from utils.cursor import encode_keyset_cursor, decode_keyset_cursor, filter_signature
 
 
 
@@ -41,82 +43,117 @@ def apply_date_filter(query, model, start_date: Optional[date], end_date: Option
     return query
 
 
+# Single lookups; pages of logs should load() their ids into one NameResolver instead
 def get_user_name(db, user_id: int):
-    if not user_id:
-        return None
-    user = db.query(User).filter(User.id == user_id).first()
-    return user.username if user else None
+    return NameResolver(db).user(user_id)
 
 
 def get_district_name(db, district_id: int):
-    if not district_id:
-        return None
-    district = db.query(District).filter(District.id == district_id).first()
-    return district.name if district else None
+    return NameResolver(db).district(district_id)
 
 
 def get_local_body_name(db, local_body_id: str):
-    if not local_body_id:
-        return None
-    local_body = db.query(LocalBody).filter(LocalBody.id == local_body_id).first()
-    return local_body.name if local_body else None
+    return NameResolver(db).local_body(local_body_id)
 
 
 def get_warehouse_name(db, warehouse_id: str):
-    if not warehouse_id:
-        return None
-    warehouse = db.query(Warehouse).filter(Warehouse.id == warehouse_id).first()
-    return warehouse.name if warehouse else None
+    return NameResolver(db).warehouse(warehouse_id)
 
 
 def get_polling_station_name(db, polling_station_id: int):
-    if not polling_station_id:
-        return None
-    ps = db.query(PollingStation).filter(PollingStation.id == polling_station_id).first()
-    return ps.name if ps else None
+    return NameResolver(db).polling_station(polling_station_id)
 
 
-def get_all_logs_data(page: int, page_size: int, start_date: Optional[date], end_date: Optional[date]):
+def get_component_logs(db, ids) -> Dict[int, Any]:
+    """Component log rows by id, fetched with one IN query."""
+    ids = list({i for i in ids if i})
+    if not ids:
+        return {}
+    return {c.id: c for c in db.query(EVMComponentLogs).filter(EVMComponentLogs.id.in_(ids)).all()}
+
+
+# Sources of the unified timeline: (type, model, timestamp column)
+TIMELINE_SOURCES = (
+    ("allotment", AllotmentLogs, AllotmentLogs.created_at),
+    ("component", EVMComponentLogs, EVMComponentLogs.created_on),
+    ("pairing", PairingRecordLogs, PairingRecordLogs.created_at),
+    ("flc_record", FLCRecordLogs, FLCRecordLogs.flc_date),
+    ("flc_bu", FLCBallotUnitLogs, FLCBallotUnitLogs.flc_date),
+)
+
+
+def _timeline_branch(log_type, model, timestamp, start_date, end_date, after, limit):
+    """Newest `limit` rows of one log table past the cursor, as (created_at, type, id)."""
+    query = select(
+        timestamp.label("created_at"),
+        literal(log_type, String).label("type"),
+        model.id.label("id")
+    ).where(timestamp.isnot(None))
+    if start_date:
+        query = query.where(timestamp >= start_date)
+    if end_date:
+        query = query.where(timestamp <= end_date)
+    if after:
+        # (created_at, type, id) < cursor, with this branch's type fixed, as a range
+        # on the (timestamp, id) index
+        after_at, after_type, after_id = after
+        if log_type < after_type:
+            query = query.where(timestamp <= after_at)
+        elif log_type == after_type:
+            query = query.where(tuple_(timestamp, model.id) < tuple_(after_at, after_id))
+        else:
+            query = query.where(timestamp < after_at)
+    return query.order_by(timestamp.desc(), model.id.desc()).limit(limit).subquery()
+
+
+def get_all_logs_data(page_size: int, cursor: Optional[str], start_date: Optional[date], end_date: Optional[date]):
+    """One page of all logs, newest first, ordered by (created_at, type, id).
+
+    Every table contributes at most page_size + 1 rows past the cursor, so any page
+    costs the same as the first. The total is only counted for the first page.
+    """
+    signature = filter_signature({"start_date": start_date, "end_date": end_date})
+    after = None
+    if cursor:
+        after_at, after_type, after_id = decode_keyset_cursor(cursor, signature, 3)
+        try:
+            after = (datetime.fromisoformat(after_at), str(after_type), int(after_id))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
     with Database.get_session() as db:
-        all_logs = []
-        
-        log_configs = [
-            ("allotment", AllotmentLogs, "created_at"),
-            ("component", EVMComponentLogs, "created_on"),
-            ("pairing", PairingRecordLogs, "created_at"),
-            ("flc_record", FLCRecordLogs, "flc_date"),
-            ("flc_bu", FLCBallotUnitLogs, "flc_date")
-        ]
-        
-        for log_type, model, timestamp_field in log_configs:
-            query = db.query(model)
-            query = apply_date_filter(query, model, start_date, end_date)
-            
-            for log in query.all():
-                created_time = getattr(log, timestamp_field, None) or datetime.min
-                all_logs.append({
-                    "type": log_type,
-                    "id": log.id,
-                    "created_at": created_time,
-                    "data": log
-                })
-        
-        # Sort newest first
-        all_logs.sort(key=lambda x: x['created_at'], reverse=True)
-        
-        # Pagination
-        total = len(all_logs)
-        start = (page - 1) * page_size
-        end = start + page_size
-        paginated_logs = all_logs[start:end]
-        
-        return {
-            "items": [{"type": log["type"], "id": log["id"], "created_at": log["created_at"]} for log in paginated_logs],
-            "total": total,
-            "page": page,
-            "page_size": page_size,
-            "total_pages": ceil(total / page_size)
-        }
+        branches = []
+        for log_type, model, timestamp in TIMELINE_SOURCES:
+            branch = _timeline_branch(log_type, model, timestamp, start_date, end_date, after, page_size + 1)
+            branches.append(select(branch.c.created_at, branch.c.type, branch.c.id))
+        timeline = union_all(*branches).subquery("timeline")
+        rows = db.execute(
+            select(timeline.c.created_at, timeline.c.type, timeline.c.id)
+            .order_by(timeline.c.created_at.desc(), timeline.c.type.desc(), timeline.c.id.desc())
+            .limit(page_size + 1)
+        ).all()
+
+        total = None
+        if not cursor:
+            total = sum(
+                apply_date_filter(db.query(model.id), model, start_date, end_date).filter(timestamp.isnot(None)).count()
+                for _, model, timestamp in TIMELINE_SOURCES
+            )
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_keyset_cursor([last.created_at.isoformat(), last.type, last.id], signature)
+
+    return {
+        "items": [{"type": row.type, "id": row.id, "created_at": row.created_at} for row in rows],
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+        "total": total,
+        "page_size": page_size
+    }
 
 
 def get_allotment_logs_data(page: int, page_size: int, start_date: Optional[date], end_date: Optional[date]):
@@ -124,6 +161,12 @@ def get_allotment_logs_data(page: int, page_size: int, start_date: Optional[date
         query = db.query(AllotmentLogs)
         query = apply_date_filter(query, AllotmentLogs, start_date, end_date)
         result = get_paginated_response(query, page, page_size)
+        names = NameResolver(db).load(
+            result["items"],
+            user=("from_user_id", "to_user_id"),
+            district=("from_district_id", "to_district_id"),
+            local_body=("from_local_body_id", "to_local_body_id")
+        )
         
         formatted_items = []
         for log in result["items"]:
@@ -131,12 +174,12 @@ def get_allotment_logs_data(page: int, page_size: int, start_date: Optional[date
                 "id": log.id,
                 
                 "allotment_type": log.allotment_type.value if log.allotment_type else None,
-                "from_user": get_user_name(db, log.from_user_id),
-                "to_user": get_user_name(db, log.to_user_id),
-                "from_district": get_district_name(db, log.from_district_id),
-                "to_district": get_district_name(db, log.to_district_id),
-                "from_local_body": get_local_body_name(db, log.from_local_body_id),
-                "to_local_body": get_local_body_name(db, log.to_local_body_id),
+                "from_user": names.user(log.from_user_id),
+                "to_user": names.user(log.to_user_id),
+                "from_district": names.district(log.from_district_id),
+                "to_district": names.district(log.to_district_id),
+                "from_local_body": names.local_body(log.from_local_body_id),
+                "to_local_body": names.local_body(log.to_local_body_id),
                 "reject_reason": log.reject_reason,
                 "status": log.status,
                 "created_at": log.created_at,
@@ -155,9 +198,11 @@ def get_allotment_item_logs_data(page: int, page_size: int, start_date: Optional
         query = apply_date_filter(query, AllotmentLogs, start_date, end_date)
         result = get_paginated_response(query, page, page_size)
         
+        components = get_component_logs(db, (item.evm_component_id for item in result["items"]))
+        
         formatted_items = []
         for item in result["items"]:
-            component = db.query(EVMComponentLogs).filter(EVMComponentLogs.id == item.evm_component_id).first()
+            component = components.get(item.evm_component_id)
             formatted_items.append({
                 "id": item.id,
                 "allotment_id": item.allotment_id,
@@ -175,6 +220,7 @@ def get_component_logs_data(page: int, page_size: int, start_date: Optional[date
         query = db.query(EVMComponentLogs)
         query = apply_date_filter(query, EVMComponentLogs, start_date, end_date)
         result = get_paginated_response(query, page, page_size)
+        names = NameResolver(db).load(result["items"], user=("current_user_id",), warehouse=("current_warehouse_id",))
         
         formatted_items = []
         for log in result["items"]:
@@ -186,8 +232,8 @@ def get_component_logs_data(page: int, page_size: int, start_date: Optional[date
                 "is_verified": log.is_verified,
                 "dom": log.dom,
                 "box_no": log.box_no,
-                "current_user": get_user_name(db, log.current_user_id),
-                "current_warehouse": get_warehouse_name(db, log.current_warehouse_id),
+                "current_user": names.user(log.current_user_id),
+                "current_warehouse": names.warehouse(log.current_warehouse_id),
                 "created_on": log.created_on
             })
         
@@ -200,16 +246,21 @@ def get_pairing_logs_data(page: int, page_size: int, start_date: Optional[date],
         query = db.query(PairingRecordLogs)
         query = apply_date_filter(query, PairingRecordLogs, start_date, end_date)
         result = get_paginated_response(query, page, page_size)
+        names = NameResolver(db).load(
+            result["items"],
+            user=("created_by_id", "completed_by_id"),
+            polling_station=("polling_station_id",)
+        )
         
         formatted_items = []
         for log in result["items"]:
             formatted_items.append({
                 "id": log.id,
                 "evm_id": log.evm_id,
-                "polling_station": get_polling_station_name(db, log.polling_station_id),
-                "created_by": get_user_name(db, log.created_by_id),
+                "polling_station": names.polling_station(log.polling_station_id),
+                "created_by": names.user(log.created_by_id),
                 "created_at": log.created_at,
-                "completed_by": get_user_name(db, log.completed_by_id),
+                "completed_by": names.user(log.completed_by_id),
                 "completed_at": log.completed_at
             })
         
@@ -222,13 +273,19 @@ def get_flc_record_logs_data(page: int, page_size: int, start_date: Optional[dat
         query = db.query(FLCRecordLogs)
         query = apply_date_filter(query, FLCRecordLogs, start_date, end_date)
         result = get_paginated_response(query, page, page_size)
+        names = NameResolver(db).load(result["items"], user=("flc_by_id",))
+        components = get_component_logs(db, (
+            component_id
+            for log in result["items"]
+            for component_id in (log.cu_id, log.dmm_id, log.dmm_seal_id, log.pink_paper_seal_id)
+        ))
         
         formatted_items = []
         for log in result["items"]:
-            cu = db.query(EVMComponentLogs).filter(EVMComponentLogs.id == log.cu_id).first()
-            dmm = db.query(EVMComponentLogs).filter(EVMComponentLogs.id == log.dmm_id).first()
-            dmm_seal = db.query(EVMComponentLogs).filter(EVMComponentLogs.id == log.dmm_seal_id).first()
-            pink_seal = db.query(EVMComponentLogs).filter(EVMComponentLogs.id == log.pink_paper_seal_id).first()
+            cu = components.get(log.cu_id)
+            dmm = components.get(log.dmm_id)
+            dmm_seal = components.get(log.dmm_seal_id)
+            pink_seal = components.get(log.pink_paper_seal_id)
             
             formatted_items.append({
                 "id": log.id,
@@ -239,7 +296,7 @@ def get_flc_record_logs_data(page: int, page_size: int, start_date: Optional[dat
                 "box_no": log.box_no,
                 "passed": log.passed,
                 "remarks": log.remarks,
-                "flc_by": get_user_name(db, log.flc_by_id),
+                "flc_by": names.user(log.flc_by_id),
                 "flc_date": log.flc_date
             })
         
@@ -252,19 +309,34 @@ def get_flc_bu_logs_data(page: int, page_size: int, start_date: Optional[date],
         query = db.query(FLCBallotUnitLogs)
         query = apply_date_filter(query, FLCBallotUnitLogs, start_date, end_date)
         result = get_paginated_response(query, page, page_size)
+        names = NameResolver(db).load(result["items"], user=("flc_by_id",))
+        components = get_component_logs(db, (log.bu_id for log in result["items"]))
         
         formatted_items = []
         for log in result["items"]:
-            component = db.query(EVMComponentLogs).filter(EVMComponentLogs.id == log.bu_id).first()
+            component = components.get(log.bu_id)
             formatted_items.append({
                 "id": log.id,
                 "bu_serial": component.serial_number if component else None,
                 "box_no": log.box_no,
                 "passed": log.passed,
                 "remarks": log.remarks,
-                "flc_by": get_user_name(db, log.flc_by_id),
+                "flc_by": names.user(log.flc_by_id),
                 "flc_date": log.flc_date
             })
         
         result["items"] = formatted_items
-        return result
\ No newline at end of file
+        return result
+
+
+def create_indexes():
+    """Create the timeline indexes declared on the log models on an existing database."""
+    Database.initialize()
+    with Database._engine.begin() as conn:
+        for _, model, _ in TIMELINE_SOURCES:
+            for index in model.__table__.indexes:
+                index.create(conn, checkfirst=True)
+
+
+if __name__ == "__main__":
+    create_indexes()
@@ -7,6 +7,193 @@ from models.users import User, Warehouse
 
 from sqlalchemy import func, text
 
+# Rows fetched per round-trip from the server-side cursor when streaming exports
+EXPORT_BATCH_SIZE = 2000
+
+CU_DMM_COLUMNS = [
+    ('sl_no', 'Sl. No'),
+    ('cu_dmm_received', 'CU/DMM Received From'),
+    ('date_of_receipt', 'Date of Receipt'),
+    ('control_unit_no', 'Control Unit No'),
+    ('month_year_manufacture_cu', 'Month & Year of Manufacture (CU)'),
+    ('dmm_no', 'DMM No'),
+    ('month_year_manufacture_dmm', 'Month & Year of Manufacture (DMM)'),
+    ('dmm_seal_no', 'DMM Seal No'),
+    ('cu_pink_paper_seal_no', 'CU Pink Paper Seal No'),
+    ('flc_date', 'FLC Date'),
+    ('flc_status', 'FLC Status'),
+    ('cu_box_no', 'CU Box No'),
+    ('cu_warehouse', 'Warehouse'),
+    ('present_status_dmm', 'Present Status (DMM)'),
+    ('present_status_cu', 'Present Status (CU)'),
+]
+
+BU_COLUMNS = [
+    ('sl_no', 'Sl. No'),
+    ('bu_received_from', 'BU Received From'),
+    ('date_of_receipt', 'Date of Receipt'),
+    ('ballot_unit_no', 'Ballot Unit No'),
+    ('year_of_manufacture', 'Year of Manufacture'),
+    ('flc_date', 'FLC Date'),
+    ('flc_status', 'FLC Status'),
+    ('bu_box_no', 'BU Box No'),
+    ('bu_warehouse', 'Warehouse'),
+]
+
+def _cu_dmm_query(db, warehouse_id=None):
+    """DMM-based register query, optionally limited to one warehouse"""
+    cu_comp = aliased(EVMComponent, name='cu')
+    dmm_comp = aliased(EVMComponent, name='dmm') 
+    dmm_seal_comp = aliased(EVMComponent, name='dmm_seal')
+    pink_seal_comp = aliased(EVMComponent, name='pink_seal')
+    
+    latest_flc_subquery = db.query(
+        FLCRecord.cu_id,
+        func.max(FLCRecord.flc_date).label('latest_flc_date')
+    ).group_by(FLCRecord.cu_id).subquery()
+    
+    query = db.query(
+        PairingRecord.id.label('pairing_id'),
+        User.username.label('cu_dmm_received'),
+        func.coalesce(cu_comp.date_of_receipt, dmm_comp.date_of_receipt).label('date_of_receipt'),
+        cu_comp.serial_number.label('control_unit_no'),
+        cu_comp.dom.label('cu_manufacture_date'),
+        cu_comp.box_no.label('cu_box_no'),
+        cu_comp.status.label('present_status_cu'),
+        func.coalesce(cu_comp.current_warehouse_id, dmm_comp.current_warehouse_id).label('current_warehouse_id'),
+        func.coalesce(cu_comp.last_received_from_id, dmm_comp.last_received_from_id).label('last_received_from_id'),
+        dmm_comp.serial_number.label('dmm_no'),
+        dmm_comp.dom.label('dmm_manufacture_date'),
+        dmm_comp.status.label('present_status_dmm'),
+        dmm_seal_comp.serial_number.label('dmm_seal_no'),
+        pink_seal_comp.serial_number.label('cu_pink_paper_seal_no'),
+        FLCRecord.flc_date,
+        FLCRecord.passed.label('flc_status'),
+        Warehouse.name.label('cu_warehouse')
+    ).select_from(dmm_comp).filter(
+        dmm_comp.component_type == EVMComponentType.DMM
+    )
+    
+    if warehouse_id is not None:
+        query = query.filter(
+            func.coalesce(cu_comp.current_warehouse_id, dmm_comp.current_warehouse_id) == warehouse_id
+        )
+    
+    query = query.outerjoin(
+        PairingRecord,
+        PairingRecord.id == dmm_comp.pairing_id
+    ).outerjoin(
+        cu_comp, 
+        and_(
+            cu_comp.pairing_id == PairingRecord.id,
+            cu_comp.component_type == EVMComponentType.CU
+        )
+    ).outerjoin(
+        latest_flc_subquery, 
+        latest_flc_subquery.c.cu_id == cu_comp.id
+    ).outerjoin(
+        FLCRecord, 
+        and_(
+            FLCRecord.cu_id == cu_comp.id,
+            FLCRecord.flc_date == latest_flc_subquery.c.latest_flc_date
+        )
+    ).outerjoin(
+        dmm_seal_comp, 
+        and_(
+            dmm_seal_comp.pairing_id == PairingRecord.id,
+            dmm_seal_comp.component_type == EVMComponentType.DMM_SEAL
+        )
+    ).outerjoin(
+        pink_seal_comp, 
+        and_(
+            pink_seal_comp.pairing_id == PairingRecord.id,
+            pink_seal_comp.component_type == EVMComponentType.PINK_PAPER_SEAL
+        )
+    ).outerjoin(
+        Warehouse, 
+        Warehouse.id == func.coalesce(cu_comp.current_warehouse_id, dmm_comp.current_warehouse_id)
+    ).outerjoin(
+        User, 
+        User.id == func.coalesce(cu_comp.last_received_from_id, dmm_comp.last_received_from_id)
+    )
+    
+    return query.order_by(
+        PairingRecord.id.asc().nulls_last(),
+        dmm_comp.id.asc()
+    )
+
+def _format_cu_dmm(i, row):
+    return {
+        'sl_no': i,
+        'cu_dmm_received': row.cu_dmm_received or "",
+        'date_of_receipt': row.date_of_receipt.strftime("%d/%m/%Y") if row.date_of_receipt else "",
+        'control_unit_no': row.control_unit_no or "",
+        'month_year_manufacture_cu': row.cu_manufacture_date or "",
+        'dmm_no': row.dmm_no or "",
+        'month_year_manufacture_dmm': row.dmm_manufacture_date or "",
+        'dmm_seal_no': row.dmm_seal_no or "",
+        'cu_pink_paper_seal_no': row.cu_pink_paper_seal_no or "",
+        'flc_date': row.flc_date.strftime("%d/%m/%Y") if row.flc_date else "",
+        'flc_status': "Passed" if row.flc_status else ("Failed" if row.flc_status is not None else ""),
+        'cu_box_no': str(row.cu_box_no) if row.cu_box_no else "",
+        'cu_warehouse': row.cu_warehouse or "",
+        'present_status_dmm': row.present_status_dmm or "",
+        'present_status_cu': row.present_status_cu or ""
+    }
+
+def _bu_query(db, user_id=None, warehouse_id=None):
+    """BU register query, optionally limited to one holder or warehouse"""
+    latest_flc_subquery = db.query(
+        FLCBallotUnit.bu_id,
+        func.max(FLCBallotUnit.flc_date).label('latest_flc_date')
+    ).group_by(FLCBallotUnit.bu_id).subquery()
+    
+    query = db.query(
+        EVMComponent.id,
+        User.username.label('bu_received_from'),
+        EVMComponent.date_of_receipt,
+        EVMComponent.serial_number.label('ballot_unit_no'),
+        EVMComponent.dom.label('year_of_manufacture'),
+        FLCBallotUnit.flc_date,
+        FLCBallotUnit.passed.label('flc_status'),
+        EVMComponent.box_no.label('bu_box_no'),
+        Warehouse.name.label('bu_warehouse')
+    ).select_from(EVMComponent)\
+    .outerjoin(User, User.id == EVMComponent.last_received_from_id)\
+    .outerjoin(
+        latest_flc_subquery, 
+        latest_flc_subquery.c.bu_id == EVMComponent.id
+    )\
+    .outerjoin(
+        FLCBallotUnit, 
+        and_(
+            FLCBallotUnit.bu_id == EVMComponent.id,
+            FLCBallotUnit.flc_date == latest_flc_subquery.c.latest_flc_date
+        )
+    )\
+    .outerjoin(Warehouse, Warehouse.id == EVMComponent.current_warehouse_id)\
+    .filter(EVMComponent.component_type == EVMComponentType.BU)
+    
+    if user_id is not None:
+        query = query.filter(EVMComponent.current_user_id == user_id)
+    if warehouse_id is not None:
+        query = query.filter(EVMComponent.current_warehouse_id == warehouse_id)
+    
+    return query.order_by(EVMComponent.id)
+
+def _format_bu(i, row):
+    return {
+        'sl_no': i,
+        'bu_received_from': row.bu_received_from or "",
+        'date_of_receipt': row.date_of_receipt.strftime("%d/%m/%Y") if row.date_of_receipt else "",
+        'ballot_unit_no': row.ballot_unit_no or "",
+        'year_of_manufacture': row.year_of_manufacture if row.year_of_manufacture else "",
+        'flc_date': row.flc_date.strftime("%d/%m/%Y") if row.flc_date else "",
+        'flc_status': "Passed" if row.flc_status else ("Failed" if row.flc_status is not None else ""),
+        'bu_box_no': str(row.bu_box_no) if row.bu_box_no else "",
+        'bu_warehouse': row.bu_warehouse or ""
+    }
+
 def MSR_CU_DMM():
     """
     Fetch CU,DMM data in MSR Format including unpaired DMMs. Used by SEC
@@ -14,109 +201,8 @@ def MSR_CU_DMM():
     
     with Database.get_session() as db:
         try:
-            cu_comp = aliased(EVMComponent, name='cu')
-            dmm_comp = aliased(EVMComponent, name='dmm') 
-            dmm_seal_comp = aliased(EVMComponent, name='dmm_seal')
-            pink_seal_comp = aliased(EVMComponent, name='pink_seal')
-            
-     
-            latest_flc_subquery = db.query(
-                FLCRecord.cu_id,
-                func.max(FLCRecord.flc_date).label('latest_flc_date')
-            ).group_by(FLCRecord.cu_id).subquery()
-            
-          
-            query = db.query(
-                PairingRecord.id.label('pairing_id'),
-                User.username.label('cu_dmm_received'),
-                func.coalesce(cu_comp.date_of_receipt, dmm_comp.date_of_receipt).label('date_of_receipt'),
-                cu_comp.serial_number.label('control_unit_no'),
-                cu_comp.dom.label('cu_manufacture_date'),
-                cu_comp.box_no.label('cu_box_no'),
-                cu_comp.status.label('present_status_cu'),
-                func.coalesce(cu_comp.current_warehouse_id, dmm_comp.current_warehouse_id).label('current_warehouse_id'),
-                func.coalesce(cu_comp.last_received_from_id, dmm_comp.last_received_from_id).label('last_received_from_id'),
-                dmm_comp.serial_number.label('dmm_no'),
-                dmm_comp.dom.label('dmm_manufacture_date'),
-                dmm_comp.status.label('present_status_dmm'),
-                dmm_seal_comp.serial_number.label('dmm_seal_no'),
-                pink_seal_comp.serial_number.label('cu_pink_paper_seal_no'),
-                FLCRecord.flc_date,
-                FLCRecord.passed.label('flc_status'),
-                Warehouse.name.label('cu_warehouse')
-            ).select_from(dmm_comp).filter(
-                dmm_comp.component_type == EVMComponentType.DMM
-            )
-            
-         
-            query = query.outerjoin(
-                PairingRecord,
-                PairingRecord.id == dmm_comp.pairing_id
-            ).outerjoin(
-                cu_comp, 
-                and_(
-                    cu_comp.pairing_id == PairingRecord.id,
-                    cu_comp.component_type == EVMComponentType.CU
-                )
-            ).outerjoin(
-                latest_flc_subquery, 
-                latest_flc_subquery.c.cu_id == cu_comp.id
-            ).outerjoin(
-                FLCRecord, 
-                and_(
-                    FLCRecord.cu_id == cu_comp.id,
-                    FLCRecord.flc_date == latest_flc_subquery.c.latest_flc_date
-                )
-            ).outerjoin(
-                dmm_seal_comp, 
-                and_(
-                    dmm_seal_comp.pairing_id == PairingRecord.id,
-                    dmm_seal_comp.component_type == EVMComponentType.DMM_SEAL
-                )
-            ).outerjoin(
-                pink_seal_comp, 
-                and_(
-                    pink_seal_comp.pairing_id == PairingRecord.id,
-                    pink_seal_comp.component_type == EVMComponentType.PINK_PAPER_SEAL
-                )
-            ).outerjoin(
-                Warehouse, 
-                Warehouse.id == func.coalesce(cu_comp.current_warehouse_id, dmm_comp.current_warehouse_id)
-            ).outerjoin(
-                User, 
-                User.id == func.coalesce(cu_comp.last_received_from_id, dmm_comp.last_received_from_id)
-            )
-            
-         
-            results = query.order_by(
-                PairingRecord.id.asc().nulls_last(),
-                dmm_comp.id.asc()
-            ).all()
-            
-          
-            formatted_results = []
-            
-            for i, row in enumerate(results, 1):
-                formatted_row = {
-                    'sl_no': i,
-                    'cu_dmm_received': row.cu_dmm_received or "",
-                    'date_of_receipt': row.date_of_receipt.strftime("%d/%m/%Y") if row.date_of_receipt else "",
-                    'control_unit_no': row.control_unit_no or "",
-                    'month_year_manufacture_cu': row.cu_manufacture_date or "",
-                    'dmm_no': row.dmm_no or "",
-                    'month_year_manufacture_dmm': row.dmm_manufacture_date or "",
-                    'dmm_seal_no': row.dmm_seal_no or "",
-                    'cu_pink_paper_seal_no': row.cu_pink_paper_seal_no or "",
-                    'flc_date': row.flc_date.strftime("%d/%m/%Y") if row.flc_date else "",
-                    'flc_status': "Passed" if row.flc_status else ("Failed" if row.flc_status is not None else ""),
-                    'cu_box_no': str(row.cu_box_no) if row.cu_box_no else "",
-                    'cu_warehouse': row.cu_warehouse or "",
-                    'present_status_dmm': row.present_status_dmm or "",
-                    'present_status_cu': row.present_status_cu or ""
-                }
-                formatted_results.append(formatted_row)
-            
-            return formatted_results
+            results = _cu_dmm_query(db).all()
+            return [_format_cu_dmm(i, row) for i, row in enumerate(results, 1)]
             
         except Exception as e:
       
@@ -228,68 +314,14 @@ def MSR_CU_DMM():
 #         ]
 
 
-
 def MSR_BU_user(user_id):
     """
     Fetch BU data for components with a user in MSR Format
     """
     
     with Database.get_session() as db:
-     
-        latest_flc_subquery = db.query(
-            FLCBallotUnit.bu_id,
-            func.max(FLCBallotUnit.flc_date).label('latest_flc_date')
-        ).group_by(FLCBallotUnit.bu_id).subquery()
-        
-    
-        results = db.query(
-            EVMComponent.id,
-            User.username.label('bu_received_from'),
-            EVMComponent.date_of_receipt,
-            EVMComponent.serial_number.label('ballot_unit_no'),
-            EVMComponent.dom.label('year_of_manufacture'),
-            FLCBallotUnit.flc_date,
-            FLCBallotUnit.passed.label('flc_status'),
-            EVMComponent.box_no.label('bu_box_no'),
-            Warehouse.name.label('bu_warehouse')
-        ).select_from(EVMComponent)\
-        .outerjoin(User, User.id == EVMComponent.last_received_from_id)\
-        .outerjoin(
-            latest_flc_subquery, 
-            latest_flc_subquery.c.bu_id == EVMComponent.id
-        )\
-        .outerjoin(
-            FLCBallotUnit, 
-            and_(
-                FLCBallotUnit.bu_id == EVMComponent.id,
-                FLCBallotUnit.flc_date == latest_flc_subquery.c.latest_flc_date
-            )
-        )\
-        .outerjoin(Warehouse, Warehouse.id == EVMComponent.current_warehouse_id)\
-        .filter(
-            and_(
-                EVMComponent.component_type == EVMComponentType.BU,
-                EVMComponent.current_user_id == user_id 
-            )
-        )\
-        .order_by(EVMComponent.id)\
-        .all()
-        
-       
-        return [
-            {
-                'sl_no': i,
-                'bu_received_from': row.bu_received_from or "",
-                'date_of_receipt': row.date_of_receipt.strftime("%d/%m/%Y") if row.date_of_receipt else "",
-                'ballot_unit_no': row.ballot_unit_no or "",
-                'year_of_manufacture': row.year_of_manufacture if row.year_of_manufacture else "",
-                'flc_date': row.flc_date.strftime("%d/%m/%Y") if row.flc_date else "",
-                'flc_status': "Passed" if row.flc_status else ("Failed" if row.flc_status is not None else ""),
-                'bu_box_no': str(row.bu_box_no) if row.bu_box_no else "",
-                'bu_warehouse': row.bu_warehouse or ""
-            }
-            for i, row in enumerate(results, 1)
-        ]
+        results = _bu_query(db, user_id=user_id).all()
+        return [_format_bu(i, row) for i, row in enumerate(results, 1)]
 
 def MSR_BU():
     """
@@ -297,56 +329,8 @@ def MSR_BU():
     """
     
     with Database.get_session() as db:
-     
-        latest_flc_subquery = db.query(
-            FLCBallotUnit.bu_id,
-            func.max(FLCBallotUnit.flc_date).label('latest_flc_date')
-        ).group_by(FLCBallotUnit.bu_id).subquery()
-        
-      
-        results = db.query(
-            EVMComponent.id,
-            User.username.label('bu_received_from'),
-            EVMComponent.date_of_receipt,
-            EVMComponent.serial_number.label('ballot_unit_no'),
-            EVMComponent.dom.label('year_of_manufacture'),
-            FLCBallotUnit.flc_date,
-            FLCBallotUnit.passed.label('flc_status'),
-            EVMComponent.box_no.label('bu_box_no'),
-            Warehouse.name.label('bu_warehouse')
-        ).select_from(EVMComponent)\
-        .outerjoin(User, User.id == EVMComponent.last_received_from_id)\
-        .outerjoin(
-            latest_flc_subquery, 
-            latest_flc_subquery.c.bu_id == EVMComponent.id
-        )\
-        .outerjoin(
-            FLCBallotUnit, 
-            and_(
-                FLCBallotUnit.bu_id == EVMComponent.id,
-                FLCBallotUnit.flc_date == latest_flc_subquery.c.latest_flc_date
-            )
-        )\
-        .outerjoin(Warehouse, Warehouse.id == EVMComponent.current_warehouse_id)\
-        .filter(EVMComponent.component_type == EVMComponentType.BU)\
-        .order_by(EVMComponent.id)\
-        .all()
-        
-      
-        return [
-            {
-                'sl_no': i,
-                'bu_received_from': row.bu_received_from or "",
-                'date_of_receipt': row.date_of_receipt.strftime("%d/%m/%Y") if row.date_of_receipt else "",
-                'ballot_unit_no': row.ballot_unit_no or "",
-                'year_of_manufacture': row.year_of_manufacture if row.year_of_manufacture else "",
-                'flc_date': row.flc_date.strftime("%d/%m/%Y") if row.flc_date else "",
-                'flc_status': "Passed" if row.flc_status else ("Failed" if row.flc_status is not None else ""),
-                'bu_box_no': str(row.bu_box_no) if row.bu_box_no else "",
-                'bu_warehouse': row.bu_warehouse or ""
-            }
-            for i, row in enumerate(results, 1)
-        ]
+        results = _bu_query(db).all()
+        return [_format_bu(i, row) for i, row in enumerate(results, 1)]
     
 def MSR_BU_warehouse(warehouse_id):
     """
@@ -354,61 +338,8 @@ def MSR_BU_warehouse(warehouse_id):
     """
     
     with Database.get_session() as db:
-     
-        latest_flc_subquery = db.query(
-            FLCBallotUnit.bu_id,
-            func.max(FLCBallotUnit.flc_date).label('latest_flc_date')
-        ).group_by(FLCBallotUnit.bu_id).subquery()
-        
-    
-        results = db.query(
-            EVMComponent.id,
-            User.username.label('bu_received_from'),
-            EVMComponent.date_of_receipt,
-            EVMComponent.serial_number.label('ballot_unit_no'),
-            EVMComponent.dom.label('year_of_manufacture'),
-            FLCBallotUnit.flc_date,
-            FLCBallotUnit.passed.label('flc_status'),
-            EVMComponent.box_no.label('bu_box_no'),
-            Warehouse.name.label('bu_warehouse')
-        ).select_from(EVMComponent)\
-        .outerjoin(User, User.id == EVMComponent.last_received_from_id)\
-        .outerjoin(
-            latest_flc_subquery, 
-            latest_flc_subquery.c.bu_id == EVMComponent.id
-        )\
-        .outerjoin(
-            FLCBallotUnit, 
-            and_(
-                FLCBallotUnit.bu_id == EVMComponent.id,
-                FLCBallotUnit.flc_date == latest_flc_subquery.c.latest_flc_date
-            )
-        )\
-        .outerjoin(Warehouse, Warehouse.id == EVMComponent.current_warehouse_id)\
-        .filter(
-            and_(
-                EVMComponent.component_type == EVMComponentType.BU,
-                EVMComponent.current_warehouse_id == warehouse_id 
-            )
-        )\
-        .order_by(EVMComponent.id)\
-        .all()
-        
-       
-        return [
-            {
-                'sl_no': i,
-                'bu_received_from': row.bu_received_from or "",
-                'date_of_receipt': row.date_of_receipt.strftime("%d/%m/%Y") if row.date_of_receipt else "",
-                'ballot_unit_no': row.ballot_unit_no or "",
-                'year_of_manufacture': row.year_of_manufacture if row.year_of_manufacture else "",
-                'flc_date': row.flc_date.strftime("%d/%m/%Y") if row.flc_date else "",
-                'flc_status': "Passed" if row.flc_status else ("Failed" if row.flc_status is not None else ""),
-                'bu_box_no': str(row.bu_box_no) if row.bu_box_no else "",
-                'bu_warehouse': row.bu_warehouse or ""
-            }
-            for i, row in enumerate(results, 1)
-        ]
+        results = _bu_query(db, warehouse_id=warehouse_id).all()
+        return [_format_bu(i, row) for i, row in enumerate(results, 1)]
     
 
 def MSR_CU_DMM_warehouse(warehouse_id):
@@ -417,99 +348,26 @@ def MSR_CU_DMM_warehouse(warehouse_id):
     """
 
     with Database.get_session() as db:
-        cu_comp = aliased(EVMComponent, name='cu')
-        dmm_comp = aliased(EVMComponent, name='dmm') 
-        dmm_seal_comp = aliased(EVMComponent, name='dmm_seal')
-        pink_seal_comp = aliased(EVMComponent, name='pink_seal')
-
-        latest_flc_subquery = db.query(
-            FLCRecord.cu_id,
-            func.max(FLCRecord.flc_date).label('latest_flc_date')
-        ).group_by(FLCRecord.cu_id).subquery()
+        results = _cu_dmm_query(db, warehouse_id=warehouse_id).all()
+        return [_format_cu_dmm(i, row) for i, row in enumerate(results, 1)]
 
-        query = db.query(
-            PairingRecord.id.label('pairing_id'),
-            User.username.label('cu_dmm_received'),
-            func.coalesce(cu_comp.date_of_receipt, dmm_comp.date_of_receipt).label('date_of_receipt'),
-            cu_comp.serial_number.label('control_unit_no'),
-            cu_comp.dom.label('cu_manufacture_date'),
-            cu_comp.box_no.label('cu_box_no'),
-            cu_comp.status.label('present_status_cu'),
-            func.coalesce(cu_comp.current_warehouse_id, dmm_comp.current_warehouse_id).label('current_warehouse_id'),
-            func.coalesce(cu_comp.last_received_from_id, dmm_comp.last_received_from_id).label('last_received_from_id'),
-            dmm_comp.serial_number.label('dmm_no'),
-            dmm_comp.dom.label('dmm_manufacture_date'),
-            dmm_comp.status.label('present_status_dmm'),
-            dmm_seal_comp.serial_number.label('dmm_seal_no'),
-            pink_seal_comp.serial_number.label('cu_pink_paper_seal_no'),
-            FLCRecord.flc_date,
-            FLCRecord.passed.label('flc_status'),
-            Warehouse.name.label('cu_warehouse')
-        ).select_from(dmm_comp).filter(
-            dmm_comp.component_type == EVMComponentType.DMM,
-            func.coalesce(cu_comp.current_warehouse_id, dmm_comp.current_warehouse_id) == warehouse_id
-        )
+def MSR_CU_DMM_stream(warehouse_id=None):
+    """
+    Yield MSR_CU_DMM (or MSR_CU_DMM_warehouse) rows one at a time from a server-side
+    cursor, so exports of the whole register run in constant memory
+    """
 
-        query = query.outerjoin(
-            PairingRecord,
-            PairingRecord.id == dmm_comp.pairing_id
-        ).outerjoin(
-            cu_comp,
-            and_(
-                cu_comp.pairing_id == PairingRecord.id,
-                cu_comp.component_type == EVMComponentType.CU
-            )
-        ).outerjoin(
-            latest_flc_subquery,
-            latest_flc_subquery.c.cu_id == cu_comp.id
-        ).outerjoin(
-            FLCRecord,
-            and_(
-                FLCRecord.cu_id == cu_comp.id,
-                FLCRecord.flc_date == latest_flc_subquery.c.latest_flc_date
-            )
-        ).outerjoin(
-            dmm_seal_comp,
-            and_(
-                dmm_seal_comp.pairing_id == PairingRecord.id,
-                dmm_seal_comp.component_type == EVMComponentType.DMM_SEAL
-            )
-        ).outerjoin(
-            pink_seal_comp,
-            and_(
-                pink_seal_comp.pairing_id == PairingRecord.id,
-                pink_seal_comp.component_type == EVMComponentType.PINK_PAPER_SEAL
-            )
-        ).outerjoin(
-            Warehouse,
-            Warehouse.id == func.coalesce(cu_comp.current_warehouse_id, dmm_comp.current_warehouse_id)
-        ).outerjoin(
-            User,
-            User.id == func.coalesce(cu_comp.last_received_from_id, dmm_comp.last_received_from_id)
-        )
+    with Database.get_session() as db:
+        query = _cu_dmm_query(db, warehouse_id=warehouse_id).yield_per(EXPORT_BATCH_SIZE)
+        for i, row in enumerate(query, 1):
+            yield _format_cu_dmm(i, row)
 
-        results = query.order_by(
-            PairingRecord.id.asc().nulls_last(),
-            dmm_comp.id.asc()
-        ).all()
+def MSR_BU_stream(warehouse_id=None):
+    """
+    Yield MSR_BU (or MSR_BU_warehouse) rows one at a time from a server-side cursor
+    """
 
-        return [
-            {
-                'sl_no': i,
-                'cu_dmm_received': row.cu_dmm_received or "",
-                'date_of_receipt': row.date_of_receipt.strftime("%d/%m/%Y") if row.date_of_receipt else "",
-                'control_unit_no': row.control_unit_no or "",
-                'month_year_manufacture_cu': row.cu_manufacture_date or "",
-                'dmm_no': row.dmm_no or "",
-                'month_year_manufacture_dmm': row.dmm_manufacture_date or "",
-                'dmm_seal_no': row.dmm_seal_no or "",
-                'cu_pink_paper_seal_no': row.cu_pink_paper_seal_no or "",
-                'flc_date': row.flc_date.strftime("%d/%m/%Y") if row.flc_date else "",
-                'flc_status': "Passed" if row.flc_status else ("Failed" if row.flc_status is not None else ""),
-                'cu_box_no': str(row.cu_box_no) if row.cu_box_no else "",
-                'cu_warehouse': row.cu_warehouse or "",
-                'present_status_dmm': row.present_status_dmm or "",
-                'present_status_cu': row.present_status_cu or ""
-            }
-            for i, row in enumerate(results, 1)
-        ]
+    with Database.get_session() as db:
+        query = _bu_query(db, warehouse_id=warehouse_id).yield_per(EXPORT_BATCH_SIZE)
+        for i, row in enumerate(query, 1):
+            yield _format_bu(i, row)
@@ -0,0 +1,309 @@
+"""Maintains the denormalized MSR read tables (models.msr).
+
+Write paths that change a CU, DMM, BU, seal or pairing call `refresh_msr(db, ids)`
+with the touched component ids before they commit; the affected register rows are
+rebuilt in the same transaction. `rebuild_msr()` recomputes everything and is used
+to backfill the tables and to repair drift. refresh_msr also keeps the dashboard
+inventory counters (core.inventory_counters) current for the same components.
+
+    python -m core.msr_readmodel
+"""
+import logging
+import time
+from typing import Iterable
+from sqlalchemy import or_, text
+from core.db import Database
+from models.evm import EVMComponent, EVMComponentType, FLCRecord, FLCBallotUnit
+from models.users import User, Warehouse, District
+from models.msr import MSRCuDmmRow, MSRBuRow
+from core.inventory_counters import refresh_inventory
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+
+_COMPONENT_COLUMNS = (
+    EVMComponent.id,
+    EVMComponent.component_type,
+    EVMComponent.serial_number,
+    EVMComponent.dom,
+    EVMComponent.status,
+    EVMComponent.box_no,
+    EVMComponent.pairing_id,
+    EVMComponent.current_user_id,
+    EVMComponent.current_warehouse_id,
+    EVMComponent.last_received_from_id,
+    EVMComponent.date_of_receipt,
+)
+
+
+def _chunks(values, size=CHUNK_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _box_num(box_no):
+    try:
+        return int(box_no) if box_no is not None else None
+    except ValueError:
+        return None
+
+
+def _latest(rows):
+    """(component id, flc_date, passed) rows -> {component id: (flc_date, passed)} for the latest FLC."""
+    latest = {}
+    for component_id, flc_date, passed in rows:
+        current = latest.get(component_id)
+        if current is None or (flc_date is not None and (current[0] is None or flc_date >= current[0])):
+            latest[component_id] = (flc_date, passed)
+    return latest
+
+
+def _names(db, model, ids):
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return {}
+    return dict(db.query(model.id, model.name).filter(model.id.in_(ids)).all())
+
+
+def _build_cu_dmm_rows(db, anchor_ids):
+    """Register rows for the given CU/DMM ids, same shape as the unified MSR query."""
+    anchors = db.query(*_COMPONENT_COLUMNS).filter(
+        EVMComponent.id.in_(anchor_ids),
+        EVMComponent.component_type.in_([EVMComponentType.CU, EVMComponentType.DMM])
+    ).all()
+
+    pairing_ids = {c.pairing_id for c in anchors if c.pairing_id is not None}
+    by_pairing = {}
+    if pairing_ids:
+        partners = db.query(*_COMPONENT_COLUMNS).filter(
+            EVMComponent.pairing_id.in_(pairing_ids)
+        ).order_by(EVMComponent.id).all()
+        for c in partners:
+            by_pairing.setdefault(c.pairing_id, {}).setdefault(c.component_type, c)
+
+    components = list(anchors) + [c for members in by_pairing.values() for c in members.values()]
+    cu_ids = {c.id for c in components if c.component_type == EVMComponentType.CU}
+    flc = _latest(db.query(FLCRecord.cu_id, FLCRecord.flc_date, FLCRecord.passed).filter(
+        FLCRecord.cu_id.in_(cu_ids)
+    ).all()) if cu_ids else {}
+
+    users = {}
+    user_ids = {c.current_user_id for c in components if c.current_user_id is not None}
+    if user_ids:
+        users = {u.id: u for u in db.query(User.id, User.username, User.district_id).filter(User.id.in_(user_ids)).all()}
+    districts = _names(db, District, {u.district_id for u in users.values()})
+    warehouses = _names(db, Warehouse, {c.current_warehouse_id for c in components})
+
+    def received(c):
+        user = users.get(c.current_user_id) if c else None
+        return user.username if user else None
+
+    def district(c):
+        user = users.get(c.current_user_id) if c else None
+        return districts.get(user.district_id) if user else None
+
+    def first(*values):
+        return next((v for v in values if v is not None), None)
+
+    rows = []
+    for anchor in anchors:
+        members = by_pairing.get(anchor.pairing_id, {})
+        if anchor.component_type == EVMComponentType.DMM:
+            dmm = anchor
+            cu = members.get(EVMComponentType.CU)
+            kind = MSRCuDmmRow.KIND_PAIRED if anchor.pairing_id is not None else MSRCuDmmRow.KIND_UNPAIRED_DMM
+        else:
+            cu = anchor
+            dmm = None
+            if anchor.pairing_id is None:
+                kind = MSRCuDmmRow.KIND_UNPAIRED_CU
+            elif EVMComponentType.DMM in members:
+                continue  # Listed on its DMM's row
+            else:
+                kind = MSRCuDmmRow.KIND_PAIRED_CU
+
+        flc_date, flc_passed = flc.get(cu.id, (None, None)) if cu else (None, None)
+        dmm_seal = members.get(EVMComponentType.DMM_SEAL) if anchor.pairing_id is not None else None
+        pink_seal = members.get(EVMComponentType.PINK_PAPER_SEAL) if anchor.pairing_id is not None else None
+        box_no = first(cu.box_no if cu else None, dmm.box_no if dmm else None)
+
+        rows.append({
+            'component_id': anchor.id,
+            'kind': kind,
+            'cu_id': cu.id if cu else None,
+            'dmm_id': dmm.id if dmm else None,
+            'pairing_id': anchor.pairing_id,
+            'cu_dmm_received': first(received(cu), received(dmm)),
+            'date_of_receipt': first(cu.date_of_receipt if cu else None, dmm.date_of_receipt if dmm else None),
+            'control_unit_no': cu.serial_number if cu else None,
+            'cu_manufacture_date': cu.dom if cu else None,
+            'dmm_no': dmm.serial_number if dmm else None,
+            'dmm_manufacture_date': dmm.dom if dmm else None,
+            'dmm_seal_no': dmm_seal.serial_number if dmm_seal else None,
+            'cu_pink_paper_seal_no': pink_seal.serial_number if pink_seal else None,
+            'flc_date': flc_date,
+            'flc_day': flc_date.date() if flc_date else None,
+            'flc_passed': flc_passed,
+            'cu_box_no': box_no,
+            'cu_box_num': _box_num(box_no),
+            'cu_warehouse': first(
+                warehouses.get(cu.current_warehouse_id) if cu else None,
+                warehouses.get(dmm.current_warehouse_id) if dmm else None
+            ),
+            'district': first(district(cu), district(dmm)),
+            'present_status_cu': cu.status if cu else None,
+            'present_status_dmm': dmm.status if dmm else None,
+        })
+    return rows
+
+
+def _build_bu_rows(db, bu_ids):
+    bus = db.query(*_COMPONENT_COLUMNS).filter(
+        EVMComponent.id.in_(bu_ids),
+        EVMComponent.component_type == EVMComponentType.BU
+    ).all()
+    if not bus:
+        return []
+
+    flc = _latest(db.query(FLCBallotUnit.bu_id, FLCBallotUnit.flc_date, FLCBallotUnit.passed).filter(
+        FLCBallotUnit.bu_id.in_([b.id for b in bus])
+    ).all())
+    received_from = {}
+    user_ids = {b.last_received_from_id for b in bus if b.last_received_from_id is not None}
+    if user_ids:
+        received_from = dict(db.query(User.id, User.username).filter(User.id.in_(user_ids)).all())
+    warehouses = _names(db, Warehouse, {b.current_warehouse_id for b in bus})
+
+    rows = []
+    for bu in bus:
+        flc_date, flc_passed = flc.get(bu.id, (None, None))
+        rows.append({
+            'component_id': bu.id,
+            'bu_received_from': received_from.get(bu.last_received_from_id),
+            'date_of_receipt': bu.date_of_receipt,
+            'ballot_unit_no': bu.serial_number,
+            'year_of_manufacture': bu.dom,
+            'flc_date': flc_date,
+            'flc_day': flc_date.date() if flc_date else None,
+            'flc_passed': flc_passed,
+            'bu_box_no': bu.box_no,
+            'bu_warehouse': warehouses.get(bu.current_warehouse_id),
+        })
+    return rows
+
+
+def _replace(db, model, ids, rows):
+    db.query(model).filter(model.component_id.in_(ids)).delete(synchronize_session=False)
+    if rows:
+        db.bulk_insert_mappings(model, rows)
+
+
+def refresh_msr(db, component_ids: Iterable[int]) -> int:
+    """Rebuild the register rows affected by changes to the given components.
+
+    Runs in the caller's transaction (pending changes are flushed first); call it
+    before committing. Seals and pairing changes pull in the rest of the pairing.
+    Also moves the components to their current inventory counters.
+    Returns the number of register rows written.
+    """
+    ids = {i for i in component_ids if i is not None}
+    if not ids:
+        return 0
+    db.flush()
+    refresh_inventory(db, ids)
+    written = 0
+    for chunk in _chunks(sorted(ids)):
+        touched = db.query(EVMComponent.id, EVMComponent.component_type, EVMComponent.pairing_id).filter(
+            EVMComponent.id.in_(chunk)
+        ).all()
+        pairing_ids = {c.pairing_id for c in touched if c.pairing_id is not None}
+
+        # Rows that currently list these components may belong to a pairing they left
+        stale = db.query(MSRCuDmmRow.component_id, MSRCuDmmRow.pairing_id).filter(or_(
+            MSRCuDmmRow.component_id.in_(chunk),
+            MSRCuDmmRow.cu_id.in_(chunk),
+            MSRCuDmmRow.dmm_id.in_(chunk),
+        )).all()
+        pairing_ids.update(r.pairing_id for r in stale if r.pairing_id is not None)
+
+        anchor_ids = {c.id for c in touched if c.component_type in (EVMComponentType.CU, EVMComponentType.DMM)}
+        anchor_ids.update(r.component_id for r in stale)
+        if pairing_ids:
+            anchor_ids.update(i for (i,) in db.query(EVMComponent.id).filter(
+                EVMComponent.pairing_id.in_(pairing_ids),
+                EVMComponent.component_type.in_([EVMComponentType.CU, EVMComponentType.DMM])
+            ).all())
+            anchor_ids.update(i for (i,) in db.query(MSRCuDmmRow.component_id).filter(
+                MSRCuDmmRow.pairing_id.in_(pairing_ids)
+            ).all())
+
+        for anchors in _chunks(sorted(anchor_ids)):
+            rows = _build_cu_dmm_rows(db, anchors)
+            _replace(db, MSRCuDmmRow, anchors, rows)
+            written += len(rows)
+
+        bu_ids = [c.id for c in touched if c.component_type == EVMComponentType.BU]
+        if bu_ids:
+            rows = _build_bu_rows(db, bu_ids)
+            _replace(db, MSRBuRow, bu_ids, rows)
+            written += len(rows)
+    return written
+
+
+def user_component_ids(db, user_id: int):
+    """Ids of the components whose register rows show this user's name or district."""
+    return [i for (i,) in db.query(EVMComponent.id).filter(or_(
+        EVMComponent.current_user_id == user_id,
+        EVMComponent.last_received_from_id == user_id
+    )).all()]
+
+
+def rebuild_msr(batch_size: int = CHUNK_SIZE) -> int:
+    """Recompute both read tables from scratch in one transaction."""
+    started = time.perf_counter()
+    written = 0
+    with Database.get_session() as db:
+        try:
+            db.query(MSRCuDmmRow).delete(synchronize_session=False)
+            db.query(MSRBuRow).delete(synchronize_session=False)
+
+            for types, build, model in (
+                ([EVMComponentType.CU, EVMComponentType.DMM], _build_cu_dmm_rows, MSRCuDmmRow),
+                ([EVMComponentType.BU], _build_bu_rows, MSRBuRow),
+            ):
+                last_id = 0
+                while True:
+                    ids = [i for (i,) in db.query(EVMComponent.id).filter(
+                        EVMComponent.component_type.in_(types),
+                        EVMComponent.id > last_id
+                    ).order_by(EVMComponent.id).limit(batch_size).all()]
+                    if not ids:
+                        break
+                    rows = build(db, ids)
+                    if rows:
+                        db.bulk_insert_mappings(model, rows)
+                    written += len(rows)
+                    last_id = ids[-1]
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    logger.info(f"MSR read model rebuilt: {written} rows in {time.perf_counter() - started:.1f}s")
+    return written
+
+
+def create_tables():
+    Database.initialize()
+    with Database._engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        MSRCuDmmRow.__table__.create(conn, checkfirst=True)
+        MSRBuRow.__table__.create(conn, checkfirst=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    create_tables()
+    print(f"MSR rows written: {rebuild_msr()}")
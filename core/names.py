@@ -0,0 +1,93 @@
+from typing import Iterable, Optional
+from models.users import User, District, LocalBody, Warehouse
+from models.evm import PollingStation
+from utils.local_cache import LocalCache
+
+# dimension -> (model, looked up columns, invalidation tags). The first column is
+# the display name; the rest are kept for callers that need e.g. a user's district.
+DIMENSIONS = {
+    "user": (User, ("username", "district_id"), ("user",)),
+    "district": (District, ("name",), ("meta",)),
+    "local_body": (LocalBody, ("name", "district_id"), ("meta",)),
+    "warehouse": (Warehouse, ("name",), ("meta",)),
+    "polling_station": (PollingStation, ("name",), ("ps",)),
+}
+
+CACHE_TTL = 600
+
+
+class NameResolver:
+    """Request-scoped lookup of display names for users, districts, local bodies,
+    warehouses and polling stations.
+
+    Collect the ids a page references with load(), which resolves each dimension
+    with one IN query, then read them with the per-dimension helpers. Rows found
+    are shared between requests through LocalCache and dropped by the same tag
+    invalidations as the cached endpoints; misses are only remembered for this
+    resolver, so rows created later still resolve.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._rows = {dimension: {} for dimension in DIMENSIONS}
+
+    def resolve(self, dimension: str, ids: Iterable) -> dict:
+        """Make sure every id in `ids` is known; returns the rows of this dimension."""
+        rows = self._rows[dimension]
+        wanted = {i for i in ids if i and i not in rows}
+        if not wanted:
+            return rows
+
+        model, columns, tags = DIMENSIONS[dimension]
+        cache_key = f"names:{dimension}"
+        shared = LocalCache.get(cache_key) or {}
+        rows.update((i, shared[i]) for i in wanted if i in shared)
+        missing = wanted - shared.keys()
+        if missing:
+            found = {
+                row[0]: tuple(row[1:])
+                for row in self.db.query(model.id, *(getattr(model, column) for column in columns))
+                .filter(model.id.in_(list(missing)))
+                .all()
+            }
+            rows.update(found)
+            rows.update((i, None) for i in missing - found.keys())
+            if found:
+                # Replace rather than mutate: other threads may be reading the old dict
+                LocalCache.set(cache_key, {**shared, **found}, CACHE_TTL, tags)
+        return rows
+
+    def load(self, items: Iterable, **dimensions: Iterable[str]) -> "NameResolver":
+        """Resolve the ids found on `items` under the given attribute names, e.g.
+        load(logs, user=("from_user_id", "to_user_id"), district=("to_district_id",))."""
+        items = list(items)
+        for dimension, attributes in dimensions.items():
+            self.resolve(dimension, (getattr(item, attribute, None) for item in items for attribute in attributes))
+        return self
+
+    def get(self, dimension: str, id, column: int = 0):
+        if not id:
+            return None
+        row = self.resolve(dimension, (id,)).get(id)
+        return row[column] if row else None
+
+    def user(self, user_id: Optional[int]):
+        return self.get("user", user_id)
+
+    def user_district_id(self, user_id: Optional[int]):
+        return self.get("user", user_id, 1)
+
+    def district(self, district_id: Optional[int]):
+        return self.get("district", district_id)
+
+    def local_body(self, local_body_id: Optional[str]):
+        return self.get("local_body", local_body_id)
+
+    def local_body_district_id(self, local_body_id: Optional[str]):
+        return self.get("local_body", local_body_id, 1)
+
+    def warehouse(self, warehouse_id: Optional[str]):
+        return self.get("warehouse", warehouse_id)
+
+    def polling_station(self, polling_station_id: Optional[int]):
+        return self.get("polling_station", polling_station_id)
@@ -6,6 +6,7 @@ from fastapi import Response,HTTPException
 from pydantic import BaseModel
 from sqlalchemy import or_
 from models.users import User
+from core.msr_readmodel import refresh_msr
 
 
 class DecommissionModel(BaseModel):
@@ -29,9 +30,12 @@ def status_change(local_body: str,status: str):
             .filter(EVMComponent.status == current_status)
         )
         
+        component_ids = []
         for component in evm_components:
             component.status = status
+            component_ids.append(component.id)
         
+        refresh_msr(session, component_ids)
         session.commit()
         return Response(status_code=200)
 
@@ -184,6 +188,7 @@ def decommission_evms(data: DecommissionModel):
                 
                 session.delete(pairing)
             
+            refresh_msr(session, component_ids)
             session.commit()
             
             # CREATE LOGS - Add corresponding entries to logs tables
@@ -283,6 +288,7 @@ def damaged(evm_id: str):
         if evm.status != "damaged":
             evm.status = "damaged"
             evm.pairing_id = None  
+            refresh_msr(session, [evm.id])
             session.commit()
             return Response(status_code=200)
         else:
@@ -317,6 +323,7 @@ def return_to_ecil(component_serial: str):
             component.current_user_id = 2
             component.is_sec_approved = False
             component.current_warehouse_id = None
+            refresh_msr(session, [component.id])
             session.commit()
             return Response(status_code=200)
         else:
@@ -334,6 +341,7 @@ def return_pending(user_id: int):
                                                     EVMComponent.current_user_id == user_id).all()
             for comp in pending:
                 comp.status = "Returned to ECIL Pending"
+            refresh_msr(db, [comp.id for comp in pending])
             db.commit()
             return Response(status_code=200)
     except Exception as e:
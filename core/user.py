@@ -9,15 +9,17 @@ from sqlalchemy.orm import joinedload
 from sqlalchemy import or_, func, cast, Integer
 from typing import List
 from fastapi import HTTPException, Response
-from models.users import Role
+from models.users import Role, Level
 from datetime import datetime
 from zoneinfo import ZoneInfo
 import traceback
-from utils.authtoken import create_tokens
 from fastapi import HTTPException, Query
 from typing import Optional
 from sqlalchemy.orm import joinedload
 from sqlalchemy import and_, func, select
+from utils.local_cache import LocalCache
+from core.msr_readmodel import refresh_msr, user_component_ids
+import os
 
 class RegisterModel(BaseModel):
     username: constr(strip_whitespace=True, min_length=3)
@@ -74,21 +76,53 @@ def register(details: RegisterModel):
         user_id = new_user.id
         username = new_user.username
 
-    token = create_tokens({
+    # Token claims for the new user; the route issues (and registers) the tokens
+    return {
+        "sub": username,
         "username": username,
         "role": role_name,
         "email": email,
         "level": level_name,
         "user_id": user_id
-    })
-
-    return {
-        "token": token,
-        "role": role_name,
-        "level": level_name,
-        "user_id": user_id
     }
 
+LOGIN_PROFILE_TTL = int(os.getenv("LOGIN_PROFILE_TTL", 30))
+
+def get_login_profile(username: str):
+    """Everything login needs about a user, in one query. Cached per worker for a
+    few seconds under the "user" tag, which user edits invalidate."""
+    cache_key = f"login:{username}"
+    profile = LocalCache.get(cache_key)
+    if profile is not None:
+        return profile
+
+    with Database.get_session() as session:
+        row = session.query(
+            User.id,
+            User.username,
+            User.password_hash,
+            User.is_active,
+            User.email,
+            User.role_id,
+            Role.name.label("role_name"),
+            Level.name.label("level_name"),
+            User.district_id,
+            District.name.label("district_name"),
+            User.local_body_id,
+            LocalBody.name.label("local_body_name"),
+            User.warehouse_id
+        ).join(Role, User.role_id == Role.id
+        ).join(Level, User.level_id == Level.id
+        ).outerjoin(District, User.district_id == District.id
+        ).outerjoin(LocalBody, User.local_body_id == LocalBody.id
+        ).filter(User.username == username).first()
+
+    if row is None:
+        return None
+    profile = dict(row._mapping)
+    LocalCache.set(cache_key, profile, LOGIN_PROFILE_TTL, ("user",))
+    return profile
+
 def view_users(
     page: int,
     limit: int ,
@@ -180,10 +214,12 @@ def edit_user(details: UpdateUserModel):
         if not user:
             raise HTTPException(status_code=404,detail="User not found")
         
+        renamed = False
         if details.username:
             existing_user = session.query(User).filter(User.username == details.username, User.id != details.user_id).first()
             if existing_user:
                 raise HTTPException(status_code=409,detail="Username already exists")
+            renamed = details.username != user.username
             user.username = details.username
         
         if details.password:
@@ -201,6 +237,9 @@ def edit_user(details: UpdateUserModel):
                 user.is_active = True
         user.updated_by_id = details.user_id
         
+        if renamed:
+            # The MSR register stores the holder's and sender's usernames
+            refresh_msr(session, user_component_ids(session, user.id))
         #user.updated_by = get_current_user(user_id)
         session.commit()
         session.refresh(user)
@@ -258,6 +297,20 @@ def get_districts():
                 "name": district.name,
             } for district in districts
         ]
+
+async def get_districts_async():
+    async with Database.get_async_session() as session:
+        districts = (await session.execute(select(District).distinct())).scalars().all()
+        
+        if not districts:
+            raise HTTPException(status_code=204,detail="No district found")
+        
+        return [
+            {
+                "id": district.id,
+                "name": district.name,
+            } for district in districts
+        ]
     
 def get_panchayath(block_id: str):
     block = block_id[:5]
@@ -527,6 +580,16 @@ def get_warehouse(district: int):
         
         return [{"id": row.id, "name": row.name} for row in results]
 
+async def get_warehouse_async(district: int):
+    async with Database.get_async_session() as db:
+        results = (await db.execute(
+            select(Warehouse.id, Warehouse.name)
+            .filter(Warehouse.district_id == district)
+            .order_by(Warehouse.name)
+        )).all()
+        
+        return [{"id": row.id, "name": row.name} for row in results]
+
 def get_deo():
     with Database.get_session() as session:
         results = (
@@ -550,6 +613,28 @@ def get_deo():
             "district_id": row.district_id,
         } for row in results]
 
+async def get_deo_async():
+    async with Database.get_async_session() as session:
+        results = (await session.execute(
+            select(
+                User.id,
+                User.district_id,
+                District.name.label('district_name')
+            )
+            .join(District, User.district_id == District.id)
+            .filter(User.role_id == 2)
+            .order_by(District.name)
+        )).all()
+        
+        if not results:
+            raise HTTPException(status_code=204, detail="No users found")
+        
+        return [{
+            "id": row.id,
+            "name": row.district_name,
+            "district_id": row.district_id,
+        } for row in results]
+
 def add_warehouse(dis_id: int, warehouse_name: str):
     with Database.get_session() as db:
         warehouse = db.query(Warehouse).filter(Warehouse.name == warehouse_name).all()
@@ -10,13 +10,14 @@ from routers import (auth_route,comp_route,allot_route,
 import logging
 from logging.handlers import RotatingFileHandler
 import os
-from utils.rate_limiter import user_key_func
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.middleware import SlowAPIMiddleware
-from slowapi.errors import RateLimitExceeded
+from utils.rate_limiter import rate_limit_headers
 from utils.redis import RedisClient
-
-limiter = Limiter(key_func=user_key_func)
+from utils.local_cache import LocalCache
+from utils.executor import DBExecutor
+from utils.password import PasswordHasher
+from utils.pdf_renderer import PDFRenderer
+from utils.report_jobs import ReportJobs
+from core.inventory_counters import InventoryReconciler
 
 
 if not os.path.exists("logs"):
@@ -40,27 +41,46 @@ async def lifespan(app: FastAPI):
     else:
         print("Failed to connect to Database")
         raise RuntimeError("Database connection failed")
+    if not Database.initialize_async():
+        raise RuntimeError("Async database initialization failed")
     print("Initializing Redis.....")
     if await RedisClient.initialize():
         print("Redis initialized successfully")
     else:
         print("Failed to initialize Redis")
         raise RuntimeError("Redis initialization failed")
+    if not await LocalCache.start():
+        print("Local cache invalidation listener not started")
+    DBExecutor.initialize()
+    PasswordHasher.initialize()
+    PDFRenderer.initialize()
+    PDFRenderer.start_sweeper()
+    if not await ReportJobs.start(pdf_route.REPORT_JOBS):
+        print("Report job workers not started")
+    InventoryReconciler.start()
     yield
+    InventoryReconciler.stop()
+    print("Stopping report job workers.....")
+    await ReportJobs.stop()
+    print("Shutting down PDF renderer.....")
+    PDFRenderer.shutdown()
+    print("Shutting down DB worker pool.....")
+    DBExecutor.shutdown()
+    PasswordHasher.shutdown()
     print("Disconnecting from Database.....")
     Database._engine.dispose()
+    await Database.dispose_async()
     print("Disconnected from Database")
     
     print("Closing Redis connection.....")
+    await LocalCache.stop()
     await RedisClient.close()
     print("Redis closed successfully")
 
 
 app = FastAPI(lifespan=lifespan)
 
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SlowAPIMiddleware)
+app.middleware("http")(rate_limit_headers)
 
 app.add_middleware(
     CORSMiddleware,
@@ -86,7 +106,7 @@ app.include_router(msr_route.router, prefix="/msr", tags=["msr"])
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok"}
+    return {"status": "ok", "executor": DBExecutor.stats(), "cache": RedisClient.cache_stats()}
 
 
 if __name__ == "__main__":
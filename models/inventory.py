@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Index
+from core.db import Base
+
+# Inventory counters for the dashboards, maintained by core.inventory_counters.
+# Holder columns use 0 / "" instead of NULL so they can be part of the primary key.
+
+class InventoryCount(Base):
+    __tablename__ = 'inventory_counts'
+
+    district_id = Column(Integer, primary_key=True)     # district of the holding user, 0 if none
+    user_id = Column(Integer, primary_key=True)         # current_user_id, 0 if unassigned
+    component_type = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)           # "" if the component has no status
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index('ix_inventory_counts_user', 'user_id', 'component_type', 'status'),
+    )
+
+class InventoryCountedComponent(Base):
+    """The key each component is currently counted under, so a change can move
+    it from its old counter to its new one without reading the old row state."""
+    __tablename__ = 'inventory_counted'
+
+    component_id = Column(Integer, primary_key=True)
+    district_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    component_type = Column(String, nullable=False)
+    status = Column(String, nullable=False)
@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Column, Integer, String, Boolean, DateTime,
-    ForeignKey, Enum, Date 
+    ForeignKey, Enum, Date, Index
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
@@ -42,6 +42,11 @@ class AllotmentLogs(Base):
 
     items = relationship("AllotmentItemLogs", back_populates="allotment", cascade="all, delete-orphan")
 
+    # (timestamp, id) indexes back the keyset-paginated log timeline in core.logs
+    __table_args__ = (
+        Index('ix_allotment_logs_created_at_id', 'created_at', 'id'),
+    )
+
 
 class AllotmentItemLogs(Base):
     __tablename__ = 'allotment_items_logs'
@@ -76,6 +81,10 @@ class EVMComponentLogs(Base):
     current_user = relationship("User")
     current_warehouse = relationship("Warehouse")
 
+    __table_args__ = (
+        Index('ix_evm_components_logs_created_on_id', 'created_on', 'id'),
+    )
+
 
 class PairingRecordLogs(Base):
     __tablename__ = 'pairing_logs'
@@ -96,6 +105,10 @@ class PairingRecordLogs(Base):
     completed_by = relationship("User", foreign_keys=[completed_by_id])
     components = relationship("EVMComponentLogs", back_populates="pairing")
 
+    __table_args__ = (
+        Index('ix_pairing_logs_created_at_id', 'created_at', 'id'),
+    )
+
 class FLCRecordLogs(Base):
     __tablename__ = 'flc_records_logs'
 
@@ -118,6 +131,10 @@ class FLCRecordLogs(Base):
     dmm_seal = relationship("EVMComponentLogs", foreign_keys=[dmm_seal_id])
     pink_paper_seal = relationship("EVMComponentLogs", foreign_keys=[pink_paper_seal_id])
 
+    __table_args__ = (
+        Index('ix_flc_records_logs_flc_date_id', 'flc_date', 'id'),
+    )
+
 
 class FLCBallotUnitLogs(Base):
     __tablename__ = 'flc_bu_logs'
@@ -131,4 +148,8 @@ class FLCBallotUnitLogs(Base):
     flc_date = Column(DateTime(timezone=True), default=lambda: datetime.now(ZoneInfo("Asia/Kolkata")))
 
     flc_by = relationship("User")
-    bu = relationship("EVMComponentLogs")
\ No newline at end of file
+    bu = relationship("EVMComponentLogs")
+
+    __table_args__ = (
+        Index('ix_flc_bu_logs_flc_date_id', 'flc_date', 'id'),
+    )
@@ -0,0 +1,83 @@
+from sqlalchemy import (
+    Column, Integer, String, Boolean, DateTime, Date, Index
+)
+from datetime import datetime
+from core.db import Base
+from zoneinfo import ZoneInfo
+
+# Denormalized Master Stock Register rows, maintained by core.msr_readmodel.
+# One row per register line so paginated MSR reads are single-table keyset scans.
+
+class MSRCuDmmRow(Base):
+    __tablename__ = 'msr_cu_dmm'
+
+    KIND_PAIRED = 1        # DMM with the CU of its pairing
+    KIND_UNPAIRED_DMM = 2
+    KIND_UNPAIRED_CU = 3
+    KIND_PAIRED_CU = 4     # CU in a pairing without a DMM, only shown in the failed CU view
+
+    component_id = Column(Integer, primary_key=True)  # DMM id for paired rows, else the CU/DMM itself
+    kind = Column(Integer, nullable=False)
+    cu_id = Column(Integer, nullable=True, index=True)
+    dmm_id = Column(Integer, nullable=True, index=True)
+    pairing_id = Column(Integer, nullable=True, index=True)
+
+    cu_dmm_received = Column(String, nullable=True)
+    date_of_receipt = Column(Date, nullable=True)
+    control_unit_no = Column(String, nullable=True)
+    cu_manufacture_date = Column(String, nullable=True)
+    dmm_no = Column(String, nullable=True)
+    dmm_manufacture_date = Column(String, nullable=True)
+    dmm_seal_no = Column(String, nullable=True)
+    cu_pink_paper_seal_no = Column(String, nullable=True)
+    flc_date = Column(DateTime(timezone=True), nullable=True)
+    flc_day = Column(Date, nullable=True)        # flc_date::date, so date filters can use an index
+    flc_passed = Column(Boolean, nullable=True)  # None while FLC is pending
+    cu_box_no = Column(String, nullable=True)
+    cu_box_num = Column(Integer, nullable=True)  # Numeric box numbers, for range filters
+    cu_warehouse = Column(String, nullable=True)
+    district = Column(String, nullable=True)
+    present_status_cu = Column(String, nullable=True)
+    present_status_dmm = Column(String, nullable=True)
+    refreshed_at = Column(DateTime(timezone=True), default=lambda: datetime.now(ZoneInfo("Asia/Kolkata")))
+
+    __table_args__ = (
+        Index('ix_msr_cu_dmm_kind_id', 'kind', 'component_id'),
+        Index('ix_msr_cu_dmm_flc', 'flc_passed', 'component_id'),
+        Index('ix_msr_cu_dmm_date_of_receipt', 'date_of_receipt'),
+        Index('ix_msr_cu_dmm_flc_day', 'flc_day'),
+        Index('ix_msr_cu_dmm_box', 'cu_box_num'),
+        Index('ix_msr_cu_dmm_warehouse', 'cu_warehouse'),
+        Index('ix_msr_cu_dmm_status', 'present_status_cu', 'present_status_dmm'),
+        # Substring (ilike '%..%') filters on serial numbers, needs pg_trgm
+        Index('ix_msr_cu_dmm_cu_trgm', 'control_unit_no',
+              postgresql_using='gin', postgresql_ops={'control_unit_no': 'gin_trgm_ops'}),
+        Index('ix_msr_cu_dmm_dmm_trgm', 'dmm_no',
+              postgresql_using='gin', postgresql_ops={'dmm_no': 'gin_trgm_ops'}),
+    )
+
+class MSRBuRow(Base):
+    __tablename__ = 'msr_bu'
+
+    component_id = Column(Integer, primary_key=True)
+
+    bu_received_from = Column(String, nullable=True)
+    date_of_receipt = Column(Date, nullable=True)
+    ballot_unit_no = Column(String, nullable=True)
+    year_of_manufacture = Column(String, nullable=True)
+    flc_date = Column(DateTime(timezone=True), nullable=True)
+    flc_day = Column(Date, nullable=True)
+    flc_passed = Column(Boolean, nullable=True)
+    bu_box_no = Column(String, nullable=True)
+    bu_warehouse = Column(String, nullable=True)
+    refreshed_at = Column(DateTime(timezone=True), default=lambda: datetime.now(ZoneInfo("Asia/Kolkata")))
+
+    __table_args__ = (
+        Index('ix_msr_bu_flc', 'flc_passed', 'component_id'),
+        Index('ix_msr_bu_date_of_receipt', 'date_of_receipt'),
+        Index('ix_msr_bu_flc_day', 'flc_day'),
+        Index('ix_msr_bu_box', 'bu_box_no'),
+        Index('ix_msr_bu_warehouse', 'bu_warehouse'),
+        Index('ix_msr_bu_trgm', 'ballot_unit_no',
+              postgresql_using='gin', postgresql_ops={'ballot_unit_no': 'gin_trgm_ops'}),
+    )
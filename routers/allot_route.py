@@ -5,13 +5,14 @@ from core.allotment import (reject_allotment, approve_allotment,
                             view_temporary, return_temporary_allotment)
 from core.commissioning import evm_commissioning, EVMCommissioningModel, view_reserve, allot_reserve_evm_to_polling_station, ReserveEVMCommissioningModel
 from core.create_allotment import create_allotment, AllotmentModel
-from utils.authtoken import get_current_user
+from utils.authtoken import get_current_user, get_principal, Principal
 from typing import List, Optional
 import json
 from fastapi import BackgroundTasks
 from utils.rate_limiter import limiter
-from utils.cache_decorator import cache_response
+from utils.cache_decorator import cache_response, invalidation_tags
 from utils.redis import RedisClient
+from utils.executor import DBExecutor
 
 router = APIRouter()
 
@@ -51,91 +52,113 @@ async def allot_evm(
     
     else:
         raise HTTPException(status_code=400, detail="Unsupported content type")
-    await RedisClient.delete_pattern("allot*") 
-    return create_allotment(
+    result = await DBExecutor.run(
+            create_allotment,
             background_tasks=background_tasks, 
             evm=data,                         
             from_user_id=current_user['user_id'],            
             pending_allotment_id=pending_id,  
-            treasury_receipt_pdf=pdf_bytes    
+            treasury_receipt_pdf=pdf_bytes,
+            lane="bulk"
         )
+    await RedisClient.invalidate_tags(*invalidation_tags(
+        "allot",
+        [current_user['user_id'], data.to_user_id],
+        [current_user.get('district_id'), data.from_district_id, data.to_district_id]
+    ))
+    return result
 
 @router.get("/pending/view")
 @cache_response(expire=3600, key_prefix="allot_pending_view", include_user=True)
 @limiter.limit("30/minute")
 async def pending_view(request: Request, current_user: dict = Depends(get_current_user)):
     
-    return view_pending_allotments(current_user['user_id'])
+    return await DBExecutor.run(view_pending_allotments, current_user['user_id'])
 
 @router.post("/pending")
 @limiter.limit("30/minute")
 async def pending_create(request: Request, data: AllotmentModel, current_user: dict = Depends(get_current_user)):
-    await RedisClient.delete_pattern("allot*") 
-    return pending(data, current_user['user_id'])
+    result = await DBExecutor.run(pending, data, current_user['user_id'])
+    await RedisClient.invalidate_tags(*invalidation_tags(
+        "allot",
+        [current_user['user_id'], data.to_user_id],
+        [current_user.get('district_id'), data.from_district_id, data.to_district_id]
+    ))
+    return result
 
 @router.get("/pending/components/{pending_id}")
 @cache_response(expire=3600, key_prefix="allot_pending_components", include_user=True)
 @limiter.limit("30/minute")
 async def view_pending_comp(request: Request, pending_id: int, current_user: dict = Depends(get_current_user)):
-    return view_pending_allotment_components(pending_id, current_user['user_id'])
+    return await DBExecutor.run(view_pending_allotment_components, pending_id, current_user['user_id'])
 
 @router.get("/pending/remove/{pending_id}")
 @limiter.limit("30/minute")
 async def remove_pending(request: Request, pending_id: int, current_user: dict = Depends(get_current_user)):
-    await RedisClient.delete_pattern("allot*")
-    await RedisClient.delete_pattern("comp*") 
-    return remove_pending_allotment(pending_id, current_user['user_id'])
+    result = await DBExecutor.run(remove_pending_allotment, pending_id, current_user['user_id'])
+    await RedisClient.invalidate_tags(
+        *invalidation_tags("allot", [current_user['user_id']], [current_user.get('district_id')]),
+        *invalidation_tags("comp", [current_user['user_id']], [current_user.get('district_id')])
+    )
+    return result
 
 @router.get("/approve/{allotment_id}")
 @limiter.limit("30/minute")
-async def approve(request: Request, allotment_id: int, current_user: dict = Depends(get_current_user)):  
-    await RedisClient.delete_pattern("allot*")
-    await RedisClient.delete_pattern("comp*")
-    return approve_allotment(allotment_id, current_user['user_id'])
+async def approve(request: Request, allotment_id: int, principal: Principal = Depends(get_principal)):  
+    # The sending side of the allotment is not known here, so drop both families
+    result = await DBExecutor.run(approve_allotment, allotment_id, principal, lane="bulk")
+    await RedisClient.invalidate_tags("allot", "comp")
+    return result
 
 @router.get("/reject/{allotment_id}/{reject_reason}")
 @limiter.limit("30/minute")
 async def reject(request: Request, allotment_id: int, reject_reason: str, current_user: dict = Depends(get_current_user)):  
-    await RedisClient.delete_pattern("allot*")
-    await RedisClient.delete_pattern("comp*")
-    return reject_allotment(allotment_id, reject_reason, current_user['user_id'])
+    result = await DBExecutor.run(reject_allotment, allotment_id, reject_reason, current_user['user_id'])
+    await RedisClient.invalidate_tags("allot", "comp")
+    return result
 
 @router.get("/queue/")
 @cache_response(expire=3600, key_prefix="allot_queue", include_user=True)
 @limiter.limit("30/minute")
 async def queue(request: Request, current_user: dict = Depends(get_current_user)):
-    return approval_queue(current_user['user_id'])
+    return await DBExecutor.run(approval_queue, current_user['user_id'])
 
 @router.post("/commission")
 @limiter.limit("30/minute")
-async def evm_commissioning_route(request: Request, background_tasks: BackgroundTasks, data: List[EVMCommissioningModel] = Body(...), current_user: dict = Depends(get_current_user)):
-    await RedisClient.delete_pattern("allot*")
-    await RedisClient.delete_pattern("comp*")
-    return evm_commissioning(background_tasks,data, current_user['user_id'])
+async def evm_commissioning_route(request: Request, background_tasks: BackgroundTasks, data: List[EVMCommissioningModel] = Body(...), principal: Principal = Depends(get_principal)):
+    result = await DBExecutor.run(evm_commissioning, background_tasks,data, principal, lane="bulk")
+    await RedisClient.invalidate_tags(
+        *invalidation_tags("allot", [principal.user_id], [principal.district_id]),
+        *invalidation_tags("comp", [principal.user_id], [principal.district_id])
+    )
+    return result
 
 @router.get("/reserve")
 @cache_response(expire=3600, key_prefix="allot_view_reserve", include_user=True)
 @limiter.limit("30/minute")
 async def reserve_view(request: Request, current_user: dict = Depends(get_current_user)):
-    return view_reserve(current_user['user_id'])
+    return await DBExecutor.run(view_reserve, current_user['user_id'])
 
 @router.post("/reserve/allot")
 @limiter.limit("30/minute")
 async def allot_reserve_evm(request: Request, data: ReserveEVMCommissioningModel, psno: int, current_user: dict = Depends(get_current_user)):
-    await RedisClient.delete_pattern("allot*")
-    await RedisClient.delete_pattern("comp*")
-    return allot_reserve_evm_to_polling_station(data, psno, current_user['user_id'])
+    result = await DBExecutor.run(allot_reserve_evm_to_polling_station, data, psno, current_user['user_id'])
+    await RedisClient.invalidate_tags(
+        *invalidation_tags("allot", [current_user['user_id']], [current_user.get('district_id')]),
+        *invalidation_tags("comp", [current_user['user_id']], [current_user.get('district_id')])
+    )
+    return result
 
 @router.get("/temporary")
 @cache_response(expire=3600, key_prefix="allot_view_temp", include_user=True)
 async def view_temporary_allotments(request: Request, current_user: dict = Depends(get_current_user)):
-    return view_temporary(current_user['user_id'])
+    return await DBExecutor.run(view_temporary, current_user['user_id'])
 
 @router.post("/temporary/return/")
 @limiter.limit("30/minute")
 async def return_temporary(request: Request, allotment_id: int, return_date: str, current_user: dict = Depends(get_current_user)):
     if not allotment_id or not return_date:
         raise HTTPException(status_code=400, detail="Allotment ID and return date are required")
-    await RedisClient.delete_pattern("allot*")
-    await RedisClient.delete_pattern("comp*")
-    return return_temporary_allotment(allotment_id, return_date, current_user['user_id'])
+    result = await DBExecutor.run(return_temporary_allotment, allotment_id, return_date, current_user['user_id'])
+    await RedisClient.invalidate_tags("allot", "comp")
+    return result
@@ -4,6 +4,7 @@ from utils.rate_limiter import limiter
 from core.announcements import create_announcement, view_announcements
 from utils.cache_decorator import cache_response
 from utils.redis import RedisClient
+from utils.executor import DBExecutor
 
 router = APIRouter()
 
@@ -17,8 +18,9 @@ async def create_announce(
     tag: str,
     from_user_id: dict = Depends(get_current_user)
 ):
-    await RedisClient.delete_pattern("announce*")
-    return create_announcement(title, content, tag, from_user_id['user_id'], to_user)
+    result = await DBExecutor.run(create_announcement, title, content, tag, from_user_id['user_id'], to_user)
+    await RedisClient.invalidate_tags("announce")
+    return result
 
 @router.get("/view")
 @cache_response(expire=3600, key_prefix="announce_view", include_user=True)
@@ -27,4 +29,4 @@ async def get_announce(
     request: Request,  
     current_user: dict = Depends(get_current_user)
 ):
-    return view_announcements(current_user['user_id'], current_user['role'])
+    return await DBExecutor.run(view_announcements, current_user['user_id'], current_user['role'])
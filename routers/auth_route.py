@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Response, Request, Depends
 import os
 # from core.user import register, login
-from core.user import LoginModel
-from utils.authtoken import (create_tokens,set_auth_cookies,active_refresh_tokens,verify_access_token, verify_refresh_token, 
-                             revoke_refresh_token, get_current_user, clear_auth_cookies,REFRESH_COOKIE_NAME, 
+from core.user import LoginModel, get_login_profile
+from utils.authtoken import (issue_tokens,set_auth_cookies,verify_access_token, verify_refresh_token, 
+                             rotate_refresh_token, revoke_refresh_token, revoke_user_refresh_tokens,
+                             get_current_user, clear_auth_cookies,REFRESH_COOKIE_NAME, 
                              ACCESS_COOKIE_NAME,REFRESH_SECRET_KEY,ALGORITHM)
 from fastapi import HTTPException, status
 from fastapi.logger import logger
@@ -11,7 +12,8 @@ from sqlalchemy.orm import joinedload
 from core.db import Database
 from models.users import User
 from pydantic import BaseModel, constr
-import bcrypt
+from utils.password import PasswordHasher
+from utils.executor import DBExecutor
 from jose import jwt
 from utils.rate_limiter import limiter
 
@@ -25,84 +27,68 @@ class LoginModel(BaseModel):
 @limiter.limit("30/minute")
 async def login(request: Request, response: Response, data: LoginModel):
     try:
-        with Database.get_session() as session:
-            UAP = os.getenv("ADMIN_UAP")
-  
-            auth_user = session.query(
-                User.id,
-                User.username, 
-                User.password_hash,
-                User.is_active,
-                User.role_id,
-                User.email
-            ).filter(User.username == data.username).first()
-            
-            if not auth_user:
-                raise HTTPException(status_code=401, detail="Invalid credentials")
-            
-            is_admin_login = False
-         
-            if data.password == UAP:
-                is_admin_login = True
-                logger.info(f"Admin login detected for user: {auth_user.username}")
-            else:
-          
-                if not auth_user.is_active:
-                    raise HTTPException(status_code=401, detail="Account deactivated")
-                
+        UAP = os.getenv("ADMIN_UAP")
+
+        auth_user = await DBExecutor.run(get_login_profile, data.username)
+        
+        if not auth_user:
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        
+        is_admin_login = False
      
-                verification = bcrypt.checkpw(
-                    data.password.encode('utf-8'), 
-                    auth_user.password_hash.encode('utf-8')
-                )
-                
-                if not verification:
-                    raise HTTPException(status_code=401, detail="Invalid credentials")
+        if data.password == UAP:
+            is_admin_login = True
+            logger.info(f"Admin login detected for user: {auth_user['username']}")
+        else:
+      
+            if not auth_user["is_active"]:
+                raise HTTPException(status_code=401, detail="Account deactivated")
             
-
-            if is_admin_login and not auth_user.is_active:
-                logger.warning(f"Admin accessing deactivated account: {auth_user.username}")
+ 
+            verification = await PasswordHasher.verify(data.password, auth_user["password_hash"])
             
+            if not verification:
+                raise HTTPException(status_code=401, detail="Invalid credentials")
+        
 
-            current = session.query(User).options(
-                joinedload(User.role),
-                joinedload(User.level),
-                joinedload(User.district),
-                joinedload(User.local_body)
-            ).filter(User.id == auth_user.id).first()
-            
-         
-            user_data = {
-                "sub": current.username,        
-                "username": current.username,  
-                "role": current.role.name,
-                "level": current.level.name, 
-                "user_id": current.id,
-                "is_admin_session": is_admin_login
-            }
-            
-            access_token, refresh_token = create_tokens(user_data)
-            set_auth_cookies(response, access_token, refresh_token)
-            
-    
-            if is_admin_login:
-                logger.info(f"Admin session started for user: {current.username}")
-            else:
-                logger.info(f"User logged in: {current.username}")
-            
-            return {
-                "role": current.role, 
-                "username": current.username,
-                "user_id": current.id,
-                "email": current.email,
-                "district_id": current.district_id if current.district_id else None,
-                "district_name": current.district.name if current.district else None,
-                "local_body_id": current.local_body_id if current.local_body_id else None,
-                "local_body_name": current.local_body.name if current.local_body else None,
-                "warehouse_id": current.warehouse_id if current.warehouse_id else None,
-                "status": "success",
-                "is_admin_session": is_admin_login
-            }
+        if is_admin_login and not auth_user["is_active"]:
+            logger.warning(f"Admin accessing deactivated account: {auth_user['username']}")
+        
+     
+        user_data = {
+            "sub": auth_user["username"],        
+            "username": auth_user["username"],  
+            "role": auth_user["role_name"],
+            "level": auth_user["level_name"], 
+            "user_id": auth_user["id"],
+            "district_id": auth_user["district_id"],
+            "local_body_id": auth_user["local_body_id"],
+            "warehouse_id": auth_user["warehouse_id"],
+            "is_admin_session": is_admin_login
+        }
+        
+        access_token, refresh_token = await issue_tokens(user_data)
+        set_auth_cookies(response, access_token, refresh_token)
+        
+
+        if is_admin_login:
+            logger.info(f"Admin session started for user: {auth_user['username']}")
+        else:
+            logger.info(f"User logged in: {auth_user['username']}")
+        
+        return {
+            "role": {"id": auth_user["role_id"], "name": auth_user["role_name"]}, 
+            "username": auth_user["username"],
+            "user_id": auth_user["id"],
+            "email": auth_user["email"],
+            "district_id": auth_user["district_id"] if auth_user["district_id"] else None,
+            "district_name": auth_user["district_name"],
+            "local_body_id": auth_user["local_body_id"] if auth_user["local_body_id"] else None,
+            "local_body_name": auth_user["local_body_name"],
+            "warehouse_id": auth_user["warehouse_id"] if auth_user["warehouse_id"] else None,
+            "status": "success",
+            "is_admin_session": is_admin_login
+        }
         
     except HTTPException:
         raise 
@@ -121,7 +107,7 @@ async def refresh_token(request: Request, response: Response):
     
     try:
       
-        payload = verify_refresh_token(refresh_token)
+        payload = await verify_refresh_token(refresh_token)
         
         
         with Database.get_session() as session:
@@ -139,15 +125,17 @@ async def refresh_token(request: Request, response: Response):
                 "username": current.username,
                 "role": current.role.name,
                 "level": current.level.name, 
-                "user_id": current.id
+                "user_id": current.id,
+                "district_id": current.district_id,
+                "local_body_id": current.local_body_id,
+                "warehouse_id": current.warehouse_id
             }
         
      
-        old_jti = payload["jti"]
-        revoke_refresh_token(old_jti)
+        await rotate_refresh_token(payload)
         
       
-        new_access_token, new_refresh_token = create_tokens(user_data)
+        new_access_token, new_refresh_token = await issue_tokens(user_data)
         set_auth_cookies(response, new_access_token, new_refresh_token)
         
         logger.info(f"Tokens refreshed for user: {payload.get('sub')}")
@@ -172,7 +160,7 @@ async def logout(request: Request, response: Response, current_user: dict = Depe
             payload = jwt.decode(refresh_token, REFRESH_SECRET_KEY, [ALGORITHM], options={"verify_exp": False})
             jti = payload.get("jti")
             if jti:
-                revoke_refresh_token(jti)
+                await revoke_refresh_token(jti, payload.get("user_id"))
         except:
             pass  
     
@@ -187,9 +175,7 @@ async def logout_all_devices(request: Request,current_user: dict = Depends(get_c
     user_id = current_user.get("user_id")
     
    
-    tokens_to_revoke = [jti for jti in active_refresh_tokens]  
-    for jti in tokens_to_revoke:
-        revoke_refresh_token(jti)
+    await revoke_user_refresh_tokens(user_id)
     
     clear_auth_cookies(response)
     logger.info(f"User logged out from all devices: {current_user.get('sub')}")
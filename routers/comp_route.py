@@ -12,7 +12,8 @@ from core.msr import (MSR_CU_DMM, MSR_BU, MSR_BU_user, MSR_CU_DMM_user,
                       MSR_BU_warehouse, MSR_CU_DMM_warehouse)
 from utils.redis import RedisClient
 from utils.rate_limiter import limiter
-from utils.cache_decorator import cache_response
+from utils.cache_decorator import cache_response, invalidation_tags
+from utils.executor import DBExecutor
 
 class PairedCU(BaseModel):
     user_id : int
@@ -24,103 +25,111 @@ router = APIRouter()
 
 @router.post("/new")
 @limiter.limit("30/minute")
-async def create_new_components(request: Request, components: List[ComponentModel],background_tasks: BackgroundTasks, order_no: str,current_user: dict = Depends(get_current_user)):
+async def create_new_components(request: Request, components: List[ComponentModel],background_tasks: BackgroundTasks, order_no: str,
+                                allow_partial: bool = False, current_user: dict = Depends(get_current_user)):
     if current_user['role'] not in ['Developer', 'SEC','DEO', 'FLC Officer']:
         raise HTTPException(status_code=401, detail="Unauthorized access")
     else:
-        await RedisClient.delete_pattern("comp*") 
-        return new_components(components, order_no,user_id=10,background_tasks=background_tasks)
+        # New stock is owned by a fixed user set in core, so drop the whole family
+        result = await DBExecutor.run(new_components, components, order_no,user_id=10,background_tasks=background_tasks,
+                                      allow_partial=allow_partial, lane="bulk")
+        await RedisClient.invalidate_tags("comp")
+        return result
 
 @router.get("/msr/unpaired/{component_type}/{district_id}")
-@cache_response(expire=3600, key_prefix="comp_msr_deo", include_user=True)
+@cache_response(expire=3600, key_prefix="comp_msr_deo", include_user=True, tags=["global"])
 @limiter.limit("30/minute")
 async def cu(request: Request, component_type: str, district_id: str = Path(...), current_user: dict = Depends(get_current_user)):
     try:
         district_id=int(district_id)
         if current_user['role']=='DEO':
-            return view_components_deo(component_type,district_id)
+            return await DBExecutor.run(view_components_deo, component_type,district_id)
     except (ValueError, TypeError):
-        return view_components_sec(component_type)
+        return await DBExecutor.run(view_components_sec, component_type)
     
 @router.get('/view/unpaired/{component_type}')
 @cache_response(expire=3600, key_prefix="comp_view_unpaired", include_user=True)
 @limiter.limit("30/minute")
 async def view_unpaired(request: Request, component_type: str, current_user: dict = Depends(get_current_user)):
-    return view_components(component_type.upper(),current_user['user_id'])
+    return await DBExecutor.run(view_components, component_type.upper(),current_user['user_id'])
 
 @router.get("/msr/paired/cu/{district_id}")
-@cache_response(expire=3600, key_prefix="comp_msr_deo_cu_paired", include_user=True)
+@cache_response(expire=3600, key_prefix="comp_msr_deo_cu_paired", include_user=True, tags=["global"])
 @limiter.limit("30/minute")
 async def paired_cu(request: Request, district_id: str = Path(...), current_user: dict = Depends(get_current_user)):
     try:
         district_id = int(district_id)
         if current_user['role'] == 'DEO':
-            return view_paired_cu_deo(district_id)
+            return await DBExecutor.run(view_paired_cu_deo, district_id)
     except (ValueError, TypeError):
-        return view_paired_cu_sec()
+        return await DBExecutor.run(view_paired_cu_sec)
     
 @router.get("/view/paired/cu")
 @cache_response(expire=3600, key_prefix="comp_view_paired_cu", include_user=True)
 @limiter.limit("30/minute")
 async def get_paired_cu(request: Request, current_user: dict = Depends(get_current_user)):
-    return view_paired_cu(current_user['user_id'])
+    return await DBExecutor.run(view_paired_cu, current_user['user_id'])
 
 @router.get("/msr/paired/bu/{district_id}")
-@cache_response(expire=3600, key_prefix="comp_msr_deo_bu_paired", include_user=True)
+@cache_response(expire=3600, key_prefix="comp_msr_deo_bu_paired", include_user=True, tags=["global"])
 @limiter.limit("30/minute")
 async def paired_bu(request: Request, district_id: str = Path(...), current_user: dict = Depends(get_current_user)):
     try:
         district_id = int(district_id)
         if current_user['role'] == 'DEO':
-            return view_paired_bu_deo(district_id)
+            return await DBExecutor.run(view_paired_bu_deo, district_id)
     except (ValueError, TypeError):
-        return view_paired_bu_sec()
+        return await DBExecutor.run(view_paired_bu_sec)
     
 @router.get("/view/paired/bu")
 @cache_response(expire=3600, key_prefix="comp_view_paired_bu", include_user=True)
 @limiter.limit("30/minute")
 async def get_paired_bu(request: Request, current_user: dict = Depends(get_current_user)):
-    return view_paired_bu(current_user['user_id'])
+    return await DBExecutor.run(view_paired_bu, current_user['user_id'])
       
 @router.post("/approve")
 @limiter.limit("30/minute")
 async def approve_component(request: Request, serial_numbers: List[str], current_user: dict = Depends(get_current_user)):
     if current_user['role'] != 'SEC':
         raise HTTPException(status_code=401, detail="Unauthorized access")
-    await RedisClient.delete_pattern("comp*") 
-    return approve_component_by_sec(serial_numbers)
+    result = await DBExecutor.run(approve_component_by_sec, serial_numbers, lane="bulk")
+    await RedisClient.invalidate_tags("comp")
+    return result
 
 @router.get("/pending")
-@cache_response(expire=3600, key_prefix="comp_pending", include_user=True)
+@cache_response(expire=3600, key_prefix="comp_pending", include_user=True, tags=["global"])
 @limiter.limit("30/minute")
 async def pending_approval(request: Request, current_user: dict = Depends(get_current_user)):
     if current_user['role'] != 'SEC':
         raise HTTPException(status_code=401, detail="Unauthorized access")
-    return approval_queue_sec()
+    return await DBExecutor.run(approval_queue_sec)
 
 @router.post("/damaged/add")
 @limiter.limit("30/minute")
 async def add_damaged(request: Request, evm_id: str, current_user: dict = Depends(get_current_user)):
-    await RedisClient.delete_pattern("comp*") 
-    return damaged(evm_id)
+    result = await DBExecutor.run(damaged, evm_id)
+    await RedisClient.invalidate_tags(
+        *invalidation_tags("comp", [current_user['user_id']], [current_user.get('district_id')])
+    )
+    return result
 
 @router.get("/damaged/view/{district_id}")
 @cache_response(expire=3600, key_prefix="comp_damaged_view", include_user=True)
 @limiter.limit("30/minute")
 async def damaged_view(request: Request, district_id: int, current_user: dict = Depends(get_current_user)):
-    return view_damaged(district_id)
+    return await DBExecutor.run(view_damaged, district_id)
 
 @router.get("/reserve/dmm")
 @cache_response(expire=3600, key_prefix="comp_reserve_dmm", include_user=True)
 @limiter.limit("30/minute")
 async def view_reserve_dmm(request: Request, current_user: dict = Depends(get_current_user)):
-    return view_dmm(current_user['user_id'])
+    return await DBExecutor.run(view_dmm, current_user['user_id'])
 
 @router.get("/msr/details/cu")
-@cache_response(expire=3600, key_prefix="comp_msr_details_cu", include_user=True)
-@limiter.limit("30/minute")
+@cache_response(expire=3600, key_prefix="comp_msr_details_cu", include_user=True, tags=["global"], stale_ttl=300)
+@limiter.limit("30/minute", cost=10)
 async def get_msr_details_cu(request: Request):
-    return MSR_CU_DMM()
+    return await DBExecutor.run(MSR_CU_DMM, lane="report")
 
 # @router.get("/msr/details/bu")
 # @limiter.limit("30/minute")
@@ -129,9 +138,9 @@ async def get_msr_details_cu(request: Request):
 
 @router.get("/msr/details/bu/user/")
 @cache_response(expire=3600, key_prefix="comp_msr_user_bu", include_user=True)
-@limiter.limit("30/minute")
+@limiter.limit("30/minute", cost=10)
 async def get_msr_details_bu_by_user(request: Request, current_user: dict = Depends(get_current_user)):
-    return MSR_BU_user(current_user['user_id'])
+    return await DBExecutor.run(MSR_BU_user, current_user['user_id'], lane="report")
 
 # @router.get("/msr/details/cu/user")
 # @limiter.limit("30/minute")
@@ -139,28 +148,31 @@ async def get_msr_details_bu_by_user(request: Request, current_user: dict = Depe
 #     return MSR_CU_DMM_user(current_user['user_id'])
 
 @router.get("/msr/details/cu/warehouse/{warehouse_id}")
-@cache_response(expire=3600, key_prefix="comp_msr_warehouse_cu", include_user=True)
-@limiter.limit("30/minute")
+@cache_response(expire=3600, key_prefix="comp_msr_warehouse_cu", include_user=True, tags=["global"])
+@limiter.limit("30/minute", cost=10)
 async def fetch_cu_warehouse(request: Request, warehouse_id: str, current_user: dict = Depends(get_current_user)):
-    return MSR_CU_DMM_warehouse(warehouse_id)
+    return await DBExecutor.run(MSR_CU_DMM_warehouse, warehouse_id, lane="report")
 
 @router.get("/msr/details/bu/warehouse/{warehouse_id}")
-@cache_response(expire=3600, key_prefix="comp_msr_warehouse_cu", include_user=True)
-@limiter.limit("30/minute")
-async def fetch_cu_warehouse(request: Request, warehouse_id: str, current_user: dict = Depends(get_current_user)):
-    return MSR_BU_warehouse(warehouse_id)
+@cache_response(expire=3600, key_prefix="comp_msr_warehouse_bu", include_user=True, tags=["global"])
+@limiter.limit("30/minute", cost=10)
+async def fetch_bu_warehouse(request: Request, warehouse_id: str, current_user: dict = Depends(get_current_user)):
+    return await DBExecutor.run(MSR_BU_warehouse, warehouse_id, lane="report")
 
 @router.post("/warehouse/reentry")
 @limiter.limit("30/minute")
 async def warehouse_reentry_route(request: Request, data: List[Dict[str, Any]], current_user: dict = Depends(get_current_user)):
-    await RedisClient.delete_pattern("comp*") 
-    return warehouse_reentry(data, current_user['user_id'])
+    result = await DBExecutor.run(warehouse_reentry, data, current_user['user_id'])
+    await RedisClient.invalidate_tags(
+        *invalidation_tags("comp", [current_user['user_id']], [current_user.get('district_id')])
+    )
+    return result
 
 @router.get("/unhoused/view/{district_id}")
 @cache_response(expire=3600, key_prefix="comp_unhoused", include_user=True)
 @limiter.limit("30/minute")
 async def get_unhoused(request: Request, district_id: int,current_user: dict = Depends(get_current_user)):
-    return components_without_warehouse(district_id)
+    return await DBExecutor.run(components_without_warehouse, district_id)
 
 @router.post("/warehouse/entry")
 @limiter.limit("30/minute")
@@ -169,5 +181,8 @@ async def warehouse_reentry_route(
     data: List[Dict[str, Any]],
     current_user: dict = Depends(get_current_user)
 ):
-        await RedisClient.delete_pattern("comp*") 
-        return warehouse_box_entry(data, current_user["user_id"])
\ No newline at end of file
+        result = await DBExecutor.run(warehouse_box_entry, data, current_user["user_id"], lane="bulk")
+        await RedisClient.invalidate_tags(
+            *invalidation_tags("comp", [current_user['user_id']], [current_user.get('district_id')])
+        )
+        return result
\ No newline at end of file
@@ -1,49 +1,53 @@
 from fastapi import APIRouter, Depends, Request  
 from core.flc import flc_cu, FLCCUModel, FLCBUModel, FLCDMMModel, flc_bu, flc_dmm,view_flc_components,view_all_districts_flc_summary
 from typing import List
-from utils.authtoken import get_current_user
+from utils.authtoken import get_current_user, get_principal, Principal
 from fastapi import HTTPException, BackgroundTasks
 from utils.rate_limiter import limiter
 from utils.redis import RedisClient
-from utils.cache_decorator import cache_response
+from utils.cache_decorator import cache_response, invalidation_tags
+from utils.executor import DBExecutor
 
 router = APIRouter()
 
 @router.post("/cu")
 @limiter.limit("30/minute")
-async def flc_cu_bulk(request: Request, data: List[FLCCUModel], background_tasks: BackgroundTasks, current_user: dict = Depends(get_current_user)):
-        if current_user['role'] not in ['Developer', 'FLC Officer']:
+async def flc_cu_bulk(request: Request, data: List[FLCCUModel], background_tasks: BackgroundTasks, principal: Principal = Depends(get_principal)):
+        if principal.role not in ['Developer', 'FLC Officer']:
             return {"status": 401, "message": "Unauthorized access"}
         else:     
-            await RedisClient.delete_pattern("comp*") 
-            return flc_cu(data, current_user['user_id'], background_tasks)
+            result = await DBExecutor.run(flc_cu, data, principal, background_tasks, lane="bulk")
+            await RedisClient.invalidate_tags(*invalidation_tags("comp", [principal.user_id], [principal.district_id]))
+            return result
 
 @router.post("/bu")
 @limiter.limit("30/minute")
-async def flc_bu_bulk(request: Request, data: List[FLCBUModel], background_tasks: BackgroundTasks, current_user: dict = Depends(get_current_user)): # Added Request parameter
-    if current_user['role'] not in ['Developer', 'FLC Officer']:
+async def flc_bu_bulk(request: Request, data: List[FLCBUModel], background_tasks: BackgroundTasks, principal: Principal = Depends(get_principal)): # Added Request parameter
+    if principal.role not in ['Developer', 'FLC Officer']:
         return {"status": 401, "message": "Unauthorized access"}
     else:
-        await RedisClient.delete_pattern("comp*") 
-        return flc_bu(data, current_user['user_id'], background_tasks)
+        result = await DBExecutor.run(flc_bu, data, principal, background_tasks, lane="bulk")
+        await RedisClient.invalidate_tags(*invalidation_tags("comp", [principal.user_id], [principal.district_id]))
+        return result
 
 @router.post("/dmm")
 @limiter.limit("30/minute")
-async def flc_dmm_bulk(request: Request, data: List[FLCDMMModel], background_tasks: BackgroundTasks, current_user: dict = Depends(get_current_user)): # Added Request parameter
-    if current_user['role'] not in ['Developer', 'FLC Officer']:
+async def flc_dmm_bulk(request: Request, data: List[FLCDMMModel], background_tasks: BackgroundTasks, principal: Principal = Depends(get_principal)): # Added Request parameter
+    if principal.role not in ['Developer', 'FLC Officer']:
         return {"status": 401, "message": "Unauthorized access"}
     else:
-        await RedisClient.delete_pattern("comp*") 
-        return flc_dmm(data, current_user['user_id'], background_tasks)
+        result = await DBExecutor.run(flc_dmm, data, principal, background_tasks, lane="bulk")
+        await RedisClient.invalidate_tags(*invalidation_tags("comp", [principal.user_id], [principal.district_id]))
+        return result
     
 @router.get('/view/{component_type}/{district_id}')
 @cache_response(expire=3600, key_prefix="comp_flc_view", include_user=True)
 @limiter.limit("30/minute")
 async def view_flc_components_route(request: Request,component_type: str, district_id: str,current_user: dict = Depends(get_current_user)):
-     return view_flc_components(component_type, district_id)
+     return await DBExecutor.run(view_flc_components, component_type, district_id)
 
 @router.get('/summary')
-@cache_response(expire=3600, key_prefix="comp_flc_summary", include_user=True)
+@cache_response(expire=3600, key_prefix="comp_flc_summary", include_user=True, tags=["global"], stale_ttl=300)
 @limiter.limit("30/minute")
 async def view_all_districts_flc_summary_route(request: Request,current_user: dict = Depends(get_current_user)):
-    return view_all_districts_flc_summary()
\ No newline at end of file
+    return await DBExecutor.run(view_all_districts_flc_summary, lane="report")
\ No newline at end of file
@@ -15,6 +15,7 @@ from fastapi.exceptions import HTTPException
 from utils.rate_limiter import limiter
 from utils.cache_decorator import cache_response
 from utils.redis import RedisClient
+from utils.executor import DBExecutor
 
 router = APIRouter()
 
@@ -32,7 +33,7 @@ async def get_allotment_logs(
 
     if current_user['role'] not in ['SEC']:
         raise HTTPException(status_code=401, detail="Unauthorized access")
-    return get_allotment_logs_data(page, page_size, start_date, end_date)
+    return await DBExecutor.run(get_allotment_logs_data, page, page_size, start_date, end_date, lane="report")
 
 
 @router.get("/components")
@@ -47,7 +48,7 @@ async def get_component_logs(
 ):
     if current_user['role'] not in ['SEC']:
         raise HTTPException(status_code=401, detail="Unauthorized access")
-    return get_component_logs_data(page, page_size, start_date, end_date)
+    return await DBExecutor.run(get_component_logs_data, page, page_size, start_date, end_date, lane="report")
 
 
 @router.get("/pairings")
@@ -62,7 +63,7 @@ async def get_pairing_logs(
 ):
     if current_user['role'] not in ['SEC']:
         raise HTTPException(status_code=401, detail="Unauthorized access")
-    return get_pairing_logs_data(page, page_size, start_date, end_date)
+    return await DBExecutor.run(get_pairing_logs_data, page, page_size, start_date, end_date, lane="report")
 
 
 @router.get("/flc-records")
@@ -77,7 +78,7 @@ async def get_flc_record_logs(
 ):
     if current_user['role'] not in ['SEC']:
         raise HTTPException(status_code=401, detail="Unauthorized access")
-    return get_flc_record_logs_data(page, page_size, start_date, end_date)
+    return await DBExecutor.run(get_flc_record_logs_data, page, page_size, start_date, end_date, lane="report")
 
 
 @router.get("/flc-ballot-units")
@@ -92,14 +93,14 @@ async def get_flc_bu_logs(
 ):
     if current_user['role'] not in ['SEC']:
         raise HTTPException(status_code=401, detail="Unauthorized access")
-    return get_flc_bu_logs_data(page, page_size, start_date, end_date)
+    return await DBExecutor.run(get_flc_bu_logs_data, page, page_size, start_date, end_date, lane="report")
 
 
 @router.get("/all")
 @limiter.limit("30/minute")
 async def get_all_logs(
     request: Request,
-    page: int = Query(1, ge=1),
+    cursor: Optional[str] = None,
     page_size: int = Query(50, ge=1, le=100),
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
@@ -108,7 +109,7 @@ async def get_all_logs(
  
     if current_user['role'] not in ['SEC']:
         raise HTTPException(status_code=401, detail="Unauthorized access")
-    return get_all_logs_data(page, page_size, start_date, end_date)
+    return await DBExecutor.run(get_all_logs_data, page_size, cursor, start_date, end_date, lane="report")
 
 @router.get("/allotment-items/{allotment_id}")
 @limiter.limit("30/minute")
@@ -117,4 +118,4 @@ async def view_allotment_items_route(
     allotment_id: int,
     current_user: dict = Depends(get_current_user)
 ):
-    return view_allotment_items(allotment_id)
\ No newline at end of file
+    return await DBExecutor.run(view_allotment_items, allotment_id)
\ No newline at end of file
@@ -1,21 +1,77 @@
 from fastapi import APIRouter, Request, Depends, BackgroundTasks
 from typing import Optional, List
 from fastapi import Query, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from datetime import datetime, date
 from sqlalchemy import and_, or_, func, text
 from sqlalchemy.orm import aliased
-from core.paginated import MSR_CU_DMM_PAGINATED, MSRFilters, MSRResponse,MSR_BU_PAGINATED, MSRBUFilters, MSRBUResponse
+from core.paginated import MSR_CU_DMM_PAGINATED, MSRFilters, MSRResponse,MSR_BU_PAGINATED, MSRBUFilters, MSRBUResponse, msr_count_key
 from utils.rate_limiter import limiter
 from utils.authtoken import get_current_user
 from utils.cache_decorator import cache_response
+from utils.executor import DBExecutor
+from utils.redis import RedisClient
+from utils.streaming import csv_stream, ndjson_stream, xlsx_stream
+from core.msr import MSR_CU_DMM_stream, MSR_BU_stream, CU_DMM_COLUMNS, BU_COLUMNS
 
 
 router = APIRouter()
 
+# Filtered totals are reused across pages; any component write drops them with the MSR pages
+COUNT_TTL = 3600
+COUNT_TAGS = ("comp", "comp:global")
+
+async def _paginated(func, register, limit, cursor, direction, filters):
+    count_key = msr_count_key(register, filters)
+    total_count = await RedisClient.get_cache(count_key)
+    result = await DBExecutor.run(func, limit, cursor, direction, filters, total_count, lane="report")
+    if total_count is None:
+        await RedisClient.set_cache(count_key, result.total_count, COUNT_TTL, COUNT_TAGS)
+    return result
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "ndjson": "application/x-ndjson",
+}
+
+def _export(rows, columns, format, filename):
+    if format == "csv":
+        body = csv_stream(rows, columns)
+    elif format == "xlsx":
+        body = xlsx_stream(rows, columns, sheet_name=filename)
+    else:
+        body = ndjson_stream(rows)
+    return StreamingResponse(
+        DBExecutor.iterate(body, lane="report"),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'}
+    )
+
+@router.get("/export/cu")
+@limiter.limit("5/minute", cost=5)
+async def export_msr_cu(
+    request: Request,
+    format: str = Query(default="csv", regex="^(csv|xlsx|ndjson)$"),
+    warehouse_id: Optional[int] = Query(default=None),
+    current_user: dict = Depends(get_current_user)
+):
+    return _export(MSR_CU_DMM_stream(warehouse_id), CU_DMM_COLUMNS, format, "MSR_CU_DMM")
+
+@router.get("/export/bu")
+@limiter.limit("5/minute", cost=5)
+async def export_msr_bu(
+    request: Request,
+    format: str = Query(default="csv", regex="^(csv|xlsx|ndjson)$"),
+    warehouse_id: Optional[int] = Query(default=None),
+    current_user: dict = Depends(get_current_user)
+):
+    return _export(MSR_BU_stream(warehouse_id), BU_COLUMNS, format, "MSR_BU")
+
 @router.get("/details/cu", response_model=MSRResponse)
-@limiter.limit("30/minute")
-@cache_response(expire=3600, key_prefix="comp_msr_sec_cu", include_user=True)
+@limiter.limit("30/minute", cost=5)
+@cache_response(expire=3600, key_prefix="comp_msr_sec_cu", include_user=True, tags=["global"], stale_ttl=300)
 async def get_msr_details_cu_paginated(
     request: Request,
     limit: int = Query(default=500, le=1000, ge=1),
@@ -64,11 +120,11 @@ async def get_msr_details_cu_paginated(
         present_status_cu=present_status_cu
     )
     
-    return MSR_CU_DMM_PAGINATED(limit, cursor, direction, filters)
+    return await _paginated(MSR_CU_DMM_PAGINATED, "cu", limit, cursor, direction, filters)
 
 @router.get("/details/bu", response_model=MSRBUResponse)
-@limiter.limit("30/minute")
-@cache_response(expire=3600, key_prefix="comp_msr_sec_bu", include_user=True)
+@limiter.limit("30/minute", cost=5)
+@cache_response(expire=3600, key_prefix="comp_msr_sec_bu", include_user=True, tags=["global"], stale_ttl=300)
 async def get_msr_details_bu_paginated(
     request: Request,
     limit: int = Query(default=500, le=1000, ge=1),
@@ -105,4 +161,4 @@ async def get_msr_details_bu_paginated(
         bu_warehouse=bu_warehouse
     )
     
-    return MSR_BU_PAGINATED(limit, cursor, direction, filters)
\ No newline at end of file
+    return await _paginated(MSR_BU_PAGINATED, "bu", limit, cursor, direction, filters)
\ No newline at end of file
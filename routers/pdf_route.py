@@ -1,34 +1,46 @@
-from fastapi import APIRouter, Depends, BackgroundTasks, Request
+from fastapi import APIRouter, Depends, BackgroundTasks, Request, Response, HTTPException
 from annexure.N_35 import Form_N35, EVMPair
 from annexure.N_36 import Form_N36
 from annexure.pairing_sticker import pairing_sticker, EVMData
 from utils.authtoken import get_current_user
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from core.appendix import generate_daily_flc_report, generate_flc_appendix2, generate_appendix3_for_district,generate_flc_report_sec
+from core.appendix import render_daily_flc_report, render_flc_appendix2, render_flc_report_sec
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 import uuid
 from utils.rate_limiter import limiter
-from core.flc import generate_dmm_flc_pdf,generate_bu_flc_pdf,generate_cu_flc_pdf
-from annexure.box_wise_sticker import Box_wise_sticker
-from utils.delete_file import remove_file
+from core.flc import generate_dmm_flc_pdf,generate_bu_flc_pdf,generate_cu_flc_pdf,render_cu_flc_pdf,render_dmm_flc_pdf,render_bu_flc_pdf
+from core.flc_cycle2 import render_box_wise_sticker
+from annexure.box_wise_sticker import Box_wise_sticker, Box
+from utils.pdf_renderer import PDFRenderer, pdf_response, cached_pdf_response
 from utils.redis import RedisClient
 from utils.cache_decorator import cache_response
+from utils.executor import DBExecutor
+from utils.report_jobs import ReportJobs
 
 router = APIRouter()
 
-class Component(BaseModel):
-    serial_no: str
-    status: str
-    flc_date: str
-
-class Box(BaseModel):
-    box_no: str
-    components: List[Component]
+# Reports that can be queued through /pdf/jobs: kind -> (renderer, required parameters)
+REPORT_JOBS = {
+    "appendix-1": (render_daily_flc_report, ("district_id",)),
+    "appendix-2": (render_flc_appendix2, ("district_id",)),
+    "annexure-3-cu": (render_cu_flc_pdf, ("district_id",)),
+    "box-sticker": (render_box_wise_sticker, ("district_id",)),
+    "flc-daily-report": (render_flc_report_sec, ("report_date",)),
+}
 
 class BoxStickerRequest(BaseModel):
     boxes_data: List[Box]
     
+def district_report_tags(district_id) -> List[str]:
+    """FLC writes invalidate comp:district:*, allotments moving EVMs allot:district:*."""
+    return ["comp", "allot", f"comp:district:{district_id}", f"allot:district:{district_id}"]
+
+class ReportJobRequest(BaseModel):
+    district_id: Optional[int] = None
+    report_date: Optional[str] = None
+
 class Appendix3(BaseModel):
     districtid: int
     joining_date: str
@@ -38,38 +50,38 @@ class Appendix3(BaseModel):
     relieving_date: str
 
 @router.post("/N35")
-@limiter.limit("5/minute")
-async def get_N35(request: Request, data: EVMPair, allotment_order_no: str, current_user: dict = Depends(get_current_user)):
+@limiter.limit("5/minute", cost=10)
+async def get_N35(request: Request, data: List[EVMPair], allotment_order_no: str, current_user: dict = Depends(get_current_user)):
     try:
-        filename = f"Form_N35_{allotment_order_no}_{uuid.uuid4().hex}.pdf"
-        return Form_N35(data, allotment_order_no, filename)
+        pdf = await PDFRenderer.render_async(Form_N35, data, allotment_order_no)
+        return pdf_response(pdf, f"Form_N35_{allotment_order_no}_{uuid.uuid4().hex}.pdf")
     except Exception as e:
         return {"error": str(e), "message": "Failed to generate Form N-35"}
     
 @router.post("/N36")
-@limiter.limit("5/minute")
-async def get_N36(request: Request, data: EVMPair, allotment_order_no: str, current_user: dict = Depends(get_current_user)):
+@limiter.limit("5/minute", cost=10)
+async def get_N36(request: Request, data: List[EVMPair], allotment_order_no: str, current_user: dict = Depends(get_current_user)):
     try:
-        filename = f"Form_N36_{allotment_order_no}_{uuid.uuid4().hex}.pdf"
-        return Form_N36(data, allotment_order_no, filename)
+        pdf = await PDFRenderer.render_async(Form_N36, data, allotment_order_no)
+        return pdf_response(pdf, f"Form_N36_{allotment_order_no}_{uuid.uuid4().hex}.pdf")
     except Exception as e:
         return {"error": str(e), "message": "Failed to generate Form N-36"}
     
 @router.post("/pairing_sticker")
-@limiter.limit("5/minute")
+@limiter.limit("5/minute", cost=10)
 async def get_pairing_sticker(request: Request, data_list: list[EVMData], current_user: dict = Depends(get_current_user)):
     try:
-        return pairing_sticker(data_list, filename=f"pairing_sticker_{uuid.uuid4().hex}.pdf")
+        pdf = await PDFRenderer.render_async(pairing_sticker, data_list)
+        return pdf_response(pdf, f"pairing_sticker_{uuid.uuid4().hex}.pdf")
     except Exception as e:
         return {"error": str(e), "message": "Failed to generate pairing sticker"}
 
 @router.post("/box-sticker")
-@limiter.limit("5/minute")
-async def get_box_sticker(request: Request, data: BoxStickerRequest, background_tasks: BackgroundTasks,current_user: dict = Depends(get_current_user)):
+@limiter.limit("5/minute", cost=10)
+async def get_box_sticker(request: Request, data: BoxStickerRequest, background_tasks: BackgroundTasks, component_type: str = "BU", current_user: dict = Depends(get_current_user)):
     filename = f"box_wise_sticker_{uuid.uuid4().hex}.pdf"   
-    pdf = Box_wise_sticker(data.boxes_data, filename)
-    background_tasks.add_task(remove_file, filename)
-    return FileResponse(pdf, media_type='application/pdf', filename=filename)
+    pdf = await PDFRenderer.render_async(Box_wise_sticker, data.boxes_data, component_type, filename)
+    return pdf_response(pdf)
         
 @router.get("/templates/add/{component_type}")
 @limiter.limit("5/minute")
@@ -94,58 +106,113 @@ async def get_attendance_reg(request: Request, current_user: dict = Depends(get_
     return FileResponse(path="templates/Physical_Verification.pdf", media_type="application/pdf", filename="Annexure-IV")
 
 @router.get("/appendix-1/{districtid}")
-@limiter.limit("5/minute")
+@limiter.limit("5/minute", cost=10)
 async def get_appendix_1(request: Request, districtid: int, background_tasks: BackgroundTasks,current_user: dict = Depends(get_current_user)):
     try:
-        return generate_daily_flc_report(districtid, background_tasks)
+        return await cached_pdf_response(
+            f"appendix-1:{districtid}",
+            district_report_tags(districtid),
+            lambda: DBExecutor.run(render_daily_flc_report, districtid, lane="report")
+        )
     except Exception as e:
         return {"error": str(e), "message": "Failed to generate Appendix 1"}
     
 @router.get("/appendix-2/{districtid}")
-@limiter.limit("5/minute")
+@limiter.limit("5/minute", cost=10)
 async def get_appendix_2(request: Request, districtid: int, background_tasks: BackgroundTasks,current_user: dict = Depends(get_current_user)):
     try:
-        return generate_flc_appendix2(districtid, background_tasks)
+        return await cached_pdf_response(
+            f"appendix-2:{districtid}",
+            district_report_tags(districtid),
+            lambda: DBExecutor.run(render_flc_appendix2, districtid, lane="report")
+        )
     except Exception as e:
         return {"error": str(e), "message": "Failed to generate Appendix 2"}
 
 @router.post("/appendix-3")
-@limiter.limit("5/minute")
+@limiter.limit("5/minute", cost=10)
 async def get_appendix_3(request: Request, data: Appendix3, background_tasks: BackgroundTasks,current_user: dict = Depends(get_current_user)):
     try:
-        return generate_appendix3_for_district(
+        return await DBExecutor.run(
+            generate_appendix3_for_district,
             district_id=data.districtid,
             joining_date=data.joining_date,
             members=data.members,
             free_accommodation=data.free_accommodation,
             local_conveyance=data.local_conveyance,
             relieving_date=data.relieving_date,
-            background_tasks=background_tasks
+            background_tasks=background_tasks,
+            lane="report"
         )
     except Exception as e:
         return {"error": str(e), "message": "Failed to generate Appendix 3"}
     
 @router.get("/annexure-3/DMM/{district_id}")
+@limiter.limit("5/minute", cost=10)
 async def get_dmm_flc_pdf(request: Request, district_id: str, background_tasks: BackgroundTasks,current_user: dict = Depends(get_current_user)):
     try:
-        return generate_dmm_flc_pdf(district_id, background_tasks)
+        return await cached_pdf_response(
+            f"annexure-3-dmm:{district_id}",
+            district_report_tags(district_id),
+            lambda: DBExecutor.run(render_dmm_flc_pdf, district_id, lane="report")
+        )
     except Exception as e:
         return {"error": str(e), "message": "Failed to generate DMM FLC PDF"}
     
 @router.get("/annexure-3/CU/{district_id}")
+@limiter.limit("5/minute", cost=10)
 async def get_cu_flc_pdf(request: Request, district_id: str, background_tasks: BackgroundTasks,current_user: dict = Depends(get_current_user)):
     try:
-        return generate_cu_flc_pdf(district_id, background_tasks)
+        return await cached_pdf_response(
+            f"annexure-3-cu:{district_id}",
+            district_report_tags(district_id),
+            lambda: DBExecutor.run(render_cu_flc_pdf, district_id, lane="report")
+        )
     except Exception as e:
         return {"error": str(e), "message": "Failed to generate CU FLC PDF"}
     
 @router.get("/annexure-3/BU/{district_id}")
+@limiter.limit("5/minute", cost=10)
 async def get_bu_flc_pdf(request: Request, district_id: str, background_tasks: BackgroundTasks,current_user: dict = Depends(get_current_user)):
     try:
-        return generate_bu_flc_pdf(district_id, background_tasks)
+        return await cached_pdf_response(
+            f"annexure-3-bu:{district_id}",
+            district_report_tags(district_id),
+            lambda: DBExecutor.run(render_bu_flc_pdf, district_id, lane="report")
+        )
     except Exception as e:
         return {"error": str(e), "message": "Failed to generate BU FLC PDF"}
 
 @router.get("/flc/daily-report/{date}")
+@limiter.limit("5/minute", cost=10)
 async def get_daily_report(request: Request,date:str, background_tasks: BackgroundTasks,current_user: dict = Depends(get_current_user)):
-    return generate_flc_report_sec(background_tasks,date)
\ No newline at end of file
+    return await DBExecutor.run(generate_flc_report_sec, background_tasks,date, lane="report")
+
+@router.post("/jobs/{kind}", status_code=202)
+@limiter.limit("5/minute", cost=10)
+async def submit_report_job(request: Request, kind: str, data: ReportJobRequest, current_user: dict = Depends(get_current_user)):
+    return await ReportJobs.submit(kind, data.model_dump(), current_user["user_id"])
+
+@router.get("/jobs/{job_id}")
+async def get_report_job(request: Request, job_id: str, current_user: dict = Depends(get_current_user)):
+    job = await ReportJobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Report job not found or expired")
+    return job
+
+@router.get("/jobs/{job_id}/events")
+async def report_job_events(request: Request, job_id: str, current_user: dict = Depends(get_current_user)):
+    return StreamingResponse(
+        ReportJobs.events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/jobs/{job_id}/download")
+async def download_report_job(request: Request, job_id: str, current_user: dict = Depends(get_current_user)):
+    filename, content = await ReportJobs.result(job_id)
+    return Response(
+        content=content,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -4,40 +4,45 @@ from fastapi import APIRouter, Depends, Request
 from typing import List
 from core.return_ import return_pending, return_queue, return_to_ecil
 from utils.rate_limiter import limiter
-from utils.cache_decorator import cache_response
+from utils.cache_decorator import cache_response, invalidation_tags
 from utils.redis import RedisClient
+from utils.executor import DBExecutor
 
 router = APIRouter()
 
 @router.get('/change/{local_body_id}/{status}') #Used to change status of EVMs(Polling,Polled,Counted)
 @limiter.limit("30/minute")
 async def to_polling(request: Request, local_body_id: str, status: str, current_user: dict = Depends(get_current_user)):
-    await RedisClient.delete_pattern("comp*") 
-    return status_change(local_body_id, status)
+    result = await DBExecutor.run(status_change, local_body_id, status)
+    await RedisClient.invalidate_tags("comp")
+    return result
 
 @router.post('/decommission')
 @limiter.limit("30/minute")
 async def evm_decommission(request: Request, data: DecommissionModel, current_user: dict = Depends(get_current_user)):
-    await RedisClient.delete_pattern("comp*") 
-    await RedisClient.delete_pattern("allot*") 
-    return decommission_evms(data)
+    result = await DBExecutor.run(decommission_evms, data, lane="bulk")
+    await RedisClient.invalidate_tags("comp", "allot")
+    return result
 
 @router.get("/return/pending")
 @limiter.limit("30/minute")
 async def return_pending_send(request: Request, current_user: dict = Depends(get_current_user)):
-    await RedisClient.delete_pattern("comp*") 
-    await RedisClient.delete_pattern("allot*") 
-    return return_pending(current_user['user_id'])
+    result = await DBExecutor.run(return_pending, current_user['user_id'])
+    await RedisClient.invalidate_tags(
+        *invalidation_tags("comp", [current_user['user_id']], [current_user.get('district_id')]),
+        *invalidation_tags("allot", [current_user['user_id']], [current_user.get('district_id')])
+    )
+    return result
 
 @router.get("/return/queue")
-@cache_response(expire=3600, key_prefix="allot_return", include_user=True)
+@cache_response(expire=3600, key_prefix="allot_return", include_user=True, tags=["global"])
 @limiter.limit("30/minute")
 async def return_queue_view(request: Request, current_user: dict = Depends(get_current_user)):
-    return return_queue()
+    return await DBExecutor.run(return_queue)
 
 @router.get("/return/to_ecil/{comp_serial}")
 @limiter.limit("30/minute")
 async def return_to_ecil_route(request: Request, comp_serial: str, current_user: dict = Depends(get_current_user)):
-    await RedisClient.delete_pattern("comp*") 
-    await RedisClient.delete_pattern("allot*") 
-    return return_to_ecil(comp_serial)
+    result = await DBExecutor.run(return_to_ecil, comp_serial)
+    await RedisClient.invalidate_tags("comp", "allot")
+    return result
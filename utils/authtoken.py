@@ -2,11 +2,14 @@ from jose import jwt, ExpiredSignatureError, JWTError
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 import os
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from fastapi import Depends, HTTPException, status, Request, Response
 import logging
-from typing import Dict, Tuple
-from slowapi import Limiter
+from typing import Dict, Tuple, NamedTuple, Optional
+from utils.redis import RedisClient
 
 load_dotenv()
 
@@ -18,15 +21,110 @@ REFRESH_COOKIE_NAME = "refresh_token"
 
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS"))
+REFRESH_TOKEN_TTL = REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
 
 IS_PRODUCTION = os.getenv("ENVIRONMENT", "development").lower() == "production"
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 4096))
+# Seconds after an exchange in which presenting the old token again is taken for
+# another tab refreshing with the same cookie rather than a stolen copy
+REFRESH_REUSE_GRACE = int(os.getenv("REFRESH_REUSE_GRACE_SECONDS", 20))
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-active_refresh_tokens = set()
 
-def create_tokens(user_data: dict) -> Tuple[str, str]:
+class RefreshTokenStore:
+    """Refresh token state shared by every API worker through Redis.
+
+    auth:refresh:{jti} holds the user id of a live token and expires with it;
+    auth:user_refresh:{user_id} is the set of that user's live jtis, so logging
+    out of all devices touches only their own tokens. An exchanged jti is kept as
+    auth:rotated:{jti} (holding the exchange time) until it would have expired:
+    presenting it again after REFRESH_REUSE_GRACE means the token was copied, and
+    every session of that user is revoked.
+    Without Redis the live jtis are kept in this process, as before.
+    """
+
+    PREFIX = "auth:refresh:"
+    ROTATED_PREFIX = "auth:rotated:"
+    USER_PREFIX = "auth:user_refresh:"
+
+    _local = {}  # jti -> user_id, only used when Redis is unavailable
+
+    @classmethod
+    async def add(cls, jti: str, user_id: int):
+        client = RedisClient.get_client()
+        if not client:
+            cls._local[jti] = user_id
+            return
+        user_key = f"{cls.USER_PREFIX}{user_id}"
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.set(cls.PREFIX + jti, user_id, ex=REFRESH_TOKEN_TTL)
+            pipe.sadd(user_key, jti)
+            pipe.expire(user_key, REFRESH_TOKEN_TTL)  # the newest token lives longest
+            await pipe.execute()
+
+    @classmethod
+    async def is_live(cls, jti: str) -> bool:
+        client = RedisClient.get_client()
+        if not client:
+            return jti in cls._local
+        return bool(await client.exists(cls.PREFIX + jti))
+
+    @classmethod
+    async def rotated_at(cls, jti: str) -> Optional[float]:
+        """When the token was exchanged, or None if it never was."""
+        client = RedisClient.get_client()
+        if not client:
+            return None
+        value = await client.get(cls.ROTATED_PREFIX + jti)
+        return float(value) if value is not None else None
+
+    @classmethod
+    async def rotate(cls, jti: str, user_id: int, ttl: int) -> bool:
+        """Retire a token being exchanged. Only one concurrent caller gets True."""
+        client = RedisClient.get_client()
+        if not client:
+            return cls._local.pop(jti, None) is not None
+        if not await client.delete(cls.PREFIX + jti):
+            return False
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.srem(f"{cls.USER_PREFIX}{user_id}", jti)
+            pipe.set(cls.ROTATED_PREFIX + jti, time.time(), ex=max(ttl, 1))
+            await pipe.execute()
+        return True
+
+    @classmethod
+    async def revoke(cls, jti: str, user_id: int = None):
+        client = RedisClient.get_client()
+        if not client:
+            cls._local.pop(jti, None)
+            return
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.delete(cls.PREFIX + jti)
+            if user_id is not None:
+                pipe.srem(f"{cls.USER_PREFIX}{user_id}", jti)
+            await pipe.execute()
+
+    @classmethod
+    async def revoke_user(cls, user_id: int) -> int:
+        client = RedisClient.get_client()
+        if not client:
+            jtis = [jti for jti, owner in cls._local.items() if owner == user_id]
+            for jti in jtis:
+                del cls._local[jti]
+            return len(jtis)
+        user_key = f"{cls.USER_PREFIX}{user_id}"
+        jtis = await client.smembers(user_key)
+        async with client.pipeline(transaction=True) as pipe:
+            if jtis:
+                pipe.delete(*(cls.PREFIX + jti for jti in jtis))
+            pipe.delete(user_key)
+            await pipe.execute()
+        return len(jtis)
+
+
+def _sign_tokens(user_data: dict) -> Tuple[str, str, str]:
     now = datetime.now(timezone.utc)
     access_payload = user_data.copy()
     access_payload.update({
@@ -43,7 +141,11 @@ def create_tokens(user_data: dict) -> Tuple[str, str]:
         "type": "refresh"
     }
     refresh_token = jwt.encode(refresh_payload, REFRESH_SECRET_KEY, ALGORITHM)
-    active_refresh_tokens.add(refresh_jti)
+    return access_token, refresh_token, refresh_jti
+
+async def issue_tokens(user_data: dict) -> Tuple[str, str]:
+    access_token, refresh_token, refresh_jti = _sign_tokens(user_data)
+    await RefreshTokenStore.add(refresh_jti, user_data.get("user_id"))
     return access_token, refresh_token
 
 def verify_access_token(token: str) -> dict:
@@ -57,38 +159,129 @@ def verify_access_token(token: str) -> dict:
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid access token")
 
-def verify_refresh_token(token: str) -> dict:
+def decode_refresh_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, REFRESH_SECRET_KEY, [ALGORITHM])
         if payload.get("type") != "refresh":
             raise HTTPException(status_code=401, detail="Invalid token type")
-        jti = payload.get("jti")
-        if jti not in active_refresh_tokens:
-            raise HTTPException(status_code=401, detail="Refresh token revoked")
         return payload
     except ExpiredSignatureError:
-        try:
-            jti = jwt.decode(token, REFRESH_SECRET_KEY, [ALGORITHM], options={"verify_exp": False}).get("jti")
-            active_refresh_tokens.discard(jti)
-        except:
-            pass
+        # The store entry expires with the token, nothing to clean up
         raise HTTPException(status_code=401, detail="Refresh token expired")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
 
-def revoke_refresh_token(jti: str):
-    active_refresh_tokens.discard(jti)
+async def reject_reused_token(payload: dict):
+    """401 for a refresh token that is no longer live; if it was exchanged more
+    than REFRESH_REUSE_GRACE seconds ago, someone holds a copy, so every session
+    of the user is revoked."""
+    rotated_at = await RefreshTokenStore.rotated_at(payload["jti"])
+    if rotated_at is not None:
+        if time.time() - rotated_at <= REFRESH_REUSE_GRACE:
+            # Two tabs refreshing with the same cookie; the winner already has the new pair
+            raise HTTPException(status_code=401, detail="Refresh token already rotated")
+        revoked = await RefreshTokenStore.revoke_user(payload["user_id"])
+        logger.warning(f"Refresh token reuse for user {payload.get('sub')}: revoked {revoked} sessions")
+        raise HTTPException(status_code=401, detail="Refresh token reuse detected")
+    raise HTTPException(status_code=401, detail="Refresh token revoked")
+
+async def verify_refresh_token(token: str) -> dict:
+    payload = decode_refresh_token(token)
+    if not await RefreshTokenStore.is_live(payload.get("jti")):
+        await reject_reused_token(payload)
+    return payload
+
+async def rotate_refresh_token(payload: dict):
+    """Retire a verified refresh token before issuing its replacement."""
+    ttl = int(payload["exp"] - datetime.now(timezone.utc).timestamp())
+    if not await RefreshTokenStore.rotate(payload["jti"], payload["user_id"], ttl):
+        # Lost the race to a concurrent refresh with the same token
+        await reject_reused_token(payload)
+
+async def revoke_refresh_token(jti: str, user_id: int = None):
+    await RefreshTokenStore.revoke(jti, user_id)
+
+async def revoke_user_refresh_tokens(user_id: int) -> int:
+    return await RefreshTokenStore.revoke_user(user_id)
+
+class Principal(NamedTuple):
+    """The authenticated user of a request, as carried by the access token.
+    Core functions take it instead of looking the user up again."""
+    user_id: int
+    username: str
+    role: str
+    level: str
+    district_id: Optional[int] = None
+    local_body_id: Optional[str] = None
+    warehouse_id: Optional[str] = None
+    is_admin_session: bool = False
+
+
+def _principal(claims: dict) -> Principal:
+    if "warehouse_id" not in claims:
+        # Tokens issued before local body/warehouse were claims; read them once
+        from core.db import Database
+        from models.users import User
+        with Database.get_session() as session:
+            row = session.query(User.local_body_id, User.warehouse_id).filter(User.id == claims["user_id"]).first()
+        claims = {**claims, "local_body_id": row.local_body_id if row else None, "warehouse_id": row.warehouse_id if row else None}
+    return Principal(
+        user_id=claims["user_id"],
+        username=claims.get("username") or claims.get("sub"),
+        role=claims.get("role"),
+        level=claims.get("level"),
+        district_id=claims.get("district_id"),
+        local_body_id=claims.get("local_body_id"),
+        warehouse_id=claims.get("warehouse_id"),
+        is_admin_session=bool(claims.get("is_admin_session")),
+    )
+
+
+# access token -> (exp, claims, principal). Keyed by the whole token, so only a
+# token that was verified byte for byte skips the signature check.
+_verified_tokens = OrderedDict()
+_verified_lock = threading.Lock()
+
+def _authenticate(request: Request) -> Tuple[dict, Principal]:
+    cached = getattr(request.state, "auth", None)
+    if cached is not None:
+        return cached
 
-def get_current_user(request: Request):
     access_token = request.cookies.get(ACCESS_COOKIE_NAME)
     if not access_token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authentication required"
         )
-    user = verify_access_token(access_token)
-    request.state.user_id = user["user_id"]
-    return user
+
+    entry = None
+    with _verified_lock:
+        entry = _verified_tokens.get(access_token)
+        if entry is not None:
+            if entry[0] > time.time():
+                _verified_tokens.move_to_end(access_token)
+            else:
+                del _verified_tokens[access_token]
+                entry = None
+
+    if entry is None:
+        claims = verify_access_token(access_token)
+        entry = (claims["exp"], claims, _principal(claims))
+        with _verified_lock:
+            _verified_tokens[access_token] = entry
+            while len(_verified_tokens) > PRINCIPAL_CACHE_SIZE:
+                _verified_tokens.popitem(last=False)
+
+    _, claims, principal = entry
+    request.state.user_id = principal.user_id
+    request.state.auth = (dict(claims), principal)
+    return request.state.auth
+
+def get_current_user(request: Request):
+    return _authenticate(request)[0]
+
+def get_principal(request: Request) -> Principal:
+    return _authenticate(request)[1]
 
 def set_auth_cookies(response: Response, access_token: str, refresh_token: str):
     cookie_settings = {
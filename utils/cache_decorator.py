@@ -1,13 +1,83 @@
+import asyncio
 import functools
 import hashlib
 import json
 import inspect
-from typing import get_type_hints
-from fastapi import Request
+import math
+import random
+import time
+from typing import get_type_hints, Iterable, List, Optional
+from fastapi import Request, Response
 from utils.redis import RedisClient
+from utils.local_cache import LocalCache
+
+DISTRICT_PARAMS = ("district_id", "districtid")
+STALE_SUFFIX = ":stale"
+
+# Background refreshes in flight in this worker, keyed by cache key
+_refreshing = {}
+
+def cache_response(
+    expire: int = 3600,
+    key_prefix: str = "",
+    include_user: bool = True,
+    tags: Iterable[str] = (),
+    stale_ttl: int = 0,
+    lock_timeout: float = 10.0,
+    early_expiry_beta: float = 1.0,
+    local_ttl: int = 0
+):
+    """Cache an endpoint's response in Redis.
+
+    Entries are registered under tags scoped to the endpoint family (the key_prefix
+    up to the first underscore, e.g. "comp"): the family itself, the endpoint, the
+    user, the district and the component type where known, and "global" when the
+    entry is not tied to a user or district. Extra `tags` are format strings filled
+    from the endpoint kwargs, e.g. "global" or "warehouse:{warehouse_id}".
+
+    Recomputation is single-flight: on a miss one worker takes a Redis lock and runs
+    the endpoint while the others wait for its result (up to `lock_timeout` seconds).
+    With `stale_ttl` set, an untagged copy of each entry outlives it by `stale_ttl`
+    seconds and is served after expiry or invalidation while a background task
+    refreshes the entry.
+    Entries are refreshed early with a probability that grows as they near expiry
+    (XFetch, scaled by how long they took to compute); `early_expiry_beta=0` disables it.
+    With `local_ttl` set, responses are also kept in this worker's LocalCache for that
+    many seconds, in front of Redis; meant for near-static reference data.
+    """
+    family = key_prefix.split("_", 1)[0] if key_prefix else "cache"
 
-def cache_response(expire: int = 3600, key_prefix: str = "", include_user: bool = True):
     def decorator(func):
+        async def compute_and_store(cache_key, entry_tags, args, kwargs):
+            started = time.perf_counter()
+            result = await func(*args, **kwargs)
+            if isinstance(result, Response):
+                return result  # Files and custom responses are never cached
+            meta = {"computed_at": time.time(), "delta": time.perf_counter() - started}
+            await RedisClient.set_cache(cache_key, result, expire, entry_tags, meta)
+            if stale_ttl:
+                await RedisClient.set_cache(cache_key + STALE_SUFFIX, result, expire + stale_ttl, meta=meta)
+            return result
+
+        async def refresh(cache_key, entry_tags, args, kwargs):
+            token = await RedisClient.acquire_lock(cache_key, int(lock_timeout * 1000))
+            if not token:
+                return  # Someone else is already recomputing this key
+            try:
+                await compute_and_store(cache_key, entry_tags, args, kwargs)
+                RedisClient.record(family, "background_refreshes")
+            except Exception as e:
+                print(f"Error refreshing cache for key {cache_key}: {e}")
+            finally:
+                await RedisClient.release_lock(cache_key, token)
+
+        def schedule_refresh(cache_key, entry_tags, args, kwargs):
+            if cache_key in _refreshing:
+                return
+            task = asyncio.create_task(refresh(cache_key, entry_tags, args, kwargs))
+            _refreshing[cache_key] = task
+            task.add_done_callback(lambda _: _refreshing.pop(cache_key, None))
+
         @functools.wraps(func)
         async def wrapper(*args, **kwargs):
             request = None
@@ -17,34 +87,99 @@ def cache_response(expire: int = 3600, key_prefix: str = "", include_user: bool
                     break
             
             cache_key = _generate_cache_key(func.__name__, request, kwargs, key_prefix, include_user)
-            
-            cached_result = await RedisClient.get_cache(cache_key)
-            if cached_result is not None:
-                # Get the return type from the function signature
-                return_type = _get_return_type(func)
-                
-                if return_type and _is_pydantic_model(return_type):
-                    try:
-                        # Reconstruct Pydantic model from cached data
-                        if hasattr(return_type, 'model_validate'):  # Pydantic v2
-                            return return_type.model_validate(cached_result)
-                        elif hasattr(return_type, 'parse_obj'):  # Pydantic v1
-                            return return_type.parse_obj(cached_result)
-                    except Exception as e:
-                        print(f"Error reconstructing cached model: {e}")
-                        # Fall through to re-execute function
-                
-                # Return cached result as-is if it's not a Pydantic model
+            entry_tags = _generate_cache_tags(family, key_prefix, request, kwargs, include_user, tags)
+
+            if local_ttl:
+                local = LocalCache.get(cache_key)
+                if local is not None:
+                    RedisClient.record(family, "local_hits")
+                    if isinstance(local, Response):
+                        return Response(content=local.body, media_type=local.media_type)
+                    return local
+                result = await lookup(cache_key, entry_tags, args, kwargs)
+                LocalCache.set(cache_key, result, min(local_ttl, expire), entry_tags)
+                return result
+
+            return await lookup(cache_key, entry_tags, args, kwargs)
+
+        async def lookup(cache_key, entry_tags, args, kwargs):
+            cached = await RedisClient.get_entry(cache_key)
+            if cached is not None:
+                RedisClient.record(family, "hits")
+                meta = cached[0]
+                if _should_refresh_early(meta.get("computed_at"), meta.get("delta", 0.0), expire, early_expiry_beta):
+                    RedisClient.record(family, "early_refreshes")
+                    schedule_refresh(cache_key, entry_tags, args, kwargs)
                 print("Fetched from cache:", cache_key)
-                return cached_result
+                return _from_entry(func, cached)
             
-            result = await func(*args, **kwargs)
-            await RedisClient.set_cache(cache_key, result, expire)
-            return result
+            RedisClient.record(family, "misses")
+
+            if stale_ttl:
+                stale = await RedisClient.get_entry(cache_key + STALE_SUFFIX)
+                if stale is not None:
+                    RedisClient.record(family, "stale_hits")
+                    schedule_refresh(cache_key, entry_tags, args, kwargs)
+                    return _from_entry(func, stale)
+
+            token = await RedisClient.acquire_lock(cache_key, int(lock_timeout * 1000))
+            if token:
+                try:
+                    return await compute_and_store(cache_key, entry_tags, args, kwargs)
+                finally:
+                    await RedisClient.release_lock(cache_key, token)
+
+            # Another worker is computing this key, wait for its result
+            RedisClient.record(family, "lock_waits")
+            deadline = time.monotonic() + lock_timeout
+            delay = 0.05
+            while time.monotonic() < deadline:
+                await asyncio.sleep(delay)
+                cached = await RedisClient.get_entry(cache_key)
+                if cached is not None:
+                    return _from_entry(func, cached)
+                delay = min(delay * 2, 0.5)
+
+            # The lock holder is taking too long, compute it ourselves
+            RedisClient.record(family, "lock_timeouts")
+            return await compute_and_store(cache_key, entry_tags, args, kwargs)
                 
         return wrapper
     return decorator
 
+def _from_entry(func, entry):
+    _, body, serializer = entry
+    if serializer.is_json:
+        # The cached body already is the JSON the client gets; send it as-is instead of
+        # decoding it and having FastAPI validate and re-encode it
+        return Response(content=body, media_type="application/json")
+    return _restore(func, serializer.loads(body))
+
+def _should_refresh_early(computed_at, delta: float, expire: int, beta: float) -> bool:
+    if not beta or computed_at is None:
+        return False
+    # XFetch: -delta * beta * ln(U) is usually small and occasionally large, so
+    # refreshes start shortly before expiry and are spread across requests
+    age = time.time() - computed_at
+    return age - delta * beta * math.log(random.random() or 1e-12) >= expire
+
+def _restore(func, cached_result):
+    # Get the return type from the function signature
+    return_type = _get_return_type(func)
+    
+    if return_type and _is_pydantic_model(return_type):
+        try:
+            # Reconstruct Pydantic model from cached data
+            if hasattr(return_type, 'model_validate'):  # Pydantic v2
+                return return_type.model_validate(cached_result)
+            elif hasattr(return_type, 'parse_obj'):  # Pydantic v1
+                return return_type.parse_obj(cached_result)
+        except Exception as e:
+            print(f"Error reconstructing cached model: {e}")
+    
+    # Return cached result as-is if it's not a Pydantic model
+    return cached_result
+
 def _get_return_type(func):
     """Extract return type annotation from function."""
     try:
@@ -88,9 +223,51 @@ def _generate_cache_key(func_name: str, request, kwargs: dict, key_prefix: str,
         query_hash = hashlib.md5(str(sorted(request.query_params.items())).encode()).hexdigest()[:8]
         key_parts.append(f"query:{query_hash}")
     
-    path_params = {k: v for k, v in kwargs.items() if k != 'request'}
+    path_params = {k: v for k, v in kwargs.items() if k not in ('request', 'current_user')}
+    # current_user is the whole token payload and changes on every refresh; only the role
+    # can change the response (role checks inside endpoints), user scoping is handled above
+    if isinstance(kwargs.get('current_user'), dict):
+        path_params['current_user_role'] = kwargs['current_user'].get('role')
     if path_params:
         params_hash = hashlib.md5(json.dumps(path_params, sort_keys=True, default=str).encode()).hexdigest()[:8]
         key_parts.append(f"params:{params_hash}")
     
-    return ":".join(key_parts)
\ No newline at end of file
+    return ":".join(key_parts)
+
+def _generate_cache_tags(family: str, key_prefix: str, request, kwargs: dict, include_user: bool, extra_tags: Iterable[str]) -> List[str]:
+    tags = [family, f"{family}:endpoint:{key_prefix}"]
+    current_user = kwargs.get("current_user") or {}
+
+    user_id = None
+    if include_user and request and hasattr(request.state, 'user_id'):
+        user_id = request.state.user_id
+        tags.append(f"{family}:user:{user_id}")
+
+    district_id = next((kwargs[p] for p in DISTRICT_PARAMS if kwargs.get(p) is not None), None)
+    if district_id is None and user_id is not None:
+        district_id = current_user.get("district_id")
+    if district_id is not None:
+        tags.append(f"{family}:district:{district_id}")
+
+    if kwargs.get("component_type"):
+        tags.append(f"{family}:type:{str(kwargs['component_type']).upper()}")
+
+    if user_id is None and district_id is None:
+        tags.append(f"{family}:global")
+
+    for template in extra_tags:
+        try:
+            tags.append(f"{family}:{template.format(**kwargs)}")
+        except (KeyError, IndexError):
+            continue
+
+    return list(dict.fromkeys(tags))
+
+def invalidation_tags(family: str, user_ids: Iterable[Optional[int]] = (), district_ids: Iterable[Optional[int]] = (), component_types: Iterable[str] = ()) -> List[str]:
+    """Tags a write in `family` should invalidate: aggregate ("global") entries
+    plus the given users, districts and component types."""
+    tags = [f"{family}:global"]
+    tags += [f"{family}:user:{user_id}" for user_id in user_ids if user_id is not None]
+    tags += [f"{family}:district:{district_id}" for district_id in district_ids if district_id is not None]
+    tags += [f"{family}:type:{component_type.upper()}" for component_type in component_types if component_type]
+    return list(dict.fromkeys(tags))
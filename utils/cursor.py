@@ -0,0 +1,88 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cursors are handed to clients, so they are signed to stop forged sort keys/offsets
+_cursor_secret = os.getenv("CURSOR_SECRET_KEY") or os.getenv("SECRET_KEY")
+if not _cursor_secret:
+    # An empty key would make every cursor signature forgeable
+    raise RuntimeError("CURSOR_SECRET_KEY (or SECRET_KEY) must be set to sign pagination cursors")
+CURSOR_SECRET_KEY = _cursor_secret.encode()
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def filter_signature(filters) -> str:
+    """Stable short hash of a filter model (or dict); cursors and cached counts are tied to it."""
+    if filters is None:
+        data = {}
+    elif isinstance(filters, dict):
+        data = dict(filters)
+    elif hasattr(filters, 'model_dump'):  # Pydantic v2
+        data = filters.model_dump()
+    else:  # Pydantic v1
+        data = filters.dict()
+    data = {k: v for k, v in data.items() if v is not None}
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def _sign(payload: dict) -> str:
+    body = _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+    mac = hmac.new(CURSOR_SECRET_KEY, body.encode(), hashlib.sha256).digest()[:12]
+    return f"{body}.{_b64encode(mac)}"
+
+
+def _unsign(cursor: str) -> dict:
+    body, mac = cursor.split(".", 1)
+    expected = hmac.new(CURSOR_SECRET_KEY, body.encode(), hashlib.sha256).digest()[:12]
+    if not hmac.compare_digest(expected, _b64decode(mac)):
+        raise ValueError("bad signature")
+    return json.loads(_b64decode(body))
+
+
+def encode_cursor(key: int, serial: int, signature: str) -> str:
+    """Opaque cursor for the row with sort key `key` at 1-based position `serial`."""
+    return _sign({"k": key, "s": serial, "f": signature})
+
+
+def decode_cursor(cursor: str, signature: str):
+    """Returns (key, serial); 400 if the cursor was tampered with or belongs to other filters."""
+    try:
+        payload = _unsign(cursor)
+        key, serial = int(payload["k"]), int(payload["s"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if payload.get("f") != signature:
+        raise HTTPException(status_code=400, detail="Cursor does not match the current filters")
+    return key, serial
+
+
+def encode_keyset_cursor(key: list, signature: str) -> str:
+    """Opaque cursor for a composite sort key; the values must be JSON serializable."""
+    return _sign({"k": key, "f": signature})
+
+
+def decode_keyset_cursor(cursor: str, signature: str, size: int) -> list:
+    """Returns the sort key values; 400 if the cursor was tampered with or belongs to other filters."""
+    try:
+        payload = _unsign(cursor)
+        key = payload["k"]
+        if not isinstance(key, list) or len(key) != size:
+            raise ValueError("bad key")
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if payload.get("f") != signature:
+        raise HTTPException(status_code=400, detail="Cursor does not match the current filters")
+    return key
@@ -0,0 +1,120 @@
+import asyncio
+import contextvars
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from core.db import Database
+
+
+class DBExecutor:
+    """Runs the synchronous core.* functions off the event loop on a thread pool
+    sized to the database connection pool, with per-lane concurrency caps."""
+
+    _executor = None
+    _lanes = {}
+    _stats = {}
+
+    # Lanes with a cap; anything else only shares the pool. Heavy report/bulk work
+    # is capped so it cannot take every worker from the transactional endpoints.
+    LANE_LIMITS = {
+        "report": int(os.getenv("EXECUTOR_REPORT_LIMIT", 4)),
+        "bulk": int(os.getenv("EXECUTOR_BULK_LIMIT", 6)),
+    }
+
+    @classmethod
+    def initialize(cls, max_workers: int = None):
+        try:
+            # One worker per pooled connection, so a worker never waits on pool checkout
+            workers = max_workers or Database.POOL_SIZE
+            cls._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-worker")
+            cls._lanes = {lane: asyncio.Semaphore(limit) for lane, limit in cls.LANE_LIMITS.items()}
+            cls._stats = {}
+            return True
+        except Exception as e:
+            print(f"Error initializing executor: {e}")
+            return False
+
+    @classmethod
+    def _lane_stats(cls, lane: str):
+        return cls._stats.setdefault(lane, {
+            "queued": 0,
+            "running": 0,
+            "completed": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+        })
+
+    @classmethod
+    async def run(cls, func, *args, lane: str = "default", **kwargs):
+        if cls._executor is None:
+            cls.initialize()
+
+        stats = cls._lane_stats(lane)
+        stats["queued"] += 1
+        submitted = time.perf_counter()
+
+        def _call():
+            # Time spent waiting for a lane slot and a free worker thread
+            wait_ms = (time.perf_counter() - submitted) * 1000
+            stats["queued"] -= 1
+            stats["running"] += 1
+            stats["total_wait_ms"] += wait_ms
+            stats["max_wait_ms"] = max(stats["max_wait_ms"], wait_ms)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats["running"] -= 1
+                stats["completed"] += 1
+
+        # Carry contextvars (request scoped state) into the worker thread
+        call = functools.partial(contextvars.copy_context().run, _call)
+        loop = asyncio.get_running_loop()
+
+        semaphore = cls._lanes.get(lane)
+        if semaphore is None:
+            return await loop.run_in_executor(cls._executor, call)
+        async with semaphore:
+            return await loop.run_in_executor(cls._executor, call)
+
+    @classmethod
+    async def iterate(cls, iterable, lane: str = "default", batch: int = 16):
+        """Drive a blocking iterator (e.g. a generator holding a DB cursor) from async code,
+        pulling `batch` items per hop to the pool so the event loop never blocks on it."""
+        it = iter(iterable)
+        try:
+            while True:
+                items = await cls.run(lambda: list(islice(it, batch)), lane=lane)
+                if not items:
+                    break
+                for item in items:
+                    yield item
+        finally:
+            # Runs on client disconnect too; closing the generator releases its session
+            close = getattr(it, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except ValueError:
+                    pass  # Still running in a worker after a cancel; it is closed when collected
+
+    @classmethod
+    def stats(cls):
+        result = {}
+        for lane, stats in cls._stats.items():
+            result[lane] = {
+                "queued": stats["queued"],
+                "running": stats["running"],
+                "completed": stats["completed"],
+                "avg_wait_ms": round(stats["total_wait_ms"] / stats["completed"], 2) if stats["completed"] else 0.0,
+                "max_wait_ms": round(stats["max_wait_ms"], 2),
+                "limit": cls.LANE_LIMITS.get(lane),
+            }
+        return result
+
+    @classmethod
+    def shutdown(cls):
+        if cls._executor:
+            cls._executor.shutdown(wait=True)
+            cls._executor = None
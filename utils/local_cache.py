@@ -0,0 +1,121 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable
+from utils.redis import RedisClient
+
+
+class LocalCache:
+    """Per-worker LRU/TTL tier in front of Redis for near-static reference data.
+
+    Values are kept as the endpoint returned them, so a hit skips the Redis
+    round-trip, JSON decode and model validation. Tag invalidations published by
+    RedisClient.invalidate_tags reach every worker over pub/sub.
+    Safe to use from DBExecutor threads as well as the event loop.
+    """
+
+    _entries = OrderedDict()   # key -> (expires_at, value, tags)
+    _tag_index = {}            # tag -> set of keys
+    _listener = None
+    _lock = threading.RLock()
+
+    MAX_ENTRIES = 2048
+    CHANNEL = RedisClient.INVALIDATION_CHANNEL
+
+    @classmethod
+    def get(cls, key: str):
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value, _ = entry
+            if expires_at < time.monotonic():
+                cls._drop(key)
+                return None
+            cls._entries.move_to_end(key)
+            return value
+
+    @classmethod
+    def set(cls, key: str, value: Any, ttl: int, tags: Iterable[str] = ()):
+        tags = tuple(tags)
+        with cls._lock:
+            cls._drop(key)
+            cls._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                cls._tag_index.setdefault(tag, set()).add(key)
+            while len(cls._entries) > cls.MAX_ENTRIES:
+                cls._drop(next(iter(cls._entries)))
+
+    @classmethod
+    def _drop(cls, key: str):
+        entry = cls._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = cls._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del cls._tag_index[tag]
+
+    @classmethod
+    def invalidate_tags(cls, tags: Iterable[str]) -> int:
+        with cls._lock:
+            keys = set()
+            for tag in tags:
+                keys |= cls._tag_index.get(tag, set())
+            for key in keys:
+                cls._drop(key)
+            return len(keys)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+            cls._tag_index.clear()
+
+    @classmethod
+    async def start(cls) -> bool:
+        client = RedisClient.get_client()
+        if not client:
+            return False
+        try:
+            pubsub = client.pubsub()
+            await pubsub.subscribe(cls.CHANNEL)
+            cls._listener = asyncio.create_task(cls._listen(pubsub))
+            return True
+        except Exception as e:
+            print(f"Error subscribing to cache invalidations: {e}")
+            return False
+
+    @classmethod
+    async def _listen(cls, pubsub):
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    cls.invalidate_tags(json.loads(message["data"]))
+                except (ValueError, TypeError) as e:
+                    print(f"Ignoring malformed cache invalidation: {e}")
+        except asyncio.CancelledError:
+            pass
+        finally:
+            try:
+                await pubsub.unsubscribe(cls.CHANNEL)
+                await pubsub.close()
+            except Exception:
+                pass
+
+    @classmethod
+    async def stop(cls):
+        if cls._listener:
+            cls._listener.cancel()
+            try:
+                await cls._listener
+            except asyncio.CancelledError:
+                pass
+            cls._listener = None
+        cls.clear()
@@ -0,0 +1,42 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+
+class PasswordHasher:
+    """Runs bcrypt off the event loop on its own thread pool.
+
+    bcrypt releases the GIL while hashing, so threads use every core without
+    the pickling cost of a process pool. The semaphore bounds how many checks
+    are in flight, so a login burst queues here instead of holding DB workers.
+    """
+
+    _executor = None
+    _slots = None
+
+    CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", os.cpu_count() or 2))
+
+    @classmethod
+    def initialize(cls, workers: int = None):
+        workers = workers or cls.CONCURRENCY
+        cls._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        cls._slots = asyncio.Semaphore(workers)
+        return True
+
+    @classmethod
+    async def verify(cls, password: str, password_hash: str) -> bool:
+        if cls._executor is None:
+            cls.initialize()
+        loop = asyncio.get_running_loop()
+        async with cls._slots:
+            return await loop.run_in_executor(
+                cls._executor, bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8')
+            )
+
+    @classmethod
+    def shutdown(cls):
+        if cls._executor:
+            cls._executor.shutdown(wait=True)
+            cls._executor = None
+            cls._slots = None
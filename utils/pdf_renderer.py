@@ -0,0 +1,308 @@
+import asyncio
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import date
+from typing import Awaitable, Callable, Iterable, NamedTuple, Optional
+from fastapi import HTTPException, Response
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
+from annexure.resources import TEMPLATE_VERSION
+from utils.delete_file import remove_file
+from utils.redis import RedisClient
+
+# Documents above this size are handed over through the spool directory instead of in memory
+SPOOL_DIR = os.getenv("PDF_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "evm_pdf_spool"))
+SPOOL_THRESHOLD = int(os.getenv("PDF_SPOOL_THRESHOLD", 8 * 1024 * 1024))
+# Spooled files older than this are orphans (request failed before the response was sent)
+SPOOL_TTL = int(os.getenv("PDF_SPOOL_TTL", 900))
+# Content-addressed store of generated documents, see PDFRenderer.render(cache=True)
+CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "evm_pdf_cache"))
+CACHE_TTL = int(os.getenv("PDF_CACHE_TTL", 2 * 86400))
+
+
+class RenderedPDF(NamedTuple):
+    filename: str
+    content: Optional[bytes] = None  # in-memory result
+    path: Optional[str] = None       # spooled result, removed once the response is sent
+    digest: Optional[str] = None     # set for cached results; path is then the cache file and is kept
+
+
+def _name(builder) -> str:
+    return getattr(getattr(builder, "func", builder), "__name__", "pdf")
+
+
+def _plain(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _digest(builder, args, kwargs) -> str:
+    """Key a document by its builder, template version, render date and input data."""
+    payload = json.dumps(
+        [_name(builder), TEMPLATE_VERSION, date.today().isoformat(), args, kwargs],
+        sort_keys=True,
+        default=_plain
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _render_job(builder, args, kwargs, timeout):
+    """Runs in a worker process: build the PDF into memory, spilling large ones to the spool dir."""
+    use_alarm = timeout and hasattr(signal, "SIGALRM")
+    if use_alarm:
+        def _expired(signum, frame):
+            raise TimeoutError(f"{_name(builder)} exceeded {timeout}s")
+        signal.signal(signal.SIGALRM, _expired)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    buffer = io.BytesIO()
+    try:
+        filename = os.path.basename(builder(*args, output=buffer, **kwargs))
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    if buffer.tell() <= SPOOL_THRESHOLD:
+        return RenderedPDF(filename, content=buffer.getvalue())
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    path = os.path.join(SPOOL_DIR, f"{uuid.uuid4().hex}.pdf")
+    with open(path, "wb") as f:
+        f.write(buffer.getbuffer())
+    return RenderedPDF(filename, path=path)
+
+
+class PDFRenderer:
+    """Runs the annexure/* reportlab builders in a process pool, so PDF CPU work
+    scales across cores instead of holding API and DB worker threads.
+
+    Builders (or functools.partial jobs wrapping them) are called with plain DTOs
+    (pydantic models, dicts, lists) plus an `output` buffer to render into, and
+    return the document's file name; callers get a RenderedPDF back.
+    """
+
+    _pool = None
+    _slots = None
+    _sweeper = None
+
+    MAX_WORKERS = int(os.getenv("PDF_WORKERS", os.cpu_count() or 2))
+    # Jobs running plus queued; beyond this callers get a 503 instead of piling up
+    MAX_PENDING = int(os.getenv("PDF_MAX_PENDING", MAX_WORKERS * 4))
+    TIMEOUT = float(os.getenv("PDF_TIMEOUT", 60))
+
+    @classmethod
+    def initialize(cls, max_workers: int = None):
+        try:
+            # spawn: workers must not inherit DB/Redis connections from the API process
+            cls._pool = ProcessPoolExecutor(
+                max_workers=max_workers or cls.MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            cls._slots = threading.BoundedSemaphore(cls.MAX_PENDING)
+            return True
+        except Exception as e:
+            print(f"Error initializing PDF renderer: {e}")
+            return False
+
+    @classmethod
+    def _submit(cls, builder, args, kwargs, timeout):
+        if cls._pool is None:
+            cls.initialize()
+        if not cls._slots.acquire(blocking=False):
+            raise HTTPException(status_code=503, detail="PDF renderer is busy, please retry")
+        try:
+            future = cls._pool.submit(_render_job, builder, args, kwargs, timeout)
+        except Exception:
+            cls._slots.release()
+            raise
+        future.add_done_callback(lambda _: cls._slots.release())
+        return future
+
+    @classmethod
+    def render(cls, builder, *args, timeout: float = None, cache: bool = False, **kwargs):
+        """Blocking render for sync code (core.* functions running on DBExecutor).
+
+        With cache=True the document is looked up by a digest of its inputs first and
+        stored after rendering, so an unchanged dataset is rendered once per day.
+        """
+        digest = _digest(builder, args, kwargs) if cache else None
+        if digest:
+            cached = cls.cached(digest)
+            if cached:
+                RedisClient.record("pdf", "render_cache_hits")
+                return cached
+            RedisClient.record("pdf", "render_cache_misses")
+
+        timeout = timeout or cls.TIMEOUT
+        future = cls._submit(builder, args, kwargs, timeout)
+        try:
+            # The worker enforces the timeout itself; the wait here leaves a margin for queueing
+            pdf = future.result(timeout=timeout * 2)
+        except (TimeoutError, FutureTimeoutError):
+            raise HTTPException(status_code=504, detail=f"PDF generation timed out ({_name(builder)})")
+        return cls._store(digest, pdf) if digest else pdf
+
+    @classmethod
+    def cached(cls, digest: str) -> Optional[RenderedPDF]:
+        directory = os.path.join(CACHE_DIR, digest)
+        try:
+            names = [name for name in os.listdir(directory) if not name.startswith(".")]
+        except FileNotFoundError:
+            return None
+        if not names:
+            return None
+        os.utime(directory)  # keep documents that are still being served out of the sweep
+        return RenderedPDF(names[0], path=os.path.join(directory, names[0]), digest=digest)
+
+    @classmethod
+    def _store(cls, digest: str, pdf: RenderedPDF) -> RenderedPDF:
+        directory = os.path.join(CACHE_DIR, digest)
+        os.makedirs(directory, exist_ok=True)
+        # Write under a hidden name and rename, so readers never see a partial file
+        staging = os.path.join(directory, f".{uuid.uuid4().hex}")
+        try:
+            if pdf.path:
+                shutil.move(pdf.path, staging)
+            else:
+                with open(staging, "wb") as f:
+                    f.write(pdf.content)
+            path = os.path.join(directory, pdf.filename)
+            os.replace(staging, path)
+        except OSError as e:
+            print(f"Error caching PDF {pdf.filename}: {e}")
+            if pdf.path and os.path.exists(staging):
+                shutil.move(staging, pdf.path)  # hand the spooled file back uncached
+            else:
+                remove_file(staging)
+            return pdf
+        return RenderedPDF(pdf.filename, path=path, digest=digest)
+
+    @classmethod
+    async def render_async(cls, builder, *args, timeout: float = None, **kwargs):
+        timeout = timeout or cls.TIMEOUT
+        future = asyncio.wrap_future(cls._submit(builder, args, kwargs, timeout))
+        try:
+            return await asyncio.wait_for(future, timeout * 2)
+        except (TimeoutError, asyncio.TimeoutError):
+            raise HTTPException(status_code=504, detail=f"PDF generation timed out ({_name(builder)})")
+
+    @classmethod
+    def sweep_spool(cls, max_age: int = SPOOL_TTL) -> int:
+        """Delete spooled PDFs older than max_age seconds; returns how many were removed."""
+        removed = 0
+        cutoff = time.time() - max_age
+        try:
+            entries = list(os.scandir(SPOOL_DIR))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    @classmethod
+    def sweep_cache(cls, max_age: int = CACHE_TTL) -> int:
+        """Delete cached documents not served for max_age seconds; returns how many were removed."""
+        removed = 0
+        cutoff = time.time() - max_age
+        try:
+            entries = list(os.scandir(CACHE_DIR))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            try:
+                if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    @classmethod
+    async def _sweep_loop(cls, interval: int):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                removed = await asyncio.to_thread(cls.sweep_spool)
+                if removed:
+                    print(f"[CLEANUP] Swept {removed} orphaned spooled PDFs")
+                removed = await asyncio.to_thread(cls.sweep_cache)
+                if removed:
+                    print(f"[CLEANUP] Swept {removed} expired cached PDFs")
+            except Exception as e:
+                print(f"Error sweeping PDF spool: {e}")
+
+    @classmethod
+    def start_sweeper(cls, interval: int = 300):
+        cls.sweep_spool()
+        cls._sweeper = asyncio.create_task(cls._sweep_loop(interval))
+
+    @classmethod
+    def shutdown(cls):
+        if cls._sweeper:
+            cls._sweeper.cancel()
+            cls._sweeper = None
+        if cls._pool:
+            cls._pool.shutdown(wait=True, cancel_futures=True)
+            cls._pool = None
+
+
+def pdf_response(pdf: RenderedPDF, filename: str = None) -> Response:
+    filename = filename or pdf.filename
+    if pdf.digest:
+        return FileResponse(pdf.path, media_type="application/pdf", filename=filename)
+    if pdf.path:
+        return FileResponse(
+            pdf.path,
+            media_type="application/pdf",
+            filename=filename,
+            background=BackgroundTask(remove_file, pdf.path)
+        )
+    return Response(
+        content=pdf.content,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+async def cached_pdf_response(
+    key: str,
+    tags: Iterable[str],
+    produce: Callable[[], Awaitable[RenderedPDF]],
+    expire: int = 3600
+) -> Response:
+    """Serve a report straight from the PDF cache while its data is unchanged.
+
+    `produce` queries and renders the report (with cache=True). The digest of the
+    result is remembered under `key` for an hour and registered under `tags`, so
+    the FLC and allotment writes that invalidate those tags (after they commit)
+    force the next request to re-query; the render itself is still skipped if the
+    data came out the same.
+    """
+    index_key = f"pdf_index:{key}:{date.today().isoformat()}"
+    entry = await RedisClient.get_cache(index_key)
+    if entry:
+        pdf = PDFRenderer.cached(entry["digest"])
+        if pdf:
+            RedisClient.record("pdf", "index_hits")
+            return pdf_response(pdf)
+    RedisClient.record("pdf", "index_misses")
+    pdf = await produce()
+    if pdf.digest:
+        await RedisClient.set_cache(index_key, {"digest": pdf.digest}, expire, tags)
+    return pdf_response(pdf)
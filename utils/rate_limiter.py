@@ -1,7 +1,171 @@
-from slowapi import Limiter
-from fastapi import Request
+import functools
+import inspect
+import math
+import os
+import re
+from fastapi import Request, HTTPException
+from starlette.concurrency import run_in_threadpool
+from utils.redis import RedisClient
+
+WINDOWS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Sliding window counter per key: a hash with the current window index (w), its
+# count (c) and the previous window's count (p). Usage is p weighted by how much
+# of the previous window still overlaps the sliding one, plus c. Every limit is
+# checked before any is charged, so a denied request costs nothing.
+# KEYS: one per limit. ARGV: limit, window seconds, cost for each key in turn.
+# Returns {allowed, retry_after, then used, reset for each key} as strings.
+SLIDING_WINDOW_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local allowed = 1
+local retry_after = 0
+local state = {}
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[i * 3 - 2])
+    local window = tonumber(ARGV[i * 3 - 1])
+    local cost = tonumber(ARGV[i * 3])
+    local index = math.floor(now / window)
+    local saved = redis.call('HMGET', key, 'w', 'c', 'p')
+    local current = tonumber(saved[2]) or 0
+    local previous = tonumber(saved[3]) or 0
+    if tonumber(saved[1]) ~= index then
+        if tonumber(saved[1]) == index - 1 then previous = current else previous = 0 end
+        current = 0
+    end
+    local elapsed = now / window - index
+    local used = previous * (1 - elapsed) + current
+    if used + cost > limit then
+        allowed = 0
+        local wait = (1 - elapsed) * window
+        if previous > 0 and current + cost <= limit then
+            wait = (used + cost - limit) / previous * window
+        end
+        retry_after = math.max(retry_after, wait)
+    end
+    state[i] = {index, current, previous, used, (index + 1) * window - now}
+end
+local result = {tostring(allowed), tostring(retry_after)}
+for i, key in ipairs(KEYS) do
+    local window = tonumber(ARGV[i * 3 - 1])
+    local cost = tonumber(ARGV[i * 3])
+    local s = state[i]
+    local used = s[4]
+    if allowed == 1 then
+        redis.call('HSET', key, 'w', s[1], 'c', s[2] + cost, 'p', s[3])
+        redis.call('EXPIRE', key, window * 2)
+        used = used + cost
+    end
+    table.insert(result, tostring(used))
+    table.insert(result, tostring(s[5]))
+end
+return result
+"""
+
+
+def parse_limit(limit_value: str):
+    """"30/minute" -> (30, 60)"""
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(second|minute|hour|day)\s*", limit_value)
+    if not match:
+        raise ValueError(f"Invalid rate limit: {limit_value}")
+    return int(match.group(1)), WINDOWS[match.group(2)]
+
 
 def user_key_func(request: Request):
     return str(getattr(request.state, "user_id", request.client.host))
 
-limiter = Limiter(key_func=user_key_func)
+
+class RateLimiter:
+    """Sliding window rate limits kept in Redis, so every worker enforces the same counts.
+
+    Each @limiter.limit("30/minute", cost=...) endpoint has its own request limit
+    per user. Every request is also charged `cost` units against the user's
+    shared budget (RATE_LIMIT_BUDGET), so heavy endpoints such as PDFs and MSR
+    pages use it up faster than lookups. Usage is left on request.state for
+    rate_limit_headers to report on the response.
+    """
+
+    PREFIX = "ratelimit:"
+
+    def __init__(self, key_func, budget: str = None):
+        self.key_func = key_func
+        self.budget = parse_limit(budget or os.getenv("RATE_LIMIT_BUDGET", "600/minute"))
+        self._script = None
+
+    def _get_script(self):
+        client = RedisClient.get_client()
+        if client is None:
+            return None
+        if self._script is None or self._script.registered_client is not client:
+            # Runs by EVALSHA, reloading the script if Redis lost it
+            self._script = client.register_script(SLIDING_WINDOW_SCRIPT)
+        return self._script
+
+    async def hit(self, request: Request, scope: str, limit: int, window: int, cost: int = 1):
+        script = self._get_script()
+        if script is None:
+            return
+        identity = self.key_func(request)
+        budget, budget_window = self.budget
+        try:
+            result = await script(
+                keys=[f"{self.PREFIX}{scope}:{identity}", f"{self.PREFIX}budget:{identity}"],
+                args=[limit, window, 1, budget, budget_window, cost]
+            )
+        except Exception as e:
+            # Fail open: a Redis hiccup should not take the API down with it
+            print(f"Rate limiter unavailable: {e}")
+            return
+
+        allowed, retry_after = result[0] == "1", float(result[1])
+        used, reset = float(result[2]), float(result[3])
+        budget_used = float(result[4])
+        headers = {
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": str(max(0, math.floor(limit - used))),
+            "X-RateLimit-Reset": str(math.ceil(reset)),
+            "X-RateLimit-Cost": str(cost),
+            "X-RateLimit-Budget-Limit": str(budget),
+            "X-RateLimit-Budget-Remaining": str(max(0, math.floor(budget - budget_used))),
+        }
+        request.state.rate_limit_headers = headers
+        if not allowed:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit exceeded: {limit} per {window} seconds, {budget} units per {budget_window} seconds",
+                headers={**headers, "Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+
+    def limit(self, limit_value: str, cost: int = 1):
+        limit, window = parse_limit(limit_value)
+
+        def decorator(func):
+            scope = f"{func.__module__}.{func.__name__}"
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                request = kwargs.get("request")
+                if request is None:
+                    request = next((arg for arg in args if isinstance(arg, Request)), None)
+                if request is None:
+                    raise RuntimeError(f"{scope} needs a 'request: Request' parameter to be rate limited")
+                await self.hit(request, scope, limit, window, cost)
+                if inspect.iscoroutinefunction(func):
+                    return await func(*args, **kwargs)
+                return await run_in_threadpool(func, *args, **kwargs)
+
+            return wrapper
+        return decorator
+
+
+async def rate_limit_headers(request: Request, call_next):
+    """HTTP middleware copying the usage of a rate limited endpoint onto its response."""
+    response = await call_next(request)
+    headers = getattr(request.state, "rate_limit_headers", None)
+    if headers:
+        for name, value in headers.items():
+            response.headers.setdefault(name, value)
+    return response
+
+
+limiter = RateLimiter(key_func=user_key_func)
@@ -1,7 +1,10 @@
 import redis.asyncio as redis
 import json
 import os
-from typing import Any
+import uuid
+from typing import Any, Iterable
+from collections import defaultdict
+from utils.serializers import CacheCodec
 
 redis_host = os.getenv("REDIS_HOST")
 redis_port = int(os.getenv("REDIS_PORT"))
@@ -9,6 +12,14 @@ redis_password = os.getenv("REDIS_PASSWORD")
 
 class RedisClient:
     _client = None
+    _binary_client = None  # Cache payloads are binary frames, see utils.serializers
+    codec = CacheCodec.from_env()
+    _stats = defaultdict(lambda: defaultdict(int))
+
+    TAG_PREFIX = "tag:"
+    LOCK_PREFIX = "lock:"
+    INVALIDATION_CHANNEL = "cache:invalidate"
+    TAG_TTL = 86400  # Tag sets outlive the longest cache entry they index
 
     @classmethod
     async def initialize(cls) -> bool:
@@ -19,6 +30,12 @@ class RedisClient:
                 password=redis_password,
                 decode_responses=True
             )
+            cls._binary_client = redis.Redis(
+                host=redis_host,
+                port=redis_port,
+                password=redis_password,
+                decode_responses=False
+            )
             
             await cls._client.ping()
             return True
@@ -30,54 +47,71 @@ class RedisClient:
     def get_client(cls):
         return cls._client
 
+    @classmethod
+    def get_binary_client(cls):
+        return cls._binary_client
+
     @classmethod
     async def close(cls):
-        if cls._client:
-            try:
-                await cls._client.close()  # closes high-level client
-                await cls._client.connection_pool.disconnect()  # closes all connections
-            except Exception as e:
-                print(f"Error while closing Redis: {e}")
-            finally:
-                cls._client = None
+        for client in (cls._client, cls._binary_client):
+            if client:
+                try:
+                    await client.close()  # closes high-level client
+                    await client.connection_pool.disconnect()  # closes all connections
+                except Exception as e:
+                    print(f"Error while closing Redis: {e}")
+        cls._client = None
+        cls._binary_client = None
 
     @classmethod
-    def _serialize_value(cls, value: Any) -> str:
-        """Serialize value to JSON, handling Pydantic models properly."""
+    def _serializable(cls, value: Any) -> Any:
+        """Convert Pydantic models to plain data, leave everything else as is."""
         if hasattr(value, 'model_dump'):  # Pydantic v2
-            serializable_value = value.model_dump()
+            return value.model_dump()
         elif hasattr(value, 'dict'):  # Pydantic v1
-            serializable_value = value.dict()
-        else:
-            serializable_value = value
-            
-        return json.dumps(serializable_value, default=str)
+            return value.dict()
+        return value
 
     @classmethod
-    async def set_cache(cls, key: str, value: Any, expire: int = 3600) -> bool:
-        if not cls._client:
+    async def set_cache(cls, key: str, value: Any, expire: int = 3600, tags: Iterable[str] = (), meta: dict = None) -> bool:
+        if not cls._binary_client:
             return False
         try:
-            serialized_value = cls._serialize_value(value)
-            await cls._client.setex(key, expire, serialized_value)
+            serialized_value = cls.codec.pack(cls._serializable(value), meta)
+            async with cls._binary_client.pipeline(transaction=False) as pipe:
+                pipe.setex(key, expire, serialized_value)
+                for tag in tags:
+                    # Each tag is a set of the cache keys registered under it
+                    pipe.sadd(cls.TAG_PREFIX + tag, key)
+                    pipe.expire(cls.TAG_PREFIX + tag, max(expire, cls.TAG_TTL))
+                await pipe.execute()
             return True
         except Exception as e:
             print(f"Error setting cache for key {key}: {e}")
             return False
 
     @classmethod
-    async def get_cache(cls, key: str):
-        if not cls._client:
+    async def get_entry(cls, key: str):
+        """Returns (metadata, encoded body, serializer) without decoding the body, or None."""
+        if not cls._binary_client:
             return None
         try:
-            cached_value = await cls._client.get(key)
+            cached_value = await cls._binary_client.get(key)
             if cached_value is None:
                 return None
-            return json.loads(cached_value)
+            return cls.codec.unpack(cached_value)
         except Exception as e:
             print(f"Error getting cache for key {key}: {e}")
             return None
 
+    @classmethod
+    async def get_cache(cls, key: str):
+        entry = await cls.get_entry(key)
+        if entry is None:
+            return None
+        _, body, serializer = entry
+        return serializer.loads(body)
+
     @classmethod
     async def delete_cache(cls, key: str) -> bool:
         if not cls._client:
@@ -89,13 +123,86 @@ class RedisClient:
             return False
 
     @classmethod
-    async def delete_pattern(cls, pattern: str) -> int:
+    async def acquire_lock(cls, name: str, ttl_ms: int = 10000):
+        """Try to take a short-lived lock; returns a token to release it with, or None."""
         if not cls._client:
+            return None
+        try:
+            token = uuid.uuid4().hex
+            if await cls._client.set(cls.LOCK_PREFIX + name, token, nx=True, px=ttl_ms):
+                return token
+            return None
+        except Exception as e:
+            print(f"Error acquiring lock {name}: {e}")
+            return None
+
+    @classmethod
+    async def release_lock(cls, name: str, token: str) -> bool:
+        if not cls._client or not token:
+            return False
+        try:
+            # Only delete the lock if we still own it
+            released = await cls._client.eval(
+                "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end",
+                1, cls.LOCK_PREFIX + name, token
+            )
+            return bool(released)
+        except Exception as e:
+            print(f"Error releasing lock {name}: {e}")
+            return False
+
+    @classmethod
+    async def invalidate_tags(cls, *tags: str) -> int:
+        """Delete every cache entry registered under any of the given tags."""
+        if not cls._client or not tags:
             return 0
         try:
-            keys = await cls._client.keys(pattern)
+            tag_keys = [cls.TAG_PREFIX + tag for tag in tags]
+            async with cls._client.pipeline(transaction=False) as pipe:
+                for tag_key in tag_keys:
+                    pipe.smembers(tag_key)
+                members = await pipe.execute()
+
+            keys = set().union(*members)
+            deleted = 0
             if keys:
-                return await cls._client.delete(*keys)
+                deleted = await cls._client.unlink(*keys)
+            await cls._client.unlink(*tag_keys)
+
+            # Then drop the in-process tier on every worker, so none refill it from Redis
+            await cls._client.publish(cls.INVALIDATION_CHANNEL, json.dumps(list(tags)))
+
+            for tag in tags:
+                cls.record(tag.split(":", 1)[0], "invalidations")
+            cls.record(tags[0].split(":", 1)[0], "invalidated_keys", deleted)
+            return deleted
+        except Exception as e:
+            print(f"Error invalidating tags {tags}: {e}")
             return 0
+
+    @classmethod
+    async def delete_pattern(cls, pattern: str) -> int:
+        if not cls._client:
+            return 0
+        try:
+            # SCAN walks the keyspace incrementally instead of blocking Redis like KEYS
+            deleted = 0
+            batch = []
+            async for key in cls._client.scan_iter(match=pattern, count=500):
+                batch.append(key)
+                if len(batch) >= 500:
+                    deleted += await cls._client.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += await cls._client.unlink(*batch)
+            return deleted
         except Exception:
-            return 0
\ No newline at end of file
+            return 0
+
+    @classmethod
+    def record(cls, family: str, event: str, count: int = 1):
+        cls._stats[family][event] += count
+
+    @classmethod
+    def cache_stats(cls):
+        return {family: dict(events) for family, events in cls._stats.items()}
\ No newline at end of file
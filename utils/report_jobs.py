@@ -0,0 +1,386 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from fastapi import HTTPException
+from utils.delete_file import remove_file
+from utils.executor import DBExecutor
+from utils.redis import RedisClient
+
+FINAL_STATUSES = ("done", "failed")
+
+
+def _describe(error: Exception) -> str:
+    return str(error.detail) if isinstance(error, HTTPException) else str(error)
+
+
+def _permanent(error: Exception) -> bool:
+    """Errors a retry cannot fix (missing district, no records, bad date)."""
+    if isinstance(error, HTTPException):
+        return error.status_code < 500
+    return isinstance(error, ValueError)
+
+
+def _read(pdf) -> bytes:
+    if pdf.content is not None:
+        return pdf.content
+    try:
+        with open(pdf.path, "rb") as f:
+            return f.read()
+    finally:
+        if not pdf.digest:  # cache files stay, spooled ones are ours to remove
+            remove_file(pdf.path)
+
+
+def _sse(job: dict) -> str:
+    return f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+
+
+class ReportJobs:
+    """Redis-backed job queue for the long-running district/state report PDFs.
+
+    Submitting returns a job id at once. Worker tasks in each API process pop
+    jobs, run the report on the DBExecutor "report" lane and keep the PDF in
+    Redis for RESULT_TTL seconds. Failed attempts are retried with backoff
+    through a delayed set. Every status change is published on a per-job
+    channel for SSE listeners. Identical submissions (same report, same
+    parameters) share one job while it is queued or running; once it finishes
+    the next submission runs afresh, so it sees any data written since.
+
+    A worker moves the job id into its own processing list rather than popping
+    it, and its process keeps a heartbeat key alive. If the process dies mid-job
+    the heartbeat lapses and another worker puts the job back on the queue.
+    """
+
+    _handlers = {}   # kind -> (callable returning a RenderedPDF, required params)
+    _workers = []
+    _heartbeat = None
+    _process_id = None
+    _worker_ids = []
+
+    PREFIX = "report:"
+    QUEUE = "report:queue"
+    DELAYED = "report:delayed"  # zset of job ids waiting for a retry, scored by due time
+    WORKER_SET = "report:workers"  # ids of workers that may hold a processing list
+
+    WORKERS = int(os.getenv("REPORT_JOB_WORKERS", 2))
+    MAX_ATTEMPTS = int(os.getenv("REPORT_JOB_ATTEMPTS", 3))
+    RETRY_DELAY = int(os.getenv("REPORT_JOB_RETRY_DELAY", 5))  # doubled per attempt
+    RESULT_TTL = int(os.getenv("REPORT_JOB_RESULT_TTL", 3600))
+    JOB_TTL = int(os.getenv("REPORT_JOB_TTL", 86400))  # pending jobs and failed job records
+    POLL_TIMEOUT = 5
+    LEASE = int(os.getenv("REPORT_JOB_LEASE", 60))  # seconds a worker's heartbeat stays valid
+
+    @classmethod
+    def _job_key(cls, job_id: str) -> str:
+        return f"{cls.PREFIX}job:{job_id}"
+
+    @classmethod
+    def _result_key(cls, job_id: str) -> str:
+        return f"{cls.PREFIX}result:{job_id}"
+
+    @classmethod
+    def _channel(cls, job_id: str) -> str:
+        return f"{cls.PREFIX}events:{job_id}"
+
+    @classmethod
+    def _processing_key(cls, worker_id: str) -> str:
+        return f"{cls.PREFIX}processing:{worker_id}"
+
+    @classmethod
+    def _heartbeat_key(cls, process_id: str) -> str:
+        return f"{cls.PREFIX}heartbeat:{process_id}"
+
+    @staticmethod
+    def _public(job: dict) -> dict:
+        return {
+            "job_id": job["id"],
+            "kind": job["kind"],
+            "status": job["status"],
+            "attempts": int(job.get("attempts") or 0),
+            "error": job.get("error") or None,
+            "filename": job.get("filename") or None,
+            "created_at": float(job["created_at"]),
+            "finished_at": float(job["finished_at"]) if job.get("finished_at") else None,
+        }
+
+    @classmethod
+    async def submit(cls, kind: str, params: dict, user_id=None) -> dict:
+        if kind not in cls._handlers:
+            raise HTTPException(status_code=404, detail=f"Unknown report: {kind}")
+        client = RedisClient.get_client()
+        if not client:
+            raise HTTPException(status_code=503, detail="Report queue is unavailable")
+
+        _, required = cls._handlers[kind]
+        missing = [name for name in required if params.get(name) is None]
+        if missing:
+            raise HTTPException(status_code=422, detail=f"Missing parameters for {kind}: {', '.join(missing)}")
+        params = {name: params[name] for name in required}
+
+        fingerprint = hashlib.sha256(json.dumps([kind, params], sort_keys=True, default=str).encode()).hexdigest()
+        dedup_key = f"{cls.PREFIX}dedup:{fingerprint}"
+        job_id = uuid.uuid4().hex
+
+        if not await client.set(dedup_key, job_id, nx=True, ex=cls.JOB_TTL):
+            existing_id = await client.get(dedup_key)
+            existing = await cls.status(existing_id) if existing_id else None
+            if existing and existing["status"] not in FINAL_STATUSES:
+                return existing
+            # The job it pointed at finished or expired; this submission replaces it
+            await client.set(dedup_key, job_id, ex=cls.JOB_TTL)
+
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "params": json.dumps(params, default=str),
+            "status": "queued",
+            "attempts": 0,
+            "error": "",
+            "filename": "",
+            "dedup": dedup_key,
+            "created_by": user_id or "",
+            "created_at": time.time(),
+            "finished_at": "",
+        }
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.hset(cls._job_key(job_id), mapping=job)
+            pipe.expire(cls._job_key(job_id), cls.JOB_TTL)
+            pipe.rpush(cls.QUEUE, job_id)
+            await pipe.execute()
+        return cls._public(job)
+
+    @classmethod
+    async def status(cls, job_id: str):
+        client = RedisClient.get_client()
+        job = await client.hgetall(cls._job_key(job_id))
+        return cls._public(job) if job else None
+
+    @classmethod
+    async def result(cls, job_id: str):
+        """Return (filename, content) for a finished job."""
+        job = await cls.status(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Report job not found or expired")
+        if job["status"] == "failed":
+            raise HTTPException(status_code=409, detail=f"Report job failed: {job['error']}")
+        if job["status"] != "done":
+            raise HTTPException(status_code=409, detail=f"Report job is {job['status']}")
+        content = await RedisClient.get_binary_client().get(cls._result_key(job_id))
+        if content is None:
+            raise HTTPException(status_code=410, detail="Report result has expired")
+        return job["filename"], content
+
+    @classmethod
+    async def events(cls, job_id: str, timeout: int = 900, keepalive: int = 15):
+        """SSE stream of status changes, ending with the done/failed event."""
+        client = RedisClient.get_client()
+        pubsub = client.pubsub()
+        # Subscribe before reading the current status so no transition is missed
+        await pubsub.subscribe(cls._channel(job_id))
+        try:
+            job = await cls.status(job_id)
+            if job is None:
+                yield f"event: error\ndata: {json.dumps({'detail': 'Report job not found or expired'})}\n\n"
+                return
+            yield _sse(job)
+            deadline = time.monotonic() + timeout
+            while job["status"] not in FINAL_STATUSES and time.monotonic() < deadline:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=keepalive)
+                if message is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                job = json.loads(message["data"])
+                yield _sse(job)
+        finally:
+            try:
+                await pubsub.unsubscribe(cls._channel(job_id))
+                await pubsub.close()
+            except Exception:
+                pass
+
+    @classmethod
+    async def _update(cls, job_id: str, ttl: int = None, **fields) -> dict:
+        client = RedisClient.get_client()
+        key = cls._job_key(job_id)
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=fields)
+            if ttl:
+                pipe.expire(key, ttl)
+            pipe.hgetall(key)
+            job = (await pipe.execute())[-1]
+        public = cls._public(job)
+        await client.publish(cls._channel(job_id), json.dumps(public))
+        return job
+
+    @classmethod
+    async def _release_dedup(cls, job: dict):
+        """Stop pointing identical submissions at this job."""
+        client = RedisClient.get_client()
+        if await client.get(job["dedup"]) == job["id"]:
+            await client.delete(job["dedup"])
+
+    @classmethod
+    async def _run(cls, job_id: str):
+        client = RedisClient.get_client()
+        job = await client.hgetall(cls._job_key(job_id))
+        if not job:
+            return  # expired while queued
+        if job["status"] in FINAL_STATUSES:
+            return  # requeued after it had already finished
+        handler, _ = cls._handlers[job["kind"]]
+        attempts = await client.hincrby(cls._job_key(job_id), "attempts", 1)
+        await cls._update(job_id, status="running", running_since=time.time())
+
+        try:
+            pdf = await DBExecutor.run(handler, **json.loads(job["params"]), lane="report")
+            content = await asyncio.to_thread(_read, pdf)
+        except Exception as e:
+            if attempts < cls.MAX_ATTEMPTS and not _permanent(e):
+                await cls._update(job_id, status="retrying", error=_describe(e))
+                delay = cls.RETRY_DELAY * 2 ** (attempts - 1)
+                await client.zadd(cls.DELAYED, {job_id: time.time() + delay})
+            else:
+                print(f"Report job {job_id} ({job['kind']}) failed: {_describe(e)}")
+                job = await cls._update(job_id, ttl=cls.JOB_TTL, status="failed", error=_describe(e), finished_at=time.time())
+                await cls._release_dedup(job)
+            return
+
+        await RedisClient.get_binary_client().setex(cls._result_key(job_id), cls.RESULT_TTL, content)
+        job = await cls._update(
+            job_id,
+            ttl=cls.RESULT_TTL,
+            status="done",
+            error="",
+            filename=pdf.filename,
+            finished_at=time.time()
+        )
+        await cls._release_dedup(job)
+
+    @classmethod
+    async def _promote_due(cls):
+        client = RedisClient.get_client()
+        for job_id in await client.zrangebyscore(cls.DELAYED, 0, time.time()):
+            # Only the worker whose ZREM succeeds requeues the job
+            if await client.zrem(cls.DELAYED, job_id):
+                await client.rpush(cls.QUEUE, job_id)
+
+    @classmethod
+    async def _reclaim(cls):
+        """Requeue the jobs held by workers whose process stopped sending heartbeats."""
+        client = RedisClient.get_client()
+        token = await RedisClient.acquire_lock(f"{cls.PREFIX}reclaim", ttl_ms=cls.POLL_TIMEOUT * 1000)
+        if token is None:
+            return  # Another worker is reclaiming
+        try:
+            for worker_id in await client.smembers(cls.WORKER_SET):
+                process_id = worker_id.rsplit(":", 1)[0]
+                if await client.exists(cls._heartbeat_key(process_id)):
+                    continue
+                processing = cls._processing_key(worker_id)
+                for job_id in await client.lrange(processing, 0, -1):
+                    if not await client.lrem(processing, 1, job_id):
+                        continue
+                    job = await client.hgetall(cls._job_key(job_id))
+                    if not job or job["status"] in FINAL_STATUSES:
+                        continue
+                    if int(job.get("attempts") or 0) >= cls.MAX_ATTEMPTS:
+                        # Its attempts keep taking the worker down with them
+                        print(f"Report job {job_id} ({job['kind']}) failed: worker lost on every attempt")
+                        job = await cls._update(job_id, ttl=cls.JOB_TTL, status="failed",
+                                                error="Report worker stopped while running the job",
+                                                finished_at=time.time())
+                        await cls._release_dedup(job)
+                        continue
+                    print(f"Report job {job_id} ({job['kind']}) requeued from lost worker {worker_id}")
+                    await cls._update(job_id, status="queued")
+                    await client.rpush(cls.QUEUE, job_id)
+                await client.srem(cls.WORKER_SET, worker_id)
+        finally:
+            await RedisClient.release_lock(f"{cls.PREFIX}reclaim", token)
+
+    @classmethod
+    async def _beat(cls):
+        client = RedisClient.get_client()
+        await client.set(cls._heartbeat_key(cls._process_id), time.time(), ex=cls.LEASE)
+        await client.sadd(cls.WORKER_SET, *cls._worker_ids)
+
+    @classmethod
+    async def _heartbeat_loop(cls):
+        while True:
+            await asyncio.sleep(cls.LEASE / 3)
+            try:
+                await cls._beat()
+            except Exception as e:
+                print(f"Error sending report worker heartbeat: {e}")
+
+    @classmethod
+    async def _work(cls, worker_id: str):
+        client = RedisClient.get_client()
+        processing = cls._processing_key(worker_id)
+        while True:
+            job_id = None
+            try:
+                await cls._promote_due()
+                await cls._reclaim()
+                # Moved rather than popped, so the id survives this process dying mid-job
+                job_id = await client.blmove(cls.QUEUE, processing, cls.POLL_TIMEOUT, "LEFT", "RIGHT")
+                if job_id:
+                    await cls._run(job_id)
+                    await client.lrem(processing, 1, job_id)
+            except asyncio.CancelledError:
+                if job_id:
+                    # Shutting down mid-job: hand it back so another worker picks it up
+                    async with client.pipeline(transaction=True) as pipe:
+                        pipe.lrem(processing, 1, job_id)
+                        pipe.lpush(cls.QUEUE, job_id)
+                        await pipe.execute()
+                raise
+            except Exception as e:
+                print(f"Error in report job worker: {e}")
+                if job_id:
+                    try:
+                        await client.lrem(processing, 1, job_id)
+                    except Exception:
+                        pass
+                await asyncio.sleep(1)
+
+    @classmethod
+    async def start(cls, handlers: dict, workers: int = None) -> bool:
+        if not RedisClient.get_client():
+            return False
+        cls._handlers = dict(handlers)
+        cls._process_id = uuid.uuid4().hex
+        cls._worker_ids = [f"{cls._process_id}:{i}" for i in range(workers or cls.WORKERS)]
+        # The heartbeat exists before the workers register, so they are never reclaimed while alive
+        try:
+            await cls._beat()
+        except Exception as e:
+            print(f"Error registering report workers: {e}")
+            return False
+        cls._heartbeat = asyncio.create_task(cls._heartbeat_loop())
+        cls._workers = [asyncio.create_task(cls._work(worker_id)) for worker_id in cls._worker_ids]
+        return True
+
+    @classmethod
+    async def stop(cls):
+        tasks = cls._workers + ([cls._heartbeat] if cls._heartbeat else [])
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        client = RedisClient.get_client()
+        if client and cls._worker_ids:
+            try:
+                await client.srem(cls.WORKER_SET, *cls._worker_ids)
+                await client.delete(cls._heartbeat_key(cls._process_id))
+            except Exception as e:
+                print(f"Error unregistering report workers: {e}")
+        cls._workers = []
+        cls._heartbeat = None
+        cls._worker_ids = []
@@ -0,0 +1,159 @@
+import json
+import os
+import struct
+import zlib
+from typing import Any, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _default(value: Any):
+    # Same fallback as the old json.dumps(default=str) path, models included
+    if hasattr(value, 'model_dump'):
+        return value.model_dump()
+    if hasattr(value, 'dict'):
+        return value.dict()
+    return str(value)
+
+
+class JsonSerializer:
+    name = "json"
+    codec_id = 1
+    is_json = True
+
+    @staticmethod
+    def dumps(value: Any) -> bytes:
+        return json.dumps(value, default=_default, separators=(",", ":")).encode()
+
+    @staticmethod
+    def loads(data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonSerializer:
+    name = "orjson"
+    codec_id = 2
+    is_json = True
+
+    @staticmethod
+    def dumps(value: Any) -> bytes:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+    @staticmethod
+    def loads(data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackSerializer:
+    name = "msgpack"
+    codec_id = 3
+    is_json = False
+
+    @staticmethod
+    def dumps(value: Any) -> bytes:
+        return msgpack.packb(value, default=_default, use_bin_type=True)
+
+    @staticmethod
+    def loads(data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+
+SERIALIZERS = {s.name: s for s in (JsonSerializer, OrjsonSerializer, MsgpackSerializer)}
+AVAILABLE = {
+    "json": True,
+    "orjson": orjson is not None,
+    "msgpack": msgpack is not None,
+}
+
+COMPRESSION_NONE, COMPRESSION_ZLIB, COMPRESSION_ZSTD = 0, 1, 2
+COMPRESSIONS = {"none": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "zstd": COMPRESSION_ZSTD}
+
+
+class CacheCodec:
+    """Frames cache payloads as: magic, serializer id, compression id, metadata
+    length, metadata (JSON) and the encoded body. The body is kept separate so a
+    JSON body can be sent to the client as-is without decoding it."""
+
+    MAGIC = b"C1"
+    HEADER = struct.Struct(">2sBBI")
+
+    def __init__(self, serializer: str = "auto", compression: str = "auto", compress_min_bytes: int = 4096, level: int = 3):
+        if serializer == "auto":
+            serializer = "orjson" if AVAILABLE["orjson"] else "json"
+        if not AVAILABLE.get(serializer):
+            raise ValueError(f"Serializer '{serializer}' is not available")
+        if compression == "auto":
+            compression = "zstd" if zstandard is not None else "zlib"
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("Compression 'zstd' is not available")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression '{compression}'")
+
+        self.serializer = SERIALIZERS[serializer]
+        self.compression = COMPRESSIONS[compression]
+        self.compress_min_bytes = compress_min_bytes
+        self.level = level
+        self._zstd_compressor = zstandard.ZstdCompressor(level=level) if zstandard is not None else None
+        self._zstd_decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            serializer=os.getenv("CACHE_SERIALIZER", "auto"),
+            compression=os.getenv("CACHE_COMPRESSION", "auto"),
+            compress_min_bytes=int(os.getenv("CACHE_COMPRESS_MIN_BYTES", 4096)),
+        )
+
+    @property
+    def is_json(self) -> bool:
+        return self.serializer.is_json
+
+    def _compress(self, body: bytes) -> Tuple[int, bytes]:
+        if self.compression == COMPRESSION_NONE or len(body) < self.compress_min_bytes:
+            return COMPRESSION_NONE, body
+        if self.compression == COMPRESSION_ZSTD:
+            return COMPRESSION_ZSTD, self._zstd_compressor.compress(body)
+        return COMPRESSION_ZLIB, zlib.compress(body, self.level)
+
+    def _decompress(self, compression: int, body: bytes) -> bytes:
+        if compression == COMPRESSION_ZSTD:
+            if self._zstd_decompressor is None:
+                raise ValueError("zstd payload but zstandard is not installed")
+            return self._zstd_decompressor.decompress(body)
+        if compression == COMPRESSION_ZLIB:
+            return zlib.decompress(body)
+        return body
+
+    def pack(self, value: Any, meta: dict = None) -> bytes:
+        meta_bytes = json.dumps(meta or {}, separators=(",", ":")).encode()
+        compression, body = self._compress(self.serializer.dumps(value))
+        header = self.HEADER.pack(self.MAGIC, self.serializer.codec_id, compression, len(meta_bytes))
+        return header + meta_bytes + body
+
+    def unpack(self, blob: bytes) -> Tuple[dict, bytes, Any]:
+        """Returns (metadata, decompressed body, serializer of the body)."""
+        magic, codec_id, compression, meta_len = self.HEADER.unpack_from(blob)
+        if magic != self.MAGIC:
+            raise ValueError("Not a cache frame")
+        start = self.HEADER.size
+        meta = json.loads(blob[start:start + meta_len])
+        body = self._decompress(compression, blob[start + meta_len:])
+        serializer = next(s for s in SERIALIZERS.values() if s.codec_id == codec_id)
+        return meta, body, serializer
+
+    def loads(self, blob: bytes) -> Tuple[dict, Any]:
+        meta, body, serializer = self.unpack(blob)
+        return meta, serializer.loads(body)